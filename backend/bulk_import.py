@@ -0,0 +1,136 @@
+"""
+=============================================================================
+  Week 2 — Backend Engineer
+  File: bulk_import.py
+  Purpose: Import registered cases / public submissions from CSV or JSONL.
+=============================================================================
+
+Partner agencies send thousands of cases at a time with face-mesh vectors
+already extracted. This script streams such a file into the database with
+the bulk helpers in db_queries.py (one executemany + commit per batch)
+instead of one ORM session and commit per row.
+
+Input format — one record per CSV row or JSONL line, with the column names
+of the target table (see data_models.py). `face_mesh` holds the 1404-value
+vector: a JSON array (CSV cell or JSONL value) or a path to a `.npy` file.
+`id`, `submitted_on` (ISO 8601) and `status` are optional.
+
+Records that fail to parse are reported with their line number and
+skipped; everything else is imported.
+
+Usage:
+    python bulk_import.py registered agency_cases.csv
+    python bulk_import.py public sightings.jsonl --batch-size 5000
+    python bulk_import.py registered cases.jsonl --no-journal   # then rebuild ML indexes, match --full
+=============================================================================
+"""
+
+import os
+import csv
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from data_models import PublicSubmissions, RegisteredCases
+from db_queries import (
+    BULK_BATCH_SIZE,
+    bulk_new_public_cases,
+    bulk_register_cases,
+    pack_face_mesh,
+)
+
+
+IMPORTERS = {
+    "registered": (RegisteredCases, bulk_register_cases),
+    "public": (PublicSubmissions, bulk_new_public_cases),
+}
+
+
+def read_records(path: str):
+    """Yield (line_number, dict) from a .csv or .jsonl / .ndjson file."""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            # Line 1 is the header
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+
+
+def clean_record(model, record: dict, base_dir: str) -> dict:
+    """
+    Keep the columns of `model`, decode face_mesh and submitted_on, and drop
+    empty CSV cells so column defaults apply. Raises ValueError if invalid.
+    """
+    columns = set(model.__table__.columns.keys())
+    record = {
+        key: value for key, value in record.items()
+        if key in columns and value not in ("", None)
+    }
+
+    face_mesh = record.get("face_mesh")
+    if face_mesh is None:
+        raise ValueError("missing face_mesh")
+    if isinstance(face_mesh, str) and face_mesh.endswith(".npy"):
+        face_mesh = np.load(os.path.join(base_dir, face_mesh))
+    record["face_mesh"] = pack_face_mesh(face_mesh)
+
+    if isinstance(record.get("submitted_on"), str):
+        record["submitted_on"] = datetime.fromisoformat(record["submitted_on"])
+    return record
+
+
+def import_file(kind: str, path: str, batch_size: int = BULK_BATCH_SIZE,
+                journal: bool = True) -> dict:
+    """Import `path` into the `kind` table; returns counts and timing."""
+    model, bulk_insert = IMPORTERS[kind]
+    base_dir = os.path.dirname(os.path.abspath(path))
+    skipped = []
+
+    def records():
+        for line_number, record in read_records(path):
+            try:
+                yield clean_record(model, record, base_dir)
+            except (ValueError, TypeError, OSError) as e:
+                skipped.append(line_number)
+                print(f"   ⚠️  line {line_number} skipped: {e}")
+
+    start = time.perf_counter()
+    inserted = bulk_insert(
+        records(), batch_size=batch_size, journal=journal,
+        on_batch=lambda total: print(f"   📥 {total:,} rows committed…"),
+    )
+    seconds = time.perf_counter() - start
+
+    return {
+        "kind": kind,
+        "inserted": inserted,
+        "skipped": len(skipped),
+        "skipped_lines": skipped,
+        "seconds": seconds,
+        "rows_per_second": inserted / seconds if seconds else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import cases from CSV / JSONL.")
+    parser.add_argument("kind", choices=sorted(IMPORTERS))
+    parser.add_argument("path", help="CSV or JSONL file.")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    parser.add_argument("--no-journal", action="store_true",
+                        help="Skip IndexJournal rows (rebuild the ML indexes and run "
+                             "baseline_match.py --full afterwards).")
+    args = parser.parse_args()
+
+    report = import_file(args.kind, args.path, args.batch_size, not args.no_journal)
+    print(
+        f"\n✅ Imported {report['inserted']:,} {args.kind} rows in "
+        f"{report['seconds']:.2f} s ({report['rows_per_second']:,.0f} rows/s); "
+        f"{report['skipped']} skipped."
+    )
@@ -5,13 +5,26 @@
   Purpose: Finalized database schema for the Missing Person project.
 =============================================================================
 
-This file defines the two core tables used across the application:
+This file defines the core tables used across the application:
 
   1. RegisteredCases  — Cases filed by authorized users (police / admin).
   2. PublicSubmissions — Sightings / photos submitted by the general public.
+  3. IndexJournal     — Append-only log of vector additions / removals that
+                        the ML search indexes replay to stay current.
+  4. CaseSetVersion   — Per-user counter bumped whenever that user's set of
+                        NF cases changes; keys the ML model cache.
+  5. MatchWatermark   — How far the incremental matcher has scored each table.
+  6. CandidateMatches — Top-k scored (submission, case) pairs for review.
+  7. MatchJob         — Durable queue of submissions waiting for the match
+                        worker.
 
-Both tables store face-mesh landmarks as a JSON string so the ML pipeline
-can consume them directly without touching raw image files.
+Both tables store face-mesh landmarks as a packed little-endian float32 blob
+(1404 values, ~5.6 KB) so the ML pipeline can map them straight into NumPy
+arrays without touching raw image files or decoding JSON. The
+`face_mesh_version` column records which encoding a row uses; rows written
+before the binary format carry version 0 until `migrations.py` converts them.
+`face_mesh_norm` holds the same vector centered, scaled and aligned to a
+canonical pose (face_normalization.py), computed once when the row is saved.
 =============================================================================
 """
 
@@ -19,16 +32,34 @@ from uuid import uuid4
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Column, Index, LargeBinary
 from sqlmodel import Field, SQLModel
 
 
+# ---------------------------------------------------------------------------
+# Face-mesh vector format
+# ---------------------------------------------------------------------------
+# Number of values MediaPipe returns (468 landmarks × 3 coords = 1404 floats)
+FACE_MESH_DIM = 1404
+# Little-endian float32, independent of the host byte order
+FACE_MESH_DTYPE = "<f4"
+# 0 = legacy JSON text, 1 = packed float32 blob
+FACE_MESH_VERSION = 1
+
+
 # ---------------------------------------------------------------------------
 # Table 1 — Registered (official) missing-person cases
 # ---------------------------------------------------------------------------
 class RegisteredCases(SQLModel, table=True):
     """An official missing-person case registered by an authorized user."""
 
-    __table_args__ = {"extend_existing": True}
+    # Dashboard / training queries filter on (submitted_by, status); the
+    # matcher and public lists walk one status in submitted_on order
+    __table_args__ = (
+        Index("ix_registeredcases_submitted_by_status", "submitted_by", "status"),
+        Index("ix_registeredcases_status_submitted_on", "status", "submitted_on"),
+        {"extend_existing": True},
+    )
 
     # Primary key — UUID string
     id: str = Field(
@@ -66,9 +97,21 @@ class RegisteredCases(SQLModel, table=True):
         default=None, max_length=10, description="Complainant's phone."
     )
 
-    # Face-mesh vector stored as JSON string  (1404 floats for 468 landmarks × 3)
-    face_mesh: str = Field(
-        nullable=False, description="JSON-encoded face-mesh landmark vector."
+    # Face-mesh vector stored as packed float32 blob (468 landmarks × 3)
+    face_mesh: bytes = Field(
+        sa_column=Column(LargeBinary, nullable=False),
+        description="Packed float32 face-mesh landmark vector.",
+    )
+    face_mesh_version: int = Field(
+        default=FACE_MESH_VERSION,
+        nullable=False,
+        description="Encoding of face_mesh (see FACE_MESH_VERSION).",
+    )
+    # Centered, scaled and pose-aligned copy (face_normalization.py), same encoding
+    face_mesh_norm: Optional[bytes] = Field(
+        default=None,
+        sa_column=Column(LargeBinary, nullable=True),
+        description="Packed float32 normalized face-mesh vector.",
     )
 
     # Metadata
@@ -92,7 +135,11 @@ class RegisteredCases(SQLModel, table=True):
 class PublicSubmissions(SQLModel, table=True):
     """A sighting or photo submitted by a member of the public."""
 
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_publicsubmissions_submitted_by_status", "submitted_by", "status"),
+        Index("ix_publicsubmissions_status_submitted_on", "status", "submitted_on"),
+        {"extend_existing": True},
+    )
 
     id: str = Field(
         primary_key=True,
@@ -105,9 +152,21 @@ class PublicSubmissions(SQLModel, table=True):
         default=None, max_length=128, description="Name of submitter."
     )
 
-    # Face-mesh vector stored as JSON string
-    face_mesh: str = Field(
-        nullable=False, description="JSON-encoded face-mesh landmark vector."
+    # Face-mesh vector stored as packed float32 blob
+    face_mesh: bytes = Field(
+        sa_column=Column(LargeBinary, nullable=False),
+        description="Packed float32 face-mesh landmark vector.",
+    )
+    face_mesh_version: int = Field(
+        default=FACE_MESH_VERSION,
+        nullable=False,
+        description="Encoding of face_mesh (see FACE_MESH_VERSION).",
+    )
+    # Centered, scaled and pose-aligned copy (face_normalization.py), same encoding
+    face_mesh_norm: Optional[bytes] = Field(
+        default=None,
+        sa_column=Column(LargeBinary, nullable=True),
+        description="Packed float32 normalized face-mesh vector.",
     )
 
     location: Optional[str] = Field(
@@ -133,6 +192,172 @@ class PublicSubmissions(SQLModel, table=True):
     )
 
 
+# ---------------------------------------------------------------------------
+# Table 3 — Search-index change journal
+# ---------------------------------------------------------------------------
+class IndexJournal(SQLModel, table=True):
+    """
+    One vector added to or removed from the searchable set.
+
+    Rows are written in the same transaction as the case / submission change
+    they describe, so an index that replays the journal in `seq` order never
+    misses or reorders an update.
+    """
+
+    __table_args__ = {"extend_existing": True}
+
+    seq: Optional[int] = Field(
+        default=None, primary_key=True, description="Monotonic sequence number."
+    )
+    kind: str = Field(
+        max_length=16,
+        nullable=False,
+        description="'registered' (RegisteredCases) or 'public' (PublicSubmissions).",
+    )
+    op: str = Field(
+        max_length=8, nullable=False, description="'add' or 'remove'."
+    )
+    record_id: str = Field(nullable=False, description="UUID of the affected row.")
+    created_on: datetime = Field(
+        default_factory=datetime.utcnow, description="Timestamp of the change."
+    )
+
+
+# ---------------------------------------------------------------------------
+# Table 4 — Per-user case-set version
+# ---------------------------------------------------------------------------
+class CaseSetVersion(SQLModel, table=True):
+    """
+    Version of one user's NOT-FOUND case set.
+
+    Incremented in the same transaction as any insert or status change of
+    that user's registered cases, so a trained model tagged with a version
+    is stale as soon as the stored version moves on.
+    """
+
+    __table_args__ = {"extend_existing": True}
+
+    submitted_by: str = Field(
+        primary_key=True, max_length=64, description="Username of the case owner."
+    )
+    version: int = Field(default=0, nullable=False, description="Change counter.")
+    updated_on: datetime = Field(
+        default_factory=datetime.utcnow, description="Timestamp of the last change."
+    )
+
+
+# ---------------------------------------------------------------------------
+# Table 5 — Incremental-matching watermark
+# ---------------------------------------------------------------------------
+class MatchWatermark(SQLModel, table=True):
+    """
+    Last IndexJournal entry the matcher has already scored, per table.
+
+    Every row added at or below the watermark's `seq` has its
+    CandidateMatches rows, so a run only loads rows whose journal "add"
+    is above it. Journal seqs are assigned in commit order, so rows saved
+    with an old (back-dated) submitted_on are still picked up.
+    """
+
+    __table_args__ = {"extend_existing": True}
+
+    kind: str = Field(
+        primary_key=True,
+        max_length=16,
+        description="'registered' (RegisteredCases) or 'public' (PublicSubmissions).",
+    )
+    last_seq: int = Field(
+        nullable=False, description="IndexJournal.seq the run scored up to."
+    )
+    scoring: str = Field(
+        default="",
+        max_length=64,
+        nullable=False,
+        description="Distance space of the stored candidates, e.g. 'raw' or "
+                    "'norm-pca128:<fit time>' (see baseline_match.scoring_space).",
+    )
+    updated_on: datetime = Field(
+        default_factory=datetime.utcnow, description="Timestamp of the run."
+    )
+
+
+# ---------------------------------------------------------------------------
+# Table 6 — Candidate matches
+# ---------------------------------------------------------------------------
+class CandidateMatches(SQLModel, table=True):
+    """
+    A registered case scored as one of the top-k nearest neighbours of a
+    public submission.
+
+    The two composite indexes serve the review pages, which list the
+    candidates of one submission or of one case, nearest first.
+    """
+
+    __table_args__ = (
+        Index("ix_candidatematches_public_distance", "public_id", "distance"),
+        Index("ix_candidatematches_registered_distance", "registered_id", "distance"),
+        {"extend_existing": True},
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    public_id: str = Field(nullable=False, description="UUID of the PublicSubmission.")
+    registered_id: str = Field(
+        nullable=False, description="UUID of the RegisteredCase."
+    )
+    distance: float = Field(nullable=False, description="Euclidean face-mesh distance.")
+    model_version: str = Field(
+        default="",
+        max_length=32,
+        nullable=False,
+        description="Scorer that produced the row (e.g. 'exact-l2').",
+    )
+    computed_at: datetime = Field(
+        default_factory=datetime.utcnow, description="Timestamp of the match run."
+    )
+
+
+# ---------------------------------------------------------------------------
+# Table 7 — Match job queue
+# ---------------------------------------------------------------------------
+class MatchJob(SQLModel, table=True):
+    """
+    A public submission waiting to be matched by the match worker.
+
+    A worker claims a job by setting status 'running' and pushing
+    `available_on` to the end of its lease; a job whose lease runs out is
+    claimable again, so every job is processed at least once. Finished
+    jobs are deleted; jobs that exhaust their attempts stay as 'failed'.
+    """
+
+    __table_args__ = (
+        Index("ix_matchjob_status_available", "status", "available_on"),
+        {"extend_existing": True},
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    public_id: str = Field(nullable=False, description="UUID of the PublicSubmission.")
+    status: str = Field(
+        default="queued",
+        max_length=16,
+        nullable=False,
+        description="'queued', 'running' or 'failed'.",
+    )
+    attempts: int = Field(default=0, nullable=False, description="Claims so far.")
+    available_on: datetime = Field(
+        default_factory=datetime.utcnow,
+        description="When the job may be claimed (retry delay / lease expiry).",
+    )
+    worker: Optional[str] = Field(
+        default=None, max_length=64, description="Worker holding the lease."
+    )
+    last_error: Optional[str] = Field(
+        default=None, max_length=512, description="Error of the last failed attempt."
+    )
+    enqueued_on: datetime = Field(
+        default_factory=datetime.utcnow, description="Timestamp of the submission."
+    )
+
+
 # ---------------------------------------------------------------------------
 # Quick self-test: create tables in an in-memory SQLite DB
 # ---------------------------------------------------------------------------
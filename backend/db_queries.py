@@ -9,25 +9,110 @@ Provides CRUD functions used by both the frontend and the ML pipeline:
   - create_db()              → Ensures tables exist.
   - register_new_case()      → Insert a RegisteredCase.
   - new_public_case()        → Insert a PublicSubmission.
+  - bulk_register_cases() / bulk_new_public_cases() → Batched executemany inserts.
   - get_training_data()      → Fetch face-mesh data for ML training.
   - fetch_registered_cases() → List cases for the dashboard.
   - fetch_public_cases()     → List public submissions (optionally with face-mesh).
   - update_found_status()    → Mark a case as "Found" after a match.
-  - get_registered_cases_count() → Dashboard metrics.
+  - get_registered_cases_count() → Cases of a user with a given status.
+  - get_case_status_counts() → Dashboard metrics (one GROUP BY count).
+  - page_*_cases() / stream_*_cases() → Keyset pages / streamed rows for
+                               admin views and exports (no face_mesh by default).
+  - pack_face_mesh() / unpack_face_mesh() → float32 blob ⇄ NumPy array.
+  - normalize_face_mesh_blobs() → face_mesh_norm values (face_normalization.py),
+                               filled in by every insert helper.
+  - fetch_index_journal()    → Vector add/remove log replayed by ML indexes.
+  - get_case_set_version()   → Per-user data version for the ML model cache.
+  - save_match_results()     → Store a match run's candidates + watermarks.
+  - fetch_best_matches()     → Nearest stored NF case for each NF submission.
+  - fetch_candidates_for_public() / _for_registered() → Precomputed top-k for review.
+  - enqueue_match_jobs() / claim_match_jobs() / complete_match_jobs() /
+    retry_match_jobs() → MatchJob queue drained by ml/match_worker.py.
   … and more.
 =============================================================================
 """
 
-from sqlmodel import create_engine, Session, select
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy import delete, tuple_, update
+from sqlmodel import Session, select, func
+
+import metrics
+from db_engine import make_engine
+from face_normalization import normalize_face_meshes
+from data_models import (
+    CandidateMatches,
+    CaseSetVersion,
+    FACE_MESH_DIM,
+    FACE_MESH_DTYPE,
+    IndexJournal,
+    MatchJob,
+    MatchWatermark,
+    RegisteredCases,
+    PublicSubmissions,
+)
+
+
+# Every public helper below is timed into traceai_db_query_seconds{helper=…}
+# when metrics are enabled (see metrics.py); stream_* generators are not.
 
-from data_models import RegisteredCases, PublicSubmissions
+# ---------------------------------------------------------------------------
+# Database engine (SQLite file in the project root; WAL + pooled, see db_engine.py)
+# ---------------------------------------------------------------------------
+sqlite_url = "sqlite:///sqlite_database.db"
+engine = make_engine(sqlite_url, echo=False)
 
 
 # ---------------------------------------------------------------------------
-# Database engine (SQLite file in the project root)
+# Face-mesh encoding
 # ---------------------------------------------------------------------------
-sqlite_url = "sqlite:///sqlite_database.db"
-engine = create_engine(sqlite_url, echo=False)
+def pack_face_mesh(face_mesh) -> bytes:
+    """
+    Encode a face-mesh vector as a packed float32 blob.
+
+    Accepts a JSON string (the legacy format produced by the frontend),
+    a list / tuple / NumPy array of floats, or an already-packed blob.
+    Raises ValueError if the vector does not hold FACE_MESH_DIM values.
+    """
+    if isinstance(face_mesh, (bytes, bytearray, memoryview)):
+        vector = np.frombuffer(face_mesh, dtype=FACE_MESH_DTYPE)
+    else:
+        if isinstance(face_mesh, str):
+            face_mesh = json.loads(face_mesh)
+        try:
+            vector = np.asarray(face_mesh, dtype=FACE_MESH_DTYPE).ravel()
+        except TypeError as e:
+            # e.g. legacy JSON that decodes to an object or holds nulls
+            raise ValueError(f"face_mesh is not a list of numbers: {e}") from e
+
+    if vector.size != FACE_MESH_DIM:
+        raise ValueError(
+            f"face_mesh must have {FACE_MESH_DIM} values, got {vector.size}."
+        )
+    return vector.tobytes()
+
+
+def unpack_face_mesh(blob) -> np.ndarray:
+    """
+    Decode a stored face-mesh value into a float32 NumPy array.
+
+    Packed blobs are wrapped without copying (the result is read-only).
+    Legacy JSON rows that have not been migrated yet are still decoded.
+    """
+    if isinstance(blob, str):
+        return np.asarray(json.loads(blob), dtype=np.float32)
+    return np.frombuffer(blob, dtype=FACE_MESH_DTYPE)
+
+
+def normalize_face_mesh_blobs(blobs) -> list:
+    """Packed normalized vectors (face_mesh_norm) for packed face_mesh blobs."""
+    if not blobs:
+        return []
+    normalized = normalize_face_meshes(np.stack([unpack_face_mesh(b) for b in blobs]))
+    return [row.astype(FACE_MESH_DTYPE).tobytes() for row in normalized]
 
 
 # ---------------------------------------------------------------------------
@@ -43,28 +128,188 @@ def create_db():
         PublicSubmissions.__table__.create(engine)
     except Exception:
         pass
+    try:
+        IndexJournal.__table__.create(engine)
+    except Exception:
+        pass
+    try:
+        CaseSetVersion.__table__.create(engine)
+    except Exception:
+        pass
+    try:
+        MatchWatermark.__table__.create(engine)
+    except Exception:
+        pass
+    try:
+        CandidateMatches.__table__.create(engine)
+    except Exception:
+        pass
+    try:
+        MatchJob.__table__.create(engine)
+    except Exception:
+        pass
+
+
+def _bump_case_set_version(session: Session, submitted_by: str):
+    """Increment `submitted_by`'s case-set version inside the caller's transaction."""
+    now = datetime.utcnow()
+    session.exec(
+        sqlite_insert(CaseSetVersion.__table__)
+        .values(submitted_by=submitted_by, version=1, updated_on=now)
+        .on_conflict_do_update(
+            index_elements=["submitted_by"],
+            set_={"version": CaseSetVersion.__table__.c.version + 1, "updated_on": now},
+        )
+    )
 
 
 # ---------------------------------------------------------------------------
 # INSERT helpers
 # ---------------------------------------------------------------------------
+@metrics.timed("traceai_db_query_seconds", helper="register_new_case")
 def register_new_case(case_details: RegisteredCases):
     """Insert a new registered (official) missing-person case."""
+    case_details.face_mesh = pack_face_mesh(case_details.face_mesh)
+    case_details.face_mesh_norm = normalize_face_mesh_blobs([case_details.face_mesh])[0]
     with Session(engine) as session:
         session.add(case_details)
+        session.add(IndexJournal(kind="registered", op="add", record_id=case_details.id))
+        _bump_case_set_version(session, case_details.submitted_by)
         session.commit()
 
 
-def new_public_case(public_case_details: PublicSubmissions):
-    """Insert a new public sighting / submission."""
+@metrics.timed("traceai_db_query_seconds", helper="new_public_case")
+def new_public_case(public_case_details: PublicSubmissions, enqueue_match: bool = False):
+    """
+    Insert a new public sighting / submission.
+
+    With `enqueue_match`, a MatchJob is queued in the same transaction, so
+    the match worker scores the sighting without the page waiting for it.
+    """
+    public_case_details.face_mesh = pack_face_mesh(public_case_details.face_mesh)
+    public_case_details.face_mesh_norm = normalize_face_mesh_blobs(
+        [public_case_details.face_mesh]
+    )[0]
     with Session(engine) as session:
         session.add(public_case_details)
+        session.add(
+            IndexJournal(kind="public", op="add", record_id=public_case_details.id)
+        )
+        if enqueue_match:
+            session.add(MatchJob(public_id=public_case_details.id))
         session.commit()
 
 
+# ---------------------------------------------------------------------------
+# Bulk INSERT helpers
+# ---------------------------------------------------------------------------
+# Rows per transaction in the bulk helpers
+BULK_BATCH_SIZE = 1000
+
+
+def _bulk_row(model, record) -> dict:
+    """Column values for one record (a `model` instance or a dict of fields)."""
+    if not isinstance(record, model):
+        record = {"status": "NF", **record}
+        record = model(**record)  # fills id / submitted_on / column defaults
+    row = {column.name: getattr(record, column.name) for column in model.__table__.columns}
+    row["face_mesh"] = pack_face_mesh(row["face_mesh"])
+    return row
+
+
+def _bulk_insert(model, kind: str, records, batch_size: int, journal: bool,
+                 on_batch=None) -> int:
+    """Insert `records` `batch_size` at a time, one executemany + commit per batch."""
+    table = model.__table__
+    inserted = 0
+    batch = []
+
+    def flush():
+        # One vectorized normalization pass per batch
+        normalized = normalize_face_mesh_blobs([row["face_mesh"] for row in batch])
+        for row, blob in zip(batch, normalized):
+            row["face_mesh_norm"] = blob
+        with Session(engine) as session:
+            conn = session.connection()
+            conn.execute(table.insert(), batch)
+            if journal:
+                conn.execute(
+                    IndexJournal.__table__.insert(),
+                    [{"kind": kind, "op": "add", "record_id": row["id"],
+                      "created_on": datetime.utcnow()} for row in batch],
+                )
+            if model is RegisteredCases:
+                for submitted_by in {row["submitted_by"] for row in batch}:
+                    _bump_case_set_version(session, submitted_by)
+            session.commit()
+        metrics.inc("traceai_rows_inserted_total", len(batch), table=table.name)
+
+    for record in records:
+        batch.append(_bulk_row(model, record))
+        if len(batch) == batch_size:
+            flush()
+            inserted += len(batch)
+            batch = []
+            if on_batch:
+                on_batch(inserted)
+    if batch:
+        flush()
+        inserted += len(batch)
+        if on_batch:
+            on_batch(inserted)
+    return inserted
+
+
+@metrics.timed("traceai_db_query_seconds", helper="bulk_register_cases")
+def bulk_register_cases(cases, batch_size: int = BULK_BATCH_SIZE, journal: bool = True,
+                        on_batch=None) -> int:
+    """
+    Insert many registered cases; returns the number inserted.
+
+    Parameters
+    ----------
+    cases : iterable of RegisteredCases or dict
+        Dicts may omit id, submitted_on and status (defaults: new UUID,
+        now, 'NF'); face_mesh may be anything pack_face_mesh() accepts.
+    batch_size : int
+        Rows per executemany / transaction. A failure rolls back only the
+        batch being written; earlier batches stay committed.
+    journal : bool
+        Append IndexJournal 'add' rows so the ML indexes pick the cases up.
+        Disable only when the index will be rebuilt afterwards anyway.
+    on_batch : callable, optional
+        Called with the running total after each committed batch.
+
+    Each batch also bumps the CaseSetVersion of every user it touches.
+    """
+    return _bulk_insert(RegisteredCases, "registered", cases, batch_size, journal, on_batch)
+
+
+@metrics.timed("traceai_db_query_seconds", helper="bulk_new_public_cases")
+def bulk_new_public_cases(submissions, batch_size: int = BULK_BATCH_SIZE,
+                          journal: bool = True, on_batch=None) -> int:
+    """Insert many public submissions; same contract as bulk_register_cases()."""
+    return _bulk_insert(PublicSubmissions, "public", submissions, batch_size, journal,
+                        on_batch)
+
+
+@metrics.timed("traceai_db_query_seconds", helper="fetch_existing_ids")
+def fetch_existing_ids(kind: str, ids) -> set:
+    """Subset of `ids` already stored in the `kind` table ('registered' / 'public')."""
+    model = MATCH_TABLES[kind]
+    ids = list(ids)
+    found = set()
+    with Session(engine) as session:
+        for start in range(0, len(ids), ID_CHUNK_SIZE):
+            chunk = ids[start:start + ID_CHUNK_SIZE]
+            found.update(session.exec(select(model.id).where(model.id.in_(chunk))).all())
+    return found
+
+
 # ---------------------------------------------------------------------------
 # SELECT helpers — Registered Cases
 # ---------------------------------------------------------------------------
+@metrics.timed("traceai_db_query_seconds", helper="fetch_registered_cases")
 def fetch_registered_cases(submitted_by: str, status: str):
     """Fetch registered cases for a given user, filtered by status string."""
     if status == "All":
@@ -92,9 +337,11 @@ def fetch_registered_cases(submitted_by: str, status: str):
         return result
 
 
+@metrics.timed("traceai_db_query_seconds", helper="get_training_data")
 def get_training_data(submitted_by: str):
     """
-    Return (id, face_mesh) rows for a user's NOT-FOUND cases.
+    Return (id, face_mesh) rows for a user's NOT-FOUND cases, with
+    face_mesh decoded to a float32 NumPy array.
     Used by the ML pipeline to build the KNN training set.
     """
     with Session(engine) as session:
@@ -103,9 +350,10 @@ def get_training_data(submitted_by: str):
             .where(RegisteredCases.submitted_by == submitted_by)
             .where(RegisteredCases.status == "NF")
         ).all()
-        return result
+        return [(case_id, unpack_face_mesh(blob)) for case_id, blob in result]
 
 
+@metrics.timed("traceai_db_query_seconds", helper="get_registered_case_detail")
 def get_registered_case_detail(case_id: str):
     """Fetch full detail of a single registered case."""
     with Session(engine) as session:
@@ -121,8 +369,13 @@ def get_registered_case_detail(case_id: str):
         return result
 
 
+@metrics.timed("traceai_db_query_seconds", helper="get_registered_cases_count")
 def get_registered_cases_count(submitted_by: str, status: str):
-    """Return list of cases matching user + status (used for dashboard count)."""
+    """
+    Return list of cases matching user + status.
+
+    Loads every full row; for dashboard numbers use get_case_status_counts().
+    """
     create_db()
     with Session(engine) as session:
         result = session.exec(
@@ -133,13 +386,33 @@ def get_registered_cases_count(submitted_by: str, status: str):
         return result
 
 
+@metrics.timed("traceai_db_query_seconds", helper="get_case_status_counts")
+def get_case_status_counts(submitted_by: str) -> dict:
+    """
+    Return {status: count} of a user's registered cases, e.g. {'F': 2, 'NF': 5}.
+
+    One grouped COUNT answered from the (submitted_by, status) index — no
+    rows (or face-mesh blobs) are loaded. 'F' and 'NF' are always present.
+    """
+    with Session(engine) as session:
+        result = session.exec(
+            select(RegisteredCases.status, func.count())
+            .where(RegisteredCases.submitted_by == submitted_by)
+            .group_by(RegisteredCases.status)
+        ).all()
+    return {"F": 0, "NF": 0, **dict(result)}
+
+
 # ---------------------------------------------------------------------------
 # SELECT helpers — Public Submissions
 # ---------------------------------------------------------------------------
+@metrics.timed("traceai_db_query_seconds", helper="fetch_public_cases")
 def fetch_public_cases(train_data: bool, status: str):
     """
-    If train_data=True  → return (id, face_mesh) for ML matching.
-    If train_data=False → return metadata columns for the dashboard.
+    If train_data=True  → return (id, face_mesh) for ML matching, with
+                          face_mesh decoded to a float32 NumPy array.
+    If train_data=False → return metadata columns for the dashboard
+                          (every status; see page_public_cases()).
     """
     if train_data:
         with Session(engine) as session:
@@ -149,7 +422,7 @@ def fetch_public_cases(train_data: bool, status: str):
                     PublicSubmissions.face_mesh,
                 ).where(PublicSubmissions.status == status)
             ).all()
-            return result
+            return [(case_id, unpack_face_mesh(blob)) for case_id, blob in result]
 
     with Session(engine) as session:
         result = session.exec(
@@ -166,6 +439,7 @@ def fetch_public_cases(train_data: bool, status: str):
         return result
 
 
+@metrics.timed("traceai_db_query_seconds", helper="get_public_case_detail")
 def get_public_case_detail(case_id: str):
     """Fetch metadata for a single public submission."""
     with Session(engine) as session:
@@ -180,16 +454,136 @@ def get_public_case_detail(case_id: str):
         return result
 
 
+@metrics.timed("traceai_db_query_seconds", helper="list_public_cases")
 def list_public_cases():
-    """Return all public submissions (used in admin views)."""
+    """
+    Return all public submissions (used in admin views).
+
+    Loads every full row at once; prefer page_public_cases() or
+    stream_public_cases() on large tables.
+    """
     with Session(engine) as session:
         result = session.exec(select(PublicSubmissions)).all()
         return result
 
 
+# ---------------------------------------------------------------------------
+# Paginated / streaming listings (bounded memory, face_mesh only on request)
+# ---------------------------------------------------------------------------
+DEFAULT_PAGE_SIZE = 100
+STREAM_BATCH_SIZE = 1000
+
+# Metadata columns returned by the listing helpers
+REGISTERED_LIST_COLUMNS = (
+    RegisteredCases.id,
+    RegisteredCases.submitted_by,
+    RegisteredCases.name,
+    RegisteredCases.age,
+    RegisteredCases.status,
+    RegisteredCases.last_seen,
+    RegisteredCases.matched_with,
+    RegisteredCases.submitted_on,
+)
+PUBLIC_LIST_COLUMNS = (
+    PublicSubmissions.id,
+    PublicSubmissions.status,
+    PublicSubmissions.location,
+    PublicSubmissions.mobile,
+    PublicSubmissions.birth_marks,
+    PublicSubmissions.submitted_on,
+    PublicSubmissions.submitted_by,
+)
+
+
+def _listing_query(model, columns, status=None, submitted_by=None,
+                   include_face_mesh: bool = False, newest_first: bool = False):
+    """SELECT `columns` (+ face_mesh) of `model` in (submitted_on, id) order."""
+    if include_face_mesh:
+        columns = (*columns, model.face_mesh)
+    query = select(*columns)
+    if status is not None:
+        query = query.where(model.status == status)
+    if submitted_by is not None:
+        query = query.where(model.submitted_by == submitted_by)
+    if newest_first:
+        return query.order_by(model.submitted_on.desc(), model.id.desc())
+    return query.order_by(model.submitted_on, model.id)
+
+
+def _page(model, columns, after=None, limit: int = DEFAULT_PAGE_SIZE,
+          newest_first: bool = False, **filters):
+    """Return (rows, next_cursor) for one keyset page; next_cursor is None at the end."""
+    query = _listing_query(model, columns, newest_first=newest_first, **filters)
+    if after is not None:
+        key = tuple_(model.submitted_on, model.id)
+        query = query.where(key < tuple_(*after) if newest_first else key > tuple_(*after))
+    with Session(engine) as session:
+        rows = session.exec(query.limit(limit)).all()
+    next_cursor = (rows[-1].submitted_on, rows[-1].id) if len(rows) == limit else None
+    return rows, next_cursor
+
+
+def _stream(model, columns, batch_size: int = STREAM_BATCH_SIZE, **filters):
+    """Yield rows `batch_size` at a time from one open cursor."""
+    query = _listing_query(model, columns, **filters)
+    with Session(engine) as session:
+        yield from session.exec(query.execution_options(yield_per=batch_size))
+
+
+@metrics.timed("traceai_db_query_seconds", helper="page_public_cases")
+def page_public_cases(after=None, limit: int = DEFAULT_PAGE_SIZE, status: str = None,
+                      include_face_mesh: bool = False, newest_first: bool = False):
+    """
+    One page of public submissions, keyset-paginated on (submitted_on, id).
+
+    Pass the returned cursor back as `after` to get the next page; the
+    cost of a page does not grow with its position. face_mesh (raw packed
+    blob, see unpack_face_mesh) is only selected with `include_face_mesh`.
+
+    Returns
+    -------
+    (rows, next_cursor) — next_cursor is None on the last page.
+    """
+    return _page(PublicSubmissions, PUBLIC_LIST_COLUMNS, after, limit, newest_first,
+                 status=status, include_face_mesh=include_face_mesh)
+
+
+@metrics.timed("traceai_db_query_seconds", helper="page_registered_cases")
+def page_registered_cases(after=None, limit: int = DEFAULT_PAGE_SIZE,
+                          submitted_by: str = None, status: str = None,
+                          include_face_mesh: bool = False, newest_first: bool = False):
+    """One page of registered cases; same contract as page_public_cases()."""
+    return _page(RegisteredCases, REGISTERED_LIST_COLUMNS, after, limit, newest_first,
+                 status=status, submitted_by=submitted_by,
+                 include_face_mesh=include_face_mesh)
+
+
+def stream_public_cases(status: str = None, include_face_mesh: bool = False,
+                        batch_size: int = STREAM_BATCH_SIZE):
+    """
+    Yield every public submission in (submitted_on, id) order.
+
+    Rows are fetched `batch_size` at a time from a single cursor, so
+    exports of any size run in constant memory. Consume the generator
+    fully (or close it) to release the connection.
+    """
+    return _stream(PublicSubmissions, PUBLIC_LIST_COLUMNS, batch_size,
+                   status=status, include_face_mesh=include_face_mesh)
+
+
+def stream_registered_cases(submitted_by: str = None, status: str = None,
+                            include_face_mesh: bool = False,
+                            batch_size: int = STREAM_BATCH_SIZE):
+    """Yield every registered case; same contract as stream_public_cases()."""
+    return _stream(RegisteredCases, REGISTERED_LIST_COLUMNS, batch_size,
+                   status=status, submitted_by=submitted_by,
+                   include_face_mesh=include_face_mesh)
+
+
 # ---------------------------------------------------------------------------
 # UPDATE helpers
 # ---------------------------------------------------------------------------
+@metrics.timed("traceai_db_query_seconds", helper="update_found_status")
 def update_found_status(register_case_id: str, public_case_id: str):
     """Mark a registered case as Found and link it to the matched public submission."""
     with Session(engine) as session:
@@ -208,14 +602,414 @@ def update_found_status(register_case_id: str, public_case_id: str):
 
         session.add(registered)
         session.add(public)
+        # Both rows leave the NF search space
+        session.add(IndexJournal(kind="registered", op="remove", record_id=registered.id))
+        session.add(IndexJournal(kind="public", op="remove", record_id=public.id))
+        _bump_case_set_version(session, registered.submitted_by)
         session.commit()
 
 
+# ---------------------------------------------------------------------------
+# Search-index journal
+# ---------------------------------------------------------------------------
+@metrics.timed("traceai_db_query_seconds", helper="fetch_index_journal")
+def fetch_index_journal(kind: str, after_seq: int = 0, limit: int = 10_000):
+    """Return (seq, op, record_id) journal rows for `kind` with seq > after_seq."""
+    with Session(engine) as session:
+        result = session.exec(
+            select(IndexJournal.seq, IndexJournal.op, IndexJournal.record_id)
+            .where(IndexJournal.kind == kind)
+            .where(IndexJournal.seq > after_seq)
+            .order_by(IndexJournal.seq)
+            .limit(limit)
+        ).all()
+        return result
+
+
+@metrics.timed("traceai_db_query_seconds", helper="get_case_set_version")
+def get_case_set_version(submitted_by: str) -> int:
+    """Return the current case-set version for a user (0 if never changed)."""
+    with Session(engine) as session:
+        version = session.exec(
+            select(CaseSetVersion.version).where(
+                CaseSetVersion.submitted_by == submitted_by
+            )
+        ).first()
+        return version or 0
+
+
+@metrics.timed("traceai_db_query_seconds", helper="get_index_journal_head")
+def get_index_journal_head() -> int:
+    """Return the latest journal sequence number (0 if the journal is empty)."""
+    with Session(engine) as session:
+        return session.exec(select(func.max(IndexJournal.seq))).one() or 0
+
+
+# ---------------------------------------------------------------------------
+# Incremental matching
+# ---------------------------------------------------------------------------
+# Tables the matcher keeps a watermark for, by kind
+MATCH_TABLES = {"registered": RegisteredCases, "public": PublicSubmissions}
+
+# Ids per IN (...) clause, well below SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 500
+
+
+@metrics.timed("traceai_db_query_seconds", helper="get_match_watermarks")
+def get_match_watermarks() -> dict:
+    """Return {kind: IndexJournal.seq} the matcher has scored up to."""
+    with Session(engine) as session:
+        rows = session.exec(select(MatchWatermark)).all()
+        return {row.kind: row.last_seq for row in rows}
+
+
+@metrics.timed("traceai_db_query_seconds", helper="get_match_scoring")
+def get_match_scoring() -> set:
+    """Return the distance spaces the stored watermarks were scored in."""
+    with Session(engine) as session:
+        return set(session.exec(select(MatchWatermark.scoring)).all())
+
+
+@metrics.timed("traceai_db_query_seconds", helper="get_match_heads")
+def get_match_heads() -> dict:
+    """
+    Return {kind: IndexJournal.seq} of the newest journal entry.
+
+    The journal is written in the inserting transaction and SQLite commits
+    one writer at a time, so every row added at or below the head is
+    visible, whatever its submitted_on.
+    """
+    head = get_index_journal_head()
+    return {kind: head for kind in MATCH_TABLES}
+
+
+@metrics.timed("traceai_db_query_seconds", helper="fetch_stale_match_ids")
+def fetch_stale_match_ids() -> list:
+    """
+    Return NF submissions with a stored candidate that is no longer NF.
+
+    Their nearest remaining case may be one that was never stored for
+    them, so the matcher scores them again from scratch.
+    """
+    with Session(engine) as session:
+        result = session.exec(
+            select(CandidateMatches.public_id)
+            .join(PublicSubmissions, PublicSubmissions.id == CandidateMatches.public_id)
+            .join(RegisteredCases, RegisteredCases.id == CandidateMatches.registered_id)
+            .where(PublicSubmissions.status == "NF")
+            .where(RegisteredCases.status != "NF")
+            .distinct()
+        ).all()
+        return list(result)
+
+
+@metrics.timed("traceai_db_query_seconds", helper="save_match_results")
+def save_match_results(rows, watermarks: dict, replace_public_ids=(), reset: bool = False,
+                       top_k: int = None, scoring: str = ""):
+    """
+    Store one match run in a single transaction.
+
+    Parameters
+    ----------
+    rows : iterable of (public_id, registered_id, distance, model_version)
+    watermarks : dict
+        {kind: IndexJournal.seq} the run has scored up to (None = skip).
+    replace_public_ids : list of str
+        Submissions that were re-scored; their previous candidates are dropped.
+    reset : bool
+        Drop every stored candidate and watermark first (full re-match).
+    top_k : int, optional
+        Afterwards keep only the `top_k` nearest candidates per submission.
+    scoring : str
+        Distance space of `rows`, stored with the watermarks.
+    """
+    now = datetime.utcnow()
+    candidates = CandidateMatches.__table__
+    with Session(engine) as session:
+        conn = session.connection()
+        if reset:
+            conn.execute(delete(candidates))
+            conn.execute(delete(MatchWatermark.__table__))
+
+        replace_public_ids = list(replace_public_ids)
+        for start in range(0, len(replace_public_ids), ID_CHUNK_SIZE):
+            chunk = replace_public_ids[start:start + ID_CHUNK_SIZE]
+            conn.execute(delete(candidates).where(candidates.c.public_id.in_(chunk)))
+
+        values = [
+            {"public_id": public_id, "registered_id": registered_id,
+             "distance": float(distance), "model_version": model_version,
+             "computed_at": now}
+            for public_id, registered_id, distance, model_version in rows
+        ]
+        if values:
+            conn.execute(candidates.insert(), values)
+            if top_k:
+                written = sorted({row["public_id"] for row in values})
+                for start in range(0, len(written), ID_CHUNK_SIZE):
+                    _prune_candidates(conn, top_k, written[start:start + ID_CHUNK_SIZE])
+
+        for kind, seq in watermarks.items():
+            if seq is None:
+                continue
+            conn.execute(
+                sqlite_insert(MatchWatermark.__table__)
+                .values(kind=kind, last_seq=seq, scoring=scoring, updated_on=now)
+                .on_conflict_do_update(
+                    index_elements=["kind"],
+                    set_={"last_seq": seq, "scoring": scoring, "updated_on": now},
+                )
+            )
+        session.commit()
+
+
+def _prune_candidates(conn, top_k: int, public_ids):
+    """
+    For the given submissions, delete candidates ranked below `top_k` and
+    older copies of a (submission, case) pair scored twice (e.g. by the
+    match worker and again by a batch run).
+
+    Only submissions that just received rows can exceed `top_k` or hold a
+    duplicate, so both window queries stay on their (public_id, distance)
+    index range instead of scanning the whole table.
+    """
+    candidates = CandidateMatches.__table__
+    written = candidates.c.public_id.in_(list(public_ids))
+    copies = select(
+        candidates.c.id,
+        func.row_number()
+        .over(partition_by=(candidates.c.public_id, candidates.c.registered_id),
+              order_by=candidates.c.id.desc())
+        .label("copy"),
+    ).where(written).subquery()
+    conn.execute(
+        delete(candidates).where(
+            candidates.c.id.in_(select(copies.c.id).where(copies.c.copy > 1))
+        )
+    )
+    ranked = select(
+        candidates.c.id,
+        func.row_number()
+        .over(partition_by=candidates.c.public_id,
+              order_by=(candidates.c.distance, candidates.c.id))
+        .label("rank"),
+    ).where(written).subquery()
+    conn.execute(
+        delete(candidates).where(
+            candidates.c.id.in_(select(ranked.c.id).where(ranked.c.rank > top_k))
+        )
+    )
+
+
+@metrics.timed("traceai_db_query_seconds", helper="fetch_candidates_for_public")
+def fetch_candidates_for_public(public_id: str, limit: int = None,
+                                open_only: bool = True):
+    """
+    Return stored CandidateMatches for one submission, nearest first.
+
+    With `open_only`, candidates whose case is no longer NF are skipped.
+    """
+    with Session(engine) as session:
+        query = select(CandidateMatches).where(CandidateMatches.public_id == public_id)
+        if open_only:
+            query = query.join(
+                RegisteredCases, RegisteredCases.id == CandidateMatches.registered_id
+            ).where(RegisteredCases.status == "NF")
+        result = session.exec(
+            query.order_by(CandidateMatches.distance).limit(limit)
+        ).all()
+        return result
+
+
+@metrics.timed("traceai_db_query_seconds", helper="fetch_candidates_for_registered")
+def fetch_candidates_for_registered(registered_id: str, limit: int = None,
+                                    open_only: bool = True):
+    """
+    Return stored CandidateMatches pointing at one case, nearest first.
+
+    With `open_only`, submissions that are no longer NF are skipped.
+    """
+    with Session(engine) as session:
+        query = select(CandidateMatches).where(
+            CandidateMatches.registered_id == registered_id
+        )
+        if open_only:
+            query = query.join(
+                PublicSubmissions, PublicSubmissions.id == CandidateMatches.public_id
+            ).where(PublicSubmissions.status == "NF")
+        result = session.exec(
+            query.order_by(CandidateMatches.distance).limit(limit)
+        ).all()
+        return result
+
+
+@metrics.timed("traceai_db_query_seconds", helper="fetch_best_matches")
+def fetch_best_matches():
+    """
+    Return (public_id, registered_id, distance) — the nearest stored NF case
+    for every NF submission.
+    """
+    with Session(engine) as session:
+        # SQLite fills bare columns from the row that holds the MIN()
+        result = session.exec(
+            select(
+                CandidateMatches.public_id,
+                CandidateMatches.registered_id,
+                func.min(CandidateMatches.distance),
+            )
+            .join(PublicSubmissions, PublicSubmissions.id == CandidateMatches.public_id)
+            .join(RegisteredCases, RegisteredCases.id == CandidateMatches.registered_id)
+            .where(PublicSubmissions.status == "NF")
+            .where(RegisteredCases.status == "NF")
+            .group_by(CandidateMatches.public_id)
+        ).all()
+        return result
+
+
+# ---------------------------------------------------------------------------
+# Match job queue (drained by ml/match_worker.py)
+# ---------------------------------------------------------------------------
+# Seconds a claimed job stays leased before another worker may take it
+MATCH_JOB_LEASE_S = 120
+# Claims before a job is parked as 'failed'
+MATCH_JOB_MAX_ATTEMPTS = 5
+# First retry delay in seconds, doubled on every further attempt
+MATCH_JOB_RETRY_DELAY_S = 5
+
+
+@metrics.timed("traceai_db_query_seconds", helper="enqueue_match_jobs")
+def enqueue_match_jobs(public_ids) -> int:
+    """Queue MatchJobs for existing submissions (backfills, bulk imports)."""
+    now = datetime.utcnow()
+    values = [{"public_id": public_id, "status": "queued", "attempts": 0,
+               "available_on": now, "enqueued_on": now} for public_id in public_ids]
+    if values:
+        with Session(engine) as session:
+            session.connection().execute(MatchJob.__table__.insert(), values)
+            session.commit()
+    return len(values)
+
+
+@metrics.timed("traceai_db_query_seconds", helper="claim_match_jobs")
+def claim_match_jobs(worker: str, limit: int, lease_s: float = MATCH_JOB_LEASE_S,
+                     max_attempts: int = MATCH_JOB_MAX_ATTEMPTS) -> list:
+    """
+    Lease up to `limit` available jobs, oldest first.
+
+    One UPDATE … RETURNING statement, so concurrent workers never claim the
+    same job twice. Running jobs whose lease expired after their last
+    allowed attempt (the worker died on them every time) are parked as
+    'failed' first.
+
+    Returns
+    -------
+    list of (job_id, public_id, attempts)
+    """
+    now = datetime.utcnow()
+    jobs = MatchJob.__table__
+    available = (jobs.c.status.in_(("queued", "running")), jobs.c.available_on <= now)
+    with Session(engine) as session:
+        conn = session.connection()
+        conn.execute(
+            update(jobs)
+            .where(*available, jobs.c.attempts >= max_attempts)
+            .values(status="failed", last_error="lease expired on the last attempt")
+        )
+        claimable = (
+            select(jobs.c.id).where(*available).order_by(jobs.c.id).limit(limit)
+        ).scalar_subquery()
+        claimed = conn.execute(
+            update(jobs)
+            .where(jobs.c.id.in_(claimable))
+            .values(status="running", attempts=jobs.c.attempts + 1, worker=worker,
+                    available_on=now + timedelta(seconds=lease_s))
+            .returning(jobs.c.id, jobs.c.public_id, jobs.c.attempts)
+        ).all()
+        session.commit()
+    return sorted(tuple(row) for row in claimed)
+
+
+@metrics.timed("traceai_db_query_seconds", helper="complete_match_jobs")
+def complete_match_jobs(job_ids):
+    """Delete finished jobs."""
+    job_ids = list(job_ids)
+    jobs = MatchJob.__table__
+    with Session(engine) as session:
+        conn = session.connection()
+        for start in range(0, len(job_ids), ID_CHUNK_SIZE):
+            conn.execute(delete(jobs).where(jobs.c.id.in_(job_ids[start:start + ID_CHUNK_SIZE])))
+        session.commit()
+
+
+@metrics.timed("traceai_db_query_seconds", helper="retry_match_jobs")
+def retry_match_jobs(jobs, error: str, worker: str,
+                     max_attempts: int = MATCH_JOB_MAX_ATTEMPTS,
+                     retry_delay_s: float = MATCH_JOB_RETRY_DELAY_S) -> int:
+    """
+    Release failed (job_id, attempts) pairs: back to 'queued' after an
+    exponential delay, or 'failed' once `max_attempts` is reached.
+
+    Only jobs still running under `worker`'s lease are touched: a job whose
+    lease expired and was claimed again (or completed) elsewhere is left
+    to its new owner.
+
+    Returns the number of jobs parked as 'failed'.
+    """
+    now = datetime.utcnow()
+    table = MatchJob.__table__
+    parked = 0
+    with Session(engine) as session:
+        conn = session.connection()
+        for job_id, attempts in jobs:
+            if attempts >= max_attempts:
+                values = {"status": "failed"}
+            else:
+                delay = retry_delay_s * 2 ** (attempts - 1)
+                values = {"status": "queued", "available_on": now + timedelta(seconds=delay)}
+            result = conn.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.worker == worker,
+                       table.c.status == "running", table.c.attempts == attempts)
+                .values(worker=None, last_error=error[:512], **values)
+            )
+            if values["status"] == "failed":
+                parked += result.rowcount
+        session.commit()
+    return parked
+
+
+@metrics.timed("traceai_db_query_seconds", helper="requeue_failed_match_jobs")
+def requeue_failed_match_jobs() -> int:
+    """Give every 'failed' job a fresh set of attempts; returns how many."""
+    table = MatchJob.__table__
+    with Session(engine) as session:
+        result = session.connection().execute(
+            update(table).where(table.c.status == "failed")
+            .values(status="queued", attempts=0, available_on=datetime.utcnow())
+        )
+        session.commit()
+        return result.rowcount
+
+
+@metrics.timed("traceai_db_query_seconds", helper="get_match_queue_stats")
+def get_match_queue_stats() -> dict:
+    """Jobs per status and the enqueue time of the oldest waiting job."""
+    with Session(engine) as session:
+        counts = dict(session.exec(
+            select(MatchJob.status, func.count()).group_by(MatchJob.status)
+        ).all())
+        oldest = session.exec(
+            select(func.min(MatchJob.enqueued_on)).where(MatchJob.status != "failed")
+        ).one()
+    return {"queued": counts.get("queued", 0), "running": counts.get("running", 0),
+            "failed": counts.get("failed", 0), "oldest": oldest}
+
+
 # ---------------------------------------------------------------------------
 # Quick self-test
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
     create_db()
     print("✅ Database and tables ready.")
-    print(f"   Registered cases (admin, NF): {len(get_registered_cases_count('admin', 'NF'))}")
+    print(f"   Registered cases (admin):     {get_case_status_counts('admin')}")
     print(f"   Public submissions:           {len(list_public_cases())}")
@@ -0,0 +1,338 @@
+"""
+=============================================================================
+  Week 3 — Backend Engineer
+  File: extract_pipeline.py
+  Purpose: Offline, multi-process face-mesh extraction of archived photos
+           straight into the database.
+=============================================================================
+
+Legacy case photos could only enter the system one upload at a time through
+the UI. This CLI backfills a whole archive:
+
+  1. input    — every image under a directory, or a CSV / JSONL manifest
+                (bulk_import.py format) whose `image` column names each photo
+                relative to the manifest, next to the other table columns;
+  2. extract  — a pool of worker processes, each holding ONE long-lived
+                MediaPipe FaceMesh, decodes the photo with Pillow (EXIF
+                upright, downscaled to MAX_IMAGE_SIDE) and extracts the
+                1404-value vector (face_extraction.extract_face_mesh);
+  3. output   — vectors stream into db_queries.bulk_register_cases() /
+                bulk_new_public_cases(): one executemany + commit per batch,
+                with IndexJournal rows and face_mesh_norm as usual.
+
+Every photo gets a deterministic id (uuid5 of the kind and its path), and a
+checkpoint file (JSONL) records each photo once its row is committed, or
+once it failed (no face / unreadable). The FaceMesh model is loaded before
+any photo is read: a missing mediapipe or a model that fails to start
+aborts the run instead of checkpointing every photo as failed. `--resume` skips checkpointed photos
+and any id already in the table, so a crash or Ctrl-C costs at most one
+uncommitted batch. Progress (photos/s, ETA, failures) is printed every
+PROGRESS_INTERVAL_S seconds.
+
+Usage:
+    python extract_pipeline.py registered /archive/photos --set submitted_by=archive
+    python extract_pipeline.py registered cases.csv --workers 8 --resume
+    python extract_pipeline.py public sightings.jsonl --max-side 640 --no-journal
+=============================================================================
+"""
+
+import os
+import json
+import time
+import uuid
+import argparse
+import multiprocessing
+
+from data_models import RegisteredCases
+from bulk_import import IMPORTERS, clean_record, read_records
+from db_queries import BULK_BATCH_SIZE, fetch_existing_ids
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+# Longest image side fed to FaceMesh; its detector works at ~200 px, so
+# larger photos only cost decode time
+MAX_IMAGE_SIDE = 800
+# Photos handed to a worker at a time
+WORKER_CHUNKSIZE = 8
+PROGRESS_INTERVAL_S = 10
+# Namespace of the deterministic row ids
+ID_NAMESPACE = uuid.UUID("6f1d4c8e-2b7a-4f3e-9c51-0a8e5d2b7c14")
+
+
+# ---------------------------------------------------------------------------
+# Stage 1 — input
+# ---------------------------------------------------------------------------
+def scan_directory(root: str):
+    """Yield (key, image path, record) for every image under `root`."""
+    for folder, _, files in os.walk(root):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(folder, name)
+                key = os.path.relpath(path, root)
+                yield key, path, {"name": os.path.splitext(name)[0]}
+
+
+def scan_manifest(path: str):
+    """Yield (key, image path, record) for every manifest row with an `image`."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for line_number, record in read_records(path):
+        image = record.pop("image", None)
+        if not image:
+            print(f"   ⚠️  line {line_number} skipped: missing image")
+            continue
+        yield image, os.path.join(base_dir, image), record
+
+
+def record_id(kind: str, key: str) -> str:
+    """Stable row id for a photo, so re-runs never insert it twice."""
+    return str(uuid.uuid5(ID_NAMESPACE, f"{kind}:{key}"))
+
+
+# ---------------------------------------------------------------------------
+# Stage 2 — extraction workers
+# ---------------------------------------------------------------------------
+class ExtractorUnavailable(RuntimeError):
+    """A worker could not load FaceMesh; no photo can be extracted."""
+
+
+# Set in a worker whose FaceMesh failed to load
+_init_error = None
+
+
+def _init_worker():
+    """
+    Load the worker's FaceMesh once, before its first photo.
+
+    A failure is remembered rather than raised: a pool re-spawns workers
+    whose initializer raises, forever. _extract_one reports it instead.
+    """
+    global _init_error
+    import face_extraction
+
+    try:
+        face_extraction._get_face_mesh_model()
+    except Exception as e:
+        _init_error = f"{type(e).__name__}: {e}"
+
+
+def _extract_one(job):
+    """
+    (key, packed vector or None, error message or None) for one photo.
+
+    Only image-level failures (unreadable / undecodable file, no face) are
+    returned as errors; anything else means the extractor itself is broken
+    and is raised.
+    """
+    import face_extraction
+    from PIL import Image
+
+    if _init_error:
+        raise ExtractorUnavailable(f"FaceMesh failed to load in a worker: {_init_error}")
+    key, path, max_side = job
+    try:
+        with open(path, "rb") as f:
+            face_mesh = face_extraction.extract_face_mesh(f.read(), max_side=max_side)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:  # unreadable / corrupt image
+        return key, None, f"{type(e).__name__}: {e}"
+    if face_mesh is None:
+        return key, None, "no face found"
+    return key, face_mesh.tobytes(), None
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+def read_checkpoint(path: str) -> set:
+    """Keys of photos already committed or failed in an earlier run."""
+    if not os.path.isfile(path):
+        return set()
+    done = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                pass  # torn last line from a crash
+    return done
+
+
+class Checkpoint:
+    """Append-only JSONL of finished photos, flushed to disk per write."""
+
+    def __init__(self, path: str):
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, entries):
+        for key, status, error in entries:
+            self.file.write(json.dumps({"key": key, "status": status, "error": error}) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+# ---------------------------------------------------------------------------
+# Stage 3 — pipeline
+# ---------------------------------------------------------------------------
+def run_pipeline(kind: str, source: str, checkpoint_path: str = None, resume: bool = False,
+                 workers: int = None, max_side: int = MAX_IMAGE_SIDE,
+                 batch_size: int = BULK_BATCH_SIZE, journal: bool = True,
+                 defaults: dict = None) -> dict:
+    """
+    Extract and insert every photo of `source` (directory or manifest).
+
+    Returns a dict of counts ('photos', 'inserted', 'no_face', 'errors',
+    'skipped' by resume) and timing.
+    """
+    import face_extraction
+
+    model, bulk_insert = IMPORTERS[kind]
+    workers = workers or os.cpu_count() or 1
+    checkpoint_path = checkpoint_path or f"{source.rstrip(os.sep)}.{kind}.checkpoint.jsonl"
+    if not resume and os.path.isfile(checkpoint_path):
+        return {"status": False,
+                "message": f"{checkpoint_path} exists; pass --resume or delete it."}
+
+    # Fail fast if the extractor cannot run at all (e.g. mediapipe missing)
+    try:
+        face_extraction._get_face_mesh_model()
+    except Exception as e:
+        return {"status": False, "message": f"FaceMesh could not be loaded: {e}"}
+
+    # -- stage 1: work list (minus what earlier runs finished) ------------------
+    scan = scan_directory if os.path.isdir(source) else scan_manifest
+    records = {}
+    for key, path, record in scan(source):
+        record = {**(defaults or {}), **record}
+        record["id"] = record.get("id") or record_id(kind, key)
+        records[key] = (path, record)
+    photos = len(records)
+    skipped = 0
+    if resume:
+        done = read_checkpoint(checkpoint_path)
+        stored = fetch_existing_ids(kind, [record["id"] for _, record in records.values()])
+        for key in [k for k, (_, r) in records.items() if k in done or r["id"] in stored]:
+            del records[key]
+            skipped += 1
+    print(f"🔄 {photos:,} photos, {skipped:,} already done, {len(records):,} to extract "
+          f"on {workers} worker(s)…")
+
+    counts = {"no_face": 0, "errors": 0}
+    pending = []        # keys handed to the bulk insert, not yet committed
+    committed = [0]
+    checkpoint = Checkpoint(checkpoint_path)
+    base_dir = os.path.dirname(os.path.abspath(source))
+
+    def on_batch(total):
+        checkpoint.write((key, "inserted", None) for key in pending[:total - committed[0]])
+        del pending[:total - committed[0]]
+        committed[0] = total
+        print(f"   📥 {total:,} rows committed…")
+
+    def rows(results):
+        start = last_report = time.perf_counter()
+        for finished, (key, face_mesh, error) in enumerate(results, start=1):
+            path, record = records.pop(key)
+            if face_mesh is not None and model is RegisteredCases \
+                    and not (record.get("submitted_by") and record.get("name")):
+                error = "missing submitted_by / name"
+            elif face_mesh is not None:
+                try:
+                    row = clean_record(model, {**record, "face_mesh": face_mesh}, base_dir)
+                except (ValueError, TypeError, OSError) as e:
+                    error = str(e)
+            if error:
+                counts["no_face" if error == "no face found" else "errors"] += 1
+                checkpoint.write([(key, "failed", error)])
+            else:
+                pending.append(key)
+                yield row
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL_S:
+                last_report = now
+                rate = finished / (now - start)
+                remaining = len(records) / rate if rate else 0.0
+                print(f"   ⏱️  {finished:,}/{finished + len(records):,} photos "
+                      f"({rate:,.1f}/s, ETA {remaining / 60:,.1f} min), "
+                      f"{counts['no_face']:,} without a face, {counts['errors']:,} errors")
+
+    jobs = [(key, path, max_side) for key, (path, _) in records.items()]
+    start = time.perf_counter()
+    try:
+        if workers > 1:
+            # spawn: workers never inherit the parent's open DB connections
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(workers, initializer=_init_worker) as pool:
+                inserted = bulk_insert(
+                    rows(pool.imap_unordered(_extract_one, jobs, chunksize=WORKER_CHUNKSIZE)),
+                    batch_size=batch_size, journal=journal, on_batch=on_batch,
+                )
+        else:
+            inserted = bulk_insert(rows(map(_extract_one, jobs)), batch_size=batch_size,
+                                   journal=journal, on_batch=on_batch)
+    except ExtractorUnavailable as e:
+        # Committed batches are checkpointed; --resume continues from them
+        return {"status": False, "message": str(e)}
+    finally:
+        checkpoint.close()
+    seconds = time.perf_counter() - start
+
+    return {
+        "status": True,
+        "kind": kind,
+        "photos": photos,
+        "skipped": skipped,
+        "inserted": inserted,
+        "no_face": counts["no_face"],
+        "errors": counts["errors"],
+        "checkpoint": checkpoint_path,
+        "seconds": seconds,
+        "photos_per_second": len(jobs) / seconds if seconds else 0.0,
+    }
+
+
+def _parse_defaults(pairs) -> dict:
+    defaults = {}
+    for pair in pairs or ():
+        column, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--set expects column=value, got {pair!r}")
+        defaults[column] = value
+    return defaults
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract face meshes from archived photos "
+                                                 "into the database.")
+    parser.add_argument("kind", choices=sorted(IMPORTERS))
+    parser.add_argument("source", help="Photo directory, or CSV / JSONL manifest with an "
+                                       "`image` column.")
+    parser.add_argument("--set", dest="defaults", action="append", metavar="COLUMN=VALUE",
+                        help="Column value for every row (e.g. submitted_by=archive).")
+    parser.add_argument("--workers", type=int, default=None, help="Default: CPU count.")
+    parser.add_argument("--max-side", type=int, default=MAX_IMAGE_SIDE)
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=None,
+                        help="Default: <source>.<kind>.checkpoint.jsonl")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip photos finished by an earlier run.")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="Skip IndexJournal rows (rebuild the ML indexes and run "
+                             "baseline_match.py --full afterwards).")
+    args = parser.parse_args()
+
+    report = run_pipeline(args.kind, args.source, args.checkpoint, args.resume, args.workers,
+                          args.max_side, args.batch_size, not args.no_journal,
+                          _parse_defaults(args.defaults))
+    if not report["status"]:
+        print(f"❌ {report['message']}")
+        raise SystemExit(1)
+    print(
+        f"\n✅ {report['inserted']:,} {args.kind} rows from {report['photos']:,} photos in "
+        f"{report['seconds']:.1f} s ({report['photos_per_second']:,.1f} photos/s); "
+        f"{report['no_face']:,} without a face, {report['errors']:,} errors, "
+        f"{report['skipped']:,} skipped from earlier runs."
+    )
+    print(f"   Checkpoint: {report['checkpoint']}")
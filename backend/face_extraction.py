@@ -0,0 +1,306 @@
+"""
+=============================================================================
+  Week 3 — Backend Engineer
+  File: face_extraction.py
+  Purpose: Face-mesh extraction with a disk cache keyed by image content.
+=============================================================================
+
+Streamlit reruns the whole page script on every widget interaction, so the
+Register New Case and mobile submission pages ran MediaPipe FaceMesh
+(~100 ms+ per photo) again for a photo they had already processed. Uploading
+the same photo twice did the same.
+
+`get_face_mesh(image)` hashes the uploaded bytes (SHA-256) and looks the
+digest up in a small SQLite cache file (CACHE_URL) before calling MediaPipe.
+A hit returns the stored 1404-value float32 vector — the layout
+`db_queries.pack_face_mesh()` stores in RegisteredCases / PublicSubmissions
+`face_mesh` — without decoding the image at all. Photos in which no face was
+found are cached too, so the "no face detected" message does not re-run
+inference either.
+
+The cache is bounded to CACHE_MAX_BYTES: once a new entry pushes it over,
+the least recently used entries are evicted down to CACHE_EVICT_TO of the
+limit. Keys include EXTRACTOR_VERSION, so changing the FaceMesh settings
+starts a fresh set of entries instead of serving stale vectors.
+
+Usage:
+    from face_extraction import get_face_mesh
+    face_mesh = get_face_mesh(uploaded_file)   # np.ndarray (1404,) or None
+    python face_extraction.py photo1.jpg photo2.jpg
+    python face_extraction.py --stats
+=============================================================================
+"""
+
+import io
+import time
+import hashlib
+import argparse
+import threading
+
+import numpy as np
+from sqlalchemy import text
+
+import metrics
+from db_engine import make_engine
+from data_models import FACE_MESH_DIM, FACE_MESH_DTYPE
+
+
+# Cache file (next to sqlite_database.db; deleting it only costs re-extraction)
+CACHE_URL = "sqlite:///face_mesh_cache.db"
+# Upper bound on cached bytes, vectors plus keys (~5.7 KB each → ~45k photos)
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Fraction of CACHE_MAX_BYTES kept after an eviction pass
+CACHE_EVICT_TO = 0.9
+# A hit refreshes last_used at most this often (seconds), so reruns of the
+# same photo do not turn every read into a write
+TOUCH_INTERVAL_S = 60
+
+# FaceMesh / decoding settings; bump EXTRACTOR_VERSION whenever they change
+EXTRACTOR_VERSION = "facemesh-468-v2"
+MIN_DETECTION_CONFIDENCE = 0.5
+
+_cache = None
+_face_mesh = None
+# MediaPipe graphs are not thread-safe and Streamlit sessions are threads
+_extract_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Extraction (MediaPipe)
+# ---------------------------------------------------------------------------
+def _image_bytes(image) -> bytes:
+    """Raw bytes of a Streamlit UploadedFile, a file object, a path or bytes."""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return bytes(image)
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            return f.read()
+    if hasattr(image, "getvalue"):
+        return image.getvalue()
+    return image.read()
+
+
+def image_key(image_bytes: bytes) -> str:
+    """Cache key: SHA-256 of the image bytes under the current extractor."""
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{EXTRACTOR_VERSION}:{digest}"
+
+
+def _get_face_mesh_model():
+    """The shared MediaPipe FaceMesh graph, created on first use."""
+    global _face_mesh
+    if _face_mesh is None:
+        try:
+            import mediapipe as mp
+        except ImportError as e:
+            raise ImportError("Face-mesh extraction needs mediapipe "
+                              "(pip install -r requirements.txt).") from e
+        _face_mesh = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=True,
+            max_num_faces=1,
+            refine_landmarks=False,
+            min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+        )
+    return _face_mesh
+
+
+def decode_image(image_bytes: bytes, max_side: int = None) -> np.ndarray:
+    """
+    Decode an encoded image to an RGB uint8 array, upright per its EXIF tag.
+
+    With `max_side`, the image is shrunk (aspect kept) so neither side
+    exceeds it; JPEGs are decoded at reduced size directly. FaceMesh
+    landmarks are relative to the image size, so this only saves time.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        if max_side:
+            img.draft("RGB", (max_side, max_side))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        if max_side:
+            img.thumbnail((max_side, max_side))
+        return np.asarray(img)
+
+
+def extract_face_mesh(image_bytes: bytes, max_side: int = None):
+    """
+    Run MediaPipe FaceMesh on an encoded image (no cache).
+
+    Returns
+    -------
+    np.ndarray of FACE_MESH_DIM float32 values (468 landmarks × x, y, z),
+    or None if the image holds no detectable face.
+    """
+    pixels = decode_image(image_bytes, max_side)
+    model = _get_face_mesh_model()
+    with _extract_lock:
+        results = model.process(pixels)
+    if not results.multi_face_landmarks:
+        return None
+    landmarks = results.multi_face_landmarks[0].landmark
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks],
+                    dtype=FACE_MESH_DTYPE).ravel()[:FACE_MESH_DIM]
+
+
+# ---------------------------------------------------------------------------
+# Disk cache
+# ---------------------------------------------------------------------------
+class FaceMeshCache:
+    """
+    SQLite table of image key → packed face-mesh vector (NULL = no face),
+    with least-recently-used eviction above `max_bytes`.
+    """
+
+    def __init__(self, url: str = CACHE_URL, max_bytes: int = CACHE_MAX_BYTES):
+        self.engine = make_engine(url)
+        self.max_bytes = max_bytes
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS face_mesh_cache ("
+                " key TEXT PRIMARY KEY,"
+                " face_mesh BLOB,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_face_mesh_cache_last_used"
+                " ON face_mesh_cache (last_used)"
+            ))
+
+    def get(self, key: str):
+        """(found, vector) — vector is None for a cached "no face" result."""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT face_mesh, last_used FROM face_mesh_cache WHERE key = :key"),
+                {"key": key},
+            ).first()
+        if row is None:
+            return False, None
+        now = time.time()
+        if now - row.last_used > TOUCH_INTERVAL_S:
+            with self.engine.begin() as conn:
+                conn.execute(text("UPDATE face_mesh_cache SET last_used = :now WHERE key = :key"),
+                             {"now": now, "key": key})
+        if row.face_mesh is None:
+            return True, None
+        return True, np.frombuffer(row.face_mesh, dtype=FACE_MESH_DTYPE)
+
+    def put(self, key: str, face_mesh):
+        """Store a vector (or None for "no face") and evict if over budget."""
+        blob = None if face_mesh is None else np.asarray(
+            face_mesh, dtype=FACE_MESH_DTYPE).tobytes()
+        now = time.time()
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "INSERT OR REPLACE INTO face_mesh_cache"
+                " (key, face_mesh, size, created_at, last_used)"
+                " VALUES (:key, :blob, :size, :now, :now)"
+            ), {"key": key, "blob": blob, "size": len(blob or b"") + len(key), "now": now})
+            total = conn.execute(text("SELECT COALESCE(SUM(size), 0) FROM face_mesh_cache")).scalar()
+            if total > self.max_bytes:
+                self._evict(conn, total - int(self.max_bytes * CACHE_EVICT_TO))
+
+    @staticmethod
+    def _evict(conn, excess: int):
+        """Delete least recently used entries until `excess` bytes are freed."""
+        freed, keys = 0, []
+        rows = conn.execute(text(
+            "SELECT key, size FROM face_mesh_cache ORDER BY last_used"
+        ))
+        for row in rows:
+            if freed >= excess:
+                break
+            keys.append(row.key)
+            freed += row.size
+        rows.close()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            params = {f"k{i}": key for i, key in enumerate(chunk)}
+            conn.execute(text(
+                f"DELETE FROM face_mesh_cache WHERE key IN ({', '.join(':' + p for p in params)})"
+            ), params)
+        metrics.inc("traceai_face_mesh_cache_evictions_total", len(keys))
+
+    def stats(self) -> dict:
+        with self.engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes,"
+                " COALESCE(SUM(face_mesh IS NULL), 0) AS no_face FROM face_mesh_cache"
+            )).first()
+        return {"entries": row.entries, "no_face": row.no_face, "bytes": row.bytes,
+                "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM face_mesh_cache"))
+
+
+def get_cache() -> FaceMeshCache:
+    """The process-wide cache, opened on first use."""
+    global _cache
+    if _cache is None:
+        _cache = FaceMeshCache()
+    return _cache
+
+
+# ---------------------------------------------------------------------------
+# Cached extraction (what the pages call)
+# ---------------------------------------------------------------------------
+def get_face_mesh(image, use_cache: bool = True):
+    """
+    Face-mesh vector for an uploaded photo, from the cache when possible.
+
+    `image` is a Streamlit UploadedFile, file object, path or raw bytes.
+    Returns a read-only (1404,) float32 array ready for `face_mesh`, or None
+    if no face was found. Cache errors never block extraction.
+    """
+    image_bytes = _image_bytes(image)
+    key = image_key(image_bytes)
+
+    if use_cache:
+        try:
+            found, face_mesh = get_cache().get(key)
+        except Exception as e:
+            print(f"⚠️  Face-mesh cache unavailable: {e}")
+            found, use_cache = False, False
+        if found:
+            metrics.inc("traceai_face_mesh_cache_total", result="hit")
+            return face_mesh
+        metrics.inc("traceai_face_mesh_cache_total", result="miss")
+
+    with metrics.span("traceai_stage_seconds", stage="extract"):
+        face_mesh = extract_face_mesh(image_bytes)
+
+    if use_cache:
+        try:
+            get_cache().put(key, face_mesh)
+        except Exception as e:
+            print(f"⚠️  Could not cache face mesh: {e}")
+    return face_mesh
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cached face-mesh extraction.")
+    parser.add_argument("images", nargs="*", help="Photos to extract (twice, to show hits).")
+    parser.add_argument("--stats", action="store_true", help="Print cache size and exit.")
+    parser.add_argument("--clear", action="store_true", help="Empty the cache and exit.")
+    args = parser.parse_args()
+
+    cache = get_cache()
+    if args.clear:
+        cache.clear()
+        print("✅ Face-mesh cache cleared.")
+    elif args.stats or not args.images:
+        stats = cache.stats()
+        print(f"   Entries   : {stats['entries']:,} ({stats['no_face']:,} without a face)")
+        print(f"   Size      : {stats['bytes'] / 1e6:.1f} MB of {stats['max_bytes'] / 1e6:.0f} MB")
+    else:
+        for path in args.images:
+            for attempt in ("first", "again"):
+                start = time.perf_counter()
+                face_mesh = get_face_mesh(path)
+                ms = (time.perf_counter() - start) * 1000
+                status = "no face" if face_mesh is None else f"{face_mesh.size} values"
+                print(f"   {path:<40} {attempt:<6} {ms:>8.1f} ms  {status}")
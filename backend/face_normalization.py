@@ -0,0 +1,187 @@
+"""
+=============================================================================
+  Week 3 — Backend Engineer
+  File: face_normalization.py
+  Purpose: Pose-independent face-mesh vectors, computed once at ingest.
+=============================================================================
+
+Raw MediaPipe landmarks depend on where the face sits in the photo, how
+large it is and how the head is rolled, so two photos of the same person
+can be far apart in raw coordinates. Every vector is normalized by:
+
+  1. centering   — subtract the centroid of the 468 landmarks;
+  2. scale       — divide by the RMS landmark distance from the centroid;
+  3. alignment   — rotate onto the canonical mesh with orthogonal
+                   Procrustes (SVD of the 3×3 cross-covariance, reflections
+                   excluded).
+
+The canonical mesh is, in order of preference:
+  - backend/canonical_face_mesh.npy (built from the registered cases with
+    `python face_normalization.py --build-canonical`), or
+  - MediaPipe's canonical_face_model.obj, when mediapipe is installed.
+Without either, step 3 aligns each mesh to its own principal axes instead
+(a deterministic frame that removes roll but is less stable than a
+template).
+
+`db_queries` stores the result in the `face_mesh_norm` column next to the
+raw `face_mesh` when a case or submission is saved, so matching reads it
+instead of recomputing it. After changing the canonical mesh, recompute the
+stored vectors with `python migrations.py --renormalize`.
+
+Usage:
+    from face_normalization import normalize_face_mesh
+    normalized = normalize_face_mesh(raw_vector)        # (1404,) float32
+    python face_normalization.py --build-canonical
+=============================================================================
+"""
+
+import os
+import argparse
+
+import numpy as np
+
+from data_models import FACE_MESH_DIM
+
+N_LANDMARKS = FACE_MESH_DIM // 3
+CANONICAL_MESH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "canonical_face_mesh.npy")
+
+# Generalized Procrustes rounds when building the canonical mesh
+CANONICAL_ITERATIONS = 5
+# Cases sampled for the canonical mesh
+CANONICAL_SAMPLE = 5_000
+
+_canonical = None
+_canonical_loaded = False
+
+
+# ---------------------------------------------------------------------------
+# Canonical mesh
+# ---------------------------------------------------------------------------
+def _mediapipe_canonical():
+    """Vertices of MediaPipe's canonical face model, or None if unavailable."""
+    try:
+        import mediapipe
+    except ImportError:
+        return None
+    path = os.path.join(os.path.dirname(mediapipe.__file__), "modules", "face_geometry",
+                        "data", "canonical_face_model.obj")
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        vertices = [line.split()[1:4] for line in f if line.startswith("v ")]
+    if len(vertices) < N_LANDMARKS:
+        return None
+    return np.asarray(vertices[:N_LANDMARKS], dtype=np.float64)
+
+
+def _center_and_scale(points):
+    """Center (m, 468, 3) point sets and scale them to unit RMS radius."""
+    points = points - points.mean(axis=1, keepdims=True)
+    scale = np.sqrt((points ** 2).sum(axis=(1, 2)) / N_LANDMARKS)
+    return points / np.where(scale > 0, scale, 1.0)[:, None, None]
+
+
+def load_canonical_mesh(reload: bool = False):
+    """The (468, 3) centered, unit-scale canonical mesh, or None."""
+    global _canonical, _canonical_loaded
+    if reload or not _canonical_loaded:
+        if os.path.isfile(CANONICAL_MESH_PATH):
+            mesh = np.load(CANONICAL_MESH_PATH).astype(np.float64)
+        else:
+            mesh = _mediapipe_canonical()
+        _canonical = None if mesh is None else _center_and_scale(mesh[None])[0]
+        _canonical_loaded = True
+    return _canonical
+
+
+# ---------------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------------
+def _rotations_onto(points, target):
+    """Proper rotations R (m, 3, 3) minimizing ||points[i] @ R[i] - target||."""
+    u, _, vt = np.linalg.svd(np.einsum("mni,nj->mij", points, target))
+    # Flip the last axis where the best orthogonal map is a reflection
+    d = np.sign(np.linalg.det(u @ vt))
+    u[:, :, 2] *= np.where(d == 0, 1.0, d)[:, None]
+    return u @ vt
+
+
+def _principal_axes_rotations(points):
+    """Rotations onto each point set's own principal axes (no template)."""
+    _, vectors = np.linalg.eigh(np.einsum("mni,mnj->mij", points, points))
+    vectors = vectors[:, :, ::-1]  # largest spread first
+    # Orient every axis so the landmark distribution is positively skewed
+    skew = np.einsum("mni->mi", np.einsum("mnj,mji->mni", points, vectors) ** 3)
+    vectors *= np.where(skew < 0, -1.0, 1.0)[:, None, :]
+    d = np.sign(np.linalg.det(vectors))
+    vectors[:, :, 2] *= np.where(d == 0, 1.0, d)[:, None]
+    return vectors
+
+
+def normalize_face_meshes(vectors, canonical=None) -> np.ndarray:
+    """
+    Normalize (m, 1404) raw face-mesh vectors; returns (m, 1404) float32.
+
+    `canonical` defaults to load_canonical_mesh(). A degenerate mesh (all
+    landmarks equal) normalizes to zeros.
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+    if canonical is None:
+        canonical = load_canonical_mesh()
+    points = _center_and_scale(vectors.reshape(len(vectors), N_LANDMARKS, 3))
+    if canonical is not None:
+        rotations = _rotations_onto(points, canonical)
+    else:
+        rotations = _principal_axes_rotations(points)
+    aligned = np.einsum("mni,mij->mnj", points, rotations)
+    return aligned.reshape(len(vectors), FACE_MESH_DIM).astype(np.float32)
+
+
+def normalize_face_mesh(vector, canonical=None) -> np.ndarray:
+    """Normalize one raw face-mesh vector; returns (1404,) float32."""
+    return normalize_face_meshes(np.ravel(vector)[None], canonical)[0]
+
+
+def build_canonical_mesh(vectors, iterations: int = CANONICAL_ITERATIONS):
+    """
+    Generalized Procrustes mean of (n, 1404) raw vectors: start from the
+    principal-axes frame, then repeatedly align every mesh to the current
+    mean and re-average.
+    """
+    points = _center_and_scale(
+        np.asarray(vectors, dtype=np.float64).reshape(len(vectors), N_LANDMARKS, 3)
+    )
+    mean = np.einsum("mni,mij->nj", points, _principal_axes_rotations(points)) / len(points)
+    for _ in range(iterations):
+        mean = _center_and_scale(mean[None])[0]
+        mean = np.einsum("mni,mij->nj", points, _rotations_onto(points, mean)) / len(points)
+    return _center_and_scale(mean[None])[0].astype(np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Face-mesh normalization utilities.")
+    parser.add_argument("--build-canonical", action="store_true",
+                        help=f"Fit {os.path.basename(CANONICAL_MESH_PATH)} from registered cases.")
+    parser.add_argument("--sample", type=int, default=CANONICAL_SAMPLE)
+    args = parser.parse_args()
+
+    if args.build_canonical:
+        from sqlmodel import Session, select
+        from data_models import RegisteredCases
+        from db_queries import engine, unpack_face_mesh
+
+        with Session(engine) as session:
+            blobs = session.exec(
+                select(RegisteredCases.face_mesh).order_by(RegisteredCases.id).limit(args.sample)
+            ).all()
+        if len(blobs) < 2:
+            raise SystemExit("❌ Need at least two registered cases.")
+        mesh = build_canonical_mesh(np.stack([unpack_face_mesh(b) for b in blobs]))
+        np.save(CANONICAL_MESH_PATH, mesh)
+        print(f"✅ Canonical mesh from {len(blobs):,} cases written to {CANONICAL_MESH_PATH}")
+        print("   Run `python migrations.py --renormalize` to refresh stored vectors.")
+    else:
+        source = ("file" if os.path.isfile(CANONICAL_MESH_PATH)
+                  else "mediapipe" if load_canonical_mesh() is not None else "principal axes")
+        print(f"ℹ️  Alignment target: {source}")
@@ -0,0 +1,256 @@
+"""
+=============================================================================
+  Week 2 — Backend Engineer
+  File: metrics.py
+  Purpose: Lightweight timers, counters and histograms for the hot paths.
+=============================================================================
+
+A slow match could come from the DB fetch, blob decoding, model fitting or
+the search itself; nothing used to tell them apart. This module records:
+
+  - timers   → `@timed(name, **labels)` / `with span(name, **labels):`
+               stored as histograms of seconds
+  - counters → `inc(name, value, **labels)` (rows scanned, matches produced)
+  - histograms → `observe(name, values, **labels)` (e.g. match distances)
+
+and renders them in the Prometheus text exposition format, either to a file
+(`write_prometheus`, e.g. for node_exporter's textfile collector) or over
+HTTP (`serve`).
+
+Metrics are OFF unless `TRACEAI_METRICS=1` is set or `enable()` is called.
+While disabled every entry point returns after one flag check, and `span`
+returns a shared no-op context manager, so the instrumentation can stay in
+the hot paths permanently.
+
+Usage:
+    import metrics
+    metrics.enable()
+
+    @metrics.timed("traceai_db_query_seconds", helper="fetch_cases")
+    def fetch_cases(): ...
+
+    with metrics.span("traceai_stage_seconds", stage="search"):
+        ...
+    metrics.inc("traceai_rows_scanned_total", len(rows), source="registered")
+    metrics.write_prometheus("/var/lib/node_exporter/traceai.prom")
+=============================================================================
+"""
+
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import wraps
+
+import numpy as np
+
+
+# Default histogram bucket upper bounds
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DISTANCE_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0,
+                    5.0, 7.5, 10.0, 15.0, 20.0)
+
+_enabled = os.environ.get("TRACEAI_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_counters = {}     # (name, labels) → float
+_histograms = {}   # (name, labels) → [counts per bucket (+Inf last), sum]
+_buckets = {}      # name → bucket bounds
+_NOOP = nullcontext()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Forget every recorded value (tests / benchmarks)."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted(labels.items()))
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+def inc(name: str, value: float = 1, **labels):
+    """Add `value` to the counter `name{labels}`."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, values, buckets=SECONDS_BUCKETS, **labels):
+    """
+    Record one value or an array of values in the histogram `name{labels}`.
+
+    Arrays are bucketed in one vectorized pass. The first call for a name
+    fixes its buckets.
+    """
+    if not _enabled:
+        return
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if values.size == 0:
+        return
+    key = _key(name, labels)
+    with _lock:
+        bounds = _buckets.setdefault(name, tuple(buckets))
+        if values.size == 1:
+            counts = np.zeros(len(bounds) + 1, dtype=np.int64)
+            counts[bisect_left(bounds, values[0])] += 1
+        else:
+            counts = np.bincount(
+                np.searchsorted(bounds, values, side="left"), minlength=len(bounds) + 1
+            )
+        state = _histograms.get(key)
+        if state is None:
+            state = _histograms[key] = [np.zeros(len(bounds) + 1, dtype=np.int64), 0.0]
+        state[0] += counts
+        state[1] += float(values.sum())
+
+
+class _Span:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, labels: dict):
+        self.name, self.labels = name, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def span(name: str, **labels):
+    """Context manager timing its body into the histogram `name{labels}`."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name, labels)
+
+
+def timed(name: str, **labels):
+    """Decorator timing every call of the function into `name{labels}`."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def snapshot() -> dict:
+    """Plain-dict copy of every metric (for JSON reports)."""
+    with _lock:
+        return {
+            "counters": {
+                f"{name}{_format_labels(labels)}": value
+                for (name, labels), value in _counters.items()
+            },
+            "histograms": {
+                f"{name}{_format_labels(labels)}": {
+                    "count": int(state[0].sum()), "sum": state[1],
+                }
+                for (name, labels), state in _histograms.items()
+            },
+        }
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    with _lock:
+        for name in sorted({n for n, _ in _counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (n, labels), value in sorted(_counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name in sorted({n for n, _ in _histograms}):
+            bounds = _buckets[name]
+            lines.append(f"# TYPE {name} histogram")
+            for (n, labels), (counts, total) in sorted(_histograms.items()):
+                if n != name:
+                    continue
+                cumulative = np.cumsum(counts)
+                for bound, count in zip((*bounds, "+Inf"), cumulative):
+                    le = bound if bound == "+Inf" else f"{bound:g}"
+                    lines.append(
+                        f"{name}_bucket{_format_labels(labels, [('le', le)])} {count}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str):
+    """Write the current metrics to `path` atomically (textfile collector)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+def serve(port: int = 9108, host: str = "127.0.0.1"):
+    """Serve /metrics over HTTP from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
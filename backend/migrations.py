@@ -8,24 +8,186 @@
 Run this script once to ensure the SQLite database and all tables exist.
 It is safe to run multiple times (CREATE IF NOT EXISTS semantics).
 
+Migrations applied:
+  1. Create all tables defined in data_models.py (incl. IndexJournal, CaseSetVersion,
+     MatchWatermark, CandidateMatches, MatchJob).
+  2. Convert face_mesh from JSON text to packed float32 blobs
+     (face_mesh_version 0 → 1), in batches.
+  3. Add CandidateMatches.model_version and its lookup indexes.
+  4. Add the composite filter indexes on RegisteredCases / PublicSubmissions
+     ((submitted_by, status) and (status, submitted_on)).
+  5. Add face_mesh_norm and fill it for rows saved before normalization
+     existed (see face_normalization.py), in batches.
+  6. Recreate a MatchWatermark keyed on (submitted_on, id) as one keyed on
+     IndexJournal.seq; the next match run then re-scores everything.
+  7. Add MatchWatermark.scoring (the distance space candidates were scored
+     in); marks without one make the next match run re-score everything.
+
 Usage:
     python migrations.py
+    python migrations.py --renormalize   # recompute every face_mesh_norm
+                                         # (after changing the canonical mesh)
 =============================================================================
 """
 
-from sqlmodel import create_engine, SQLModel
-from data_models import RegisteredCases, PublicSubmissions   # noqa: F401
+import sys
+
+from sqlalchemy import text
+from sqlmodel import SQLModel
+from data_models import (  # noqa: F401
+    CandidateMatches,
+    CaseSetVersion,
+    FACE_MESH_VERSION,
+    IndexJournal,
+    MatchJob,
+    MatchWatermark,
+    RegisteredCases,
+    PublicSubmissions,
+)
+
+from db_engine import make_engine
+from db_queries import normalize_face_mesh_blobs, pack_face_mesh
 
 
 DB_URL = "sqlite:///sqlite_database.db"
 
+# Rows converted per transaction when rewriting face_mesh
+FACE_MESH_BATCH_SIZE = 500
+
+
+def _ensure_column(engine, table: str, column: str, ddl: str):
+    """Add `column` to `table` if an older database is missing it."""
+    with engine.begin() as conn:
+        existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            print(f"   ➕ Added {table}.{column}")
+
+
+def migrate_face_mesh_to_binary(engine, batch_size: int = FACE_MESH_BATCH_SIZE):
+    """
+    Rewrite legacy JSON face_mesh values as packed float32 blobs.
+
+    Rows are walked in primary-key order, `batch_size` at a time, each batch
+    in its own transaction, so the migration can be interrupted and re-run.
+    Rows whose JSON cannot be decoded are reported and left untouched.
+    """
+    for table in (RegisteredCases.__tablename__, PublicSubmissions.__tablename__):
+        # Existing rows predate the marker, so they default to version 0 (JSON)
+        _ensure_column(engine, table, "face_mesh_version", "INTEGER NOT NULL DEFAULT 0")
+
+        converted, failed, last_id = 0, 0, ""
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    text(
+                        f"SELECT id, face_mesh FROM {table} "
+                        f"WHERE face_mesh_version < :version AND id > :last_id "
+                        f"ORDER BY id LIMIT :limit"
+                    ),
+                    {"version": FACE_MESH_VERSION, "last_id": last_id, "limit": batch_size},
+                ).all()
+                if not rows:
+                    break
+
+                updates = []
+                for row_id, face_mesh in rows:
+                    try:
+                        updates.append(
+                            {"id": row_id, "face_mesh": pack_face_mesh(face_mesh)}
+                        )
+                    except ValueError as e:
+                        failed += 1
+                        print(f"   ⚠️  {table} {row_id[:8]}… not converted: {e}")
+
+                if updates:
+                    conn.execute(
+                        text(
+                            f"UPDATE {table} SET face_mesh = :face_mesh, "
+                            f"face_mesh_version = {FACE_MESH_VERSION} WHERE id = :id"
+                        ),
+                        updates,
+                    )
+                converted += len(updates)
+                last_id = rows[-1][0]
+
+        print(f"   🔁 {table}: {converted} face_mesh rows converted, {failed} failed.")
+
+
+def backfill_face_mesh_norm(engine, batch_size: int = FACE_MESH_BATCH_SIZE,
+                            recompute: bool = False):
+    """
+    Fill face_mesh_norm for rows that lack it (every row with `recompute`).
+
+    Like the face_mesh conversion, rows are walked in primary-key order,
+    one transaction per batch, so the backfill can be interrupted and re-run.
+    """
+    for table in (RegisteredCases.__tablename__, PublicSubmissions.__tablename__):
+        _ensure_column(engine, table, "face_mesh_norm", "BLOB")
+        pending = "" if recompute else "face_mesh_norm IS NULL AND "
+
+        updated, last_id = 0, ""
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    text(
+                        f"SELECT id, face_mesh FROM {table} "
+                        f"WHERE {pending}face_mesh_version = :version AND id > :last_id "
+                        f"ORDER BY id LIMIT :limit"
+                    ),
+                    {"version": FACE_MESH_VERSION, "last_id": last_id, "limit": batch_size},
+                ).all()
+                if not rows:
+                    break
+
+                normalized = normalize_face_mesh_blobs([face_mesh for _, face_mesh in rows])
+                conn.execute(
+                    text(f"UPDATE {table} SET face_mesh_norm = :norm WHERE id = :id"),
+                    [{"id": row_id, "norm": norm}
+                     for (row_id, _), norm in zip(rows, normalized)],
+                )
+                updated += len(rows)
+                last_id = rows[-1][0]
+
+        print(f"   📐 {table}: {updated} face_mesh_norm rows written.")
+
+
+def _ensure_indexes(engine, model):
+    """Create any index declared on `model` that an older database is missing."""
+    with engine.begin() as conn:
+        for index in model.__table__.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def reset_old_match_watermarks(engine):
+    """Drop a (submitted_on, id)-keyed MatchWatermark and create the seq-keyed one."""
+    table = MatchWatermark.__tablename__
+    with engine.begin() as conn:
+        existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+        if "last_seq" in existing:
+            return
+        conn.execute(text(f"DROP TABLE {table}"))
+        MatchWatermark.__table__.create(conn)
+    print(f"   🔁 {table} recreated; the next match run re-scores every submission.")
+
 
-def run_migrations():
-    """Create all tables defined in data_models.py."""
-    engine = create_engine(DB_URL, echo=True)
+def run_migrations(renormalize: bool = False):
+    """Create all tables defined in data_models.py and upgrade old rows."""
+    engine = make_engine(DB_URL, echo=True)
     SQLModel.metadata.create_all(engine)
+    migrate_face_mesh_to_binary(engine)
+    _ensure_column(
+        engine, CandidateMatches.__tablename__, "model_version",
+        "VARCHAR(32) NOT NULL DEFAULT ''",
+    )
+    for model in (RegisteredCases, PublicSubmissions, CandidateMatches):
+        _ensure_indexes(engine, model)
+    backfill_face_mesh_norm(engine, recompute=renormalize)
+    reset_old_match_watermarks(engine)
+    _ensure_column(engine, MatchWatermark.__tablename__, "scoring",
+                   "VARCHAR(64) NOT NULL DEFAULT ''")
     print("\n✅ Migration complete — all tables are up to date.")
 
 
 if __name__ == "__main__":
-    run_migrations()
+    run_migrations(renormalize="--renormalize" in sys.argv)
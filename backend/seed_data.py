@@ -6,7 +6,7 @@
            test their code without needing real images.
 =============================================================================
 
-Generates dummy face-mesh vectors (random floats) and inserts a handful of
+Generates dummy face-mesh vectors (random float32 blobs) and inserts a handful of
 RegisteredCases and PublicSubmissions rows.
 
 Usage:
@@ -14,25 +14,26 @@ Usage:
 =============================================================================
 """
 
-import json
 import random
 from uuid import uuid4
 from datetime import datetime
 
-from sqlmodel import create_engine, Session, SQLModel
-from data_models import RegisteredCases, PublicSubmissions
+from sqlmodel import SQLModel
+from data_models import FACE_MESH_DIM, RegisteredCases, PublicSubmissions
+from db_engine import make_engine
+from db_queries import bulk_new_public_cases, bulk_register_cases, pack_face_mesh
 
 
 DB_URL = "sqlite:///sqlite_database.db"
-engine = create_engine(DB_URL)
+engine = make_engine(DB_URL)
 
 # Number of landmarks MediaPipe returns (468 landmarks × 3 coords = 1404 floats)
-NUM_FEATURES = 1404
+NUM_FEATURES = FACE_MESH_DIM
 
 
-def random_face_mesh() -> str:
-    """Return a JSON string of 1404 random floats simulating face-mesh output."""
-    return json.dumps([round(random.uniform(0, 1), 6) for _ in range(NUM_FEATURES)])
+def random_face_mesh() -> bytes:
+    """Return a packed blob of 1404 random floats simulating face-mesh output."""
+    return pack_face_mesh([random.uniform(0, 1) for _ in range(NUM_FEATURES)])
 
 
 def seed():
@@ -118,12 +119,9 @@ def seed():
         ),
     ]
 
-    with Session(engine) as session:
-        for case in registered_samples:
-            session.add(case)
-        for sub in public_samples:
-            session.add(sub)
-        session.commit()
+    # Bulk helpers also journal the rows for the ML indexes
+    bulk_register_cases(registered_samples)
+    bulk_new_public_cases(public_samples)
 
     print(f"✅ Seeded {len(registered_samples)} registered cases.")
     print(f"✅ Seeded {len(public_samples)} public submissions.")
@@ -0,0 +1,208 @@
+"""
+=============================================================================
+  Week 2 — Backend Engineer
+  File: synthetic_data.py
+  Purpose: Deterministic, scalable synthetic data for performance work.
+=============================================================================
+
+`seed_data.py` inserts 3 cases and 2 submissions with uniform random
+vectors — enough to click through the app, useless for timing it. This
+generator writes N registered cases and M public submissions such that:
+
+  - every case is a distinct "person": a shared mean face plus a
+    per-person offset, so distances look like real face meshes (close to
+    each other, never identical) rather than uniform noise;
+  - a chosen fraction of the cases gets one sighting each — a noisy copy
+    of the case vector — and the remaining submissions are strangers, so
+    the correct match of every submission is known (`truth`);
+  - cases are spread over many `submitted_by` officers and submissions over
+    many locations, with timestamps spread over a year;
+  - the output depends only on `seed`: ids are uuid5 of (seed, kind, index)
+    and every vector comes from its own seeded generator, so rows are
+    produced in fixed-size chunks without keeping the corpus in memory.
+
+Rows are written through the bulk helpers in db_queries.py, which scales to
+a million rows in a few minutes.
+
+Usage:
+    python synthetic_data.py --cases 100000 --submissions 20000
+    python synthetic_data.py --cases 1000000 --submissions 100000 \
+        --db sqlite:///bench.db --truth truth.json
+=============================================================================
+"""
+
+import json
+import time
+import uuid
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlmodel import SQLModel
+
+import db_queries
+from data_models import FACE_MESH_DIM
+from db_engine import make_engine
+
+
+# Namespace for the deterministic uuid5 ids
+ID_NAMESPACE = uuid.UUID("6f1c7a52-3e0b-4d55-9b7e-1f3f0b8a2c11")
+
+# Spread of individual faces around the mean face, and of a re-sighting
+# around the registered face (same units as the landmark coordinates)
+PERSON_SPREAD = 0.05
+DEFAULT_NOISE = 0.01
+
+CITIES = ["Delhi", "Noida", "Gurugram", "Mumbai", "Pune", "Bangalore", "Chennai",
+          "Hyderabad", "Kolkata", "Jaipur", "Lucknow", "Chandigarh"]
+PLACES = ["Railway Station", "Bus Stand", "Market", "Temple", "Hospital",
+          "Shelter Home", "Metro Station", "Park", "School", "Mall"]
+
+START_DATE = datetime(2025, 1, 1)
+SPAN = timedelta(days=365)
+
+
+@contextmanager
+def use_database(url: str):
+    """Point db_queries (and so the ML loaders) at `url` for the block."""
+    original = db_queries.engine
+    db_queries.engine = make_engine(url)
+    SQLModel.metadata.create_all(db_queries.engine)
+    try:
+        yield db_queries.engine
+    finally:
+        db_queries.engine.dispose()
+        db_queries.engine = original
+
+
+def record_id(seed: int, kind: str, index: int) -> str:
+    return str(uuid.uuid5(ID_NAMESPACE, f"{seed}:{kind}:{index}"))
+
+
+def person_vector(seed: int, index: int, mean_face: np.ndarray) -> np.ndarray:
+    """Face mesh of synthetic person `index` (registered case or stranger)."""
+    rng = np.random.default_rng([seed, 1, index])
+    return mean_face + rng.normal(0, PERSON_SPREAD, FACE_MESH_DIM).astype(np.float32)
+
+
+def _timestamp(index: int, total: int) -> datetime:
+    return START_DATE + SPAN * (index / max(1, total))
+
+
+def generate(n_cases: int, n_submissions: int, matched_fraction: float = 0.1,
+             noise: float = DEFAULT_NOISE, n_users: int = 50, seed: int = 0,
+             batch_size: int = db_queries.BULK_BATCH_SIZE, journal: bool = True,
+             verbose: bool = True) -> dict:
+    """
+    Write `n_cases` registered cases and `n_submissions` public submissions.
+
+    Parameters
+    ----------
+    matched_fraction : float
+        Fraction of the cases that get one noisy sighting each (capped by
+        `n_submissions`); all other submissions are strangers.
+    noise : float
+        Standard deviation of the noise added to a sighting.
+    n_users : int
+        Number of distinct `submitted_by` officers the cases are spread over.
+
+    Returns
+    -------
+    dict with 'truth' ({public_id: registered_id or None}), the row counts
+    and 'seconds'.
+    """
+    rng = np.random.default_rng(seed)
+    mean_face = rng.random(FACE_MESH_DIM, dtype=np.float32)
+    users = [f"officer_{u:03d}" for u in range(n_users)]
+    case_users = rng.integers(0, n_users, n_cases)
+
+    # Which cases are sighted, and where each sighting lands in the
+    # submission order
+    n_matched = min(n_submissions, int(round(matched_fraction * n_cases)))
+    sighted_cases = rng.choice(n_cases, size=n_matched, replace=False)
+    source = np.full(n_submissions, -1, dtype=np.int64)
+    source[rng.permutation(n_submissions)[:n_matched]] = sighted_cases
+
+    start = time.perf_counter()
+    progress = (lambda total: print(f"   📥 {total:,} rows…")) if verbose else None
+
+    def cases():
+        for i in range(n_cases):
+            yield {
+                "id": record_id(seed, "case", i),
+                "submitted_by": users[case_users[i]],
+                "name": f"Synthetic Person {i}",
+                "age": str(5 + i % 60),
+                "last_seen": CITIES[i % len(CITIES)],
+                "face_mesh": person_vector(seed, i, mean_face),
+                "submitted_on": _timestamp(i, n_cases),
+                "status": "NF",
+            }
+
+    def submissions():
+        for s in range(n_submissions):
+            case_index = source[s]
+            if case_index >= 0:
+                rng_s = np.random.default_rng([seed, 2, s])
+                vector = person_vector(seed, case_index, mean_face)
+                vector += rng_s.normal(0, noise, FACE_MESH_DIM).astype(np.float32)
+            else:
+                # Strangers are persons beyond the registered range
+                vector = person_vector(seed, n_cases + s, mean_face)
+            yield {
+                "id": record_id(seed, "public", s),
+                "submitted_by": "Synthetic Citizen",
+                "location": f"{PLACES[s % len(PLACES)]}, {CITIES[(s // 7) % len(CITIES)]}",
+                "mobile": f"9{s % 10**9:09d}",
+                "face_mesh": vector,
+                "submitted_on": _timestamp(s, n_submissions),
+                "status": "NF",
+            }
+
+    db_queries.bulk_register_cases(cases(), batch_size, journal, progress)
+    db_queries.bulk_new_public_cases(submissions(), batch_size, journal, progress)
+
+    truth = {
+        record_id(seed, "public", s): (
+            record_id(seed, "case", int(source[s])) if source[s] >= 0 else None
+        )
+        for s in range(n_submissions)
+    }
+    return {
+        "n_cases": n_cases,
+        "n_submissions": n_submissions,
+        "n_matched": n_matched,
+        "seed": seed,
+        "truth": truth,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic benchmark corpus.")
+    parser.add_argument("--cases", type=int, default=10_000)
+    parser.add_argument("--submissions", type=int, default=2_000)
+    parser.add_argument("--matched-fraction", type=float, default=0.1)
+    parser.add_argument("--noise", type=float, default=DEFAULT_NOISE)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", default=db_queries.sqlite_url, help="Target database URL.")
+    parser.add_argument("--truth", default=None, help="Write {public_id: case_id} here.")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="Skip IndexJournal rows (build ML indexes from scratch).")
+    args = parser.parse_args()
+
+    with use_database(args.db):
+        result = generate(
+            args.cases, args.submissions, args.matched_fraction, args.noise,
+            args.users, args.seed, journal=not args.no_journal,
+        )
+
+    if args.truth:
+        with open(args.truth, "w") as f:
+            json.dump(result["truth"], f)
+    print(
+        f"\n✅ Wrote {result['n_cases']:,} cases and {result['n_submissions']:,} "
+        f"submissions ({result['n_matched']:,} sightings) in {result['seconds']:.1f} s."
+    )
@@ -0,0 +1,213 @@
+"""
+=============================================================================
+  Week 3 — Performance
+  File: benchmarks/bench_cascade.py
+  Purpose: Recall and speed of the two-stage cascade against the exact scan.
+=============================================================================
+
+Runs `cascade_search.CascadeSearcher` for a range of stage-1 candidate
+counts and reports, for each:
+  - recall@1 / recall@k against knn_search.nearest_neighbors (the scan
+    `baseline_match` uses without a cascade),
+  - accuracy@1 against the known correct case,
+  - the fraction of queries the lower-bound check sent back to the exact
+    scan (see cascade_search.py),
+  - batched search time (ms per query) and speed-up over the exact scan.
+
+The default corpus follows backend/synthetic_data.py (a mean face plus a
+per-person offset; sightings are noisy copies of cases) but is generated in
+memory. `--source db` uses the NF registered cases and public submissions
+instead (`--normalized` for face_mesh_norm, `--truth` for accuracy).
+
+Exits with status 1 if recall@1 at the default STAGE1_CANDIDATES is below
+`--min-recall`, so it can gate a change to the search. The check makes
+results exact, so a drop means a bug rather than a bad subset; what the
+subset changes is the fallback rate, and with it the speed-up. On the
+synthetic corpus every case is an independent random face, the 52 stage-1
+values bound the full distance loosely and nearly every query falls back
+(the cascade is slower than the exact scan there); only `--source db` on
+real, pose-normalized photos can show whether it pays off.
+
+Under pytest, `test_db_recall` applies the same gate to every submission
+of the 1k synthetic database of conftest.py (`synthetic_db`), sightings
+and strangers alike, loaded through feature_loader.
+
+Usage:
+    python bench_cascade.py --n 100000 --queries 2000 --k 5
+    python bench_cascade.py --candidates 50 100 200 500 --dims 3 --out cascade.json
+    python bench_cascade.py --source db --normalized --truth ../backend/truth.json
+    python -m pytest bench_cascade.py
+=============================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for folder in ("ml", "backend"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+from cascade_search import (  # noqa: E402
+    STAGE1_CANDIDATES,
+    STAGE1_DIMS,
+    CascadeSearcher,
+    subset_columns,
+)
+from knn_search import nearest_neighbors, squared_norms  # noqa: E402
+
+DIM = 1404
+DEFAULT_CANDIDATES = (25, 50, 100, STAGE1_CANDIDATES, 500)
+# Same spreads as backend/synthetic_data.py (PERSON_SPREAD, DEFAULT_NOISE)
+PERSON_SPREAD = 0.05
+SIGHTING_NOISE = 0.01
+# Recall@1 the default STAGE1_CANDIDATES must reach
+MIN_RECALL = 0.99
+
+
+def synthetic_corpus(n: int, n_queries: int, noise: float = SIGHTING_NOISE, seed: int = 0):
+    """Cases around a mean face; queries are noisy sightings of known cases."""
+    rng = np.random.default_rng(seed)
+    mean_face = rng.random(DIM, dtype=np.float32)
+    base = mean_face + rng.normal(0, PERSON_SPREAD, (n, DIM)).astype(np.float32)
+    truth = rng.choice(n, n_queries, replace=False)
+    queries = base[truth] + rng.normal(0, noise, (n_queries, DIM)).astype(np.float32)
+    return base, queries, truth
+
+
+def db_corpus(normalized: bool = False, truth=None):
+    """
+    NF registered cases and public submissions; truth positions if known.
+
+    `truth` is a {public_id: registered_id} dict (synthetic_data.generate())
+    or the path of one saved as JSON.
+    """
+    from feature_loader import load_public_vectors, load_registered_vectors
+
+    ids, base = load_registered_vectors(status="NF", normalized=normalized)
+    public_ids, queries = load_public_vectors(status="NF", normalized=normalized)
+    mapping = truth
+    truth = None
+    if isinstance(mapping, str):
+        with open(mapping) as f:
+            mapping = json.load(f)
+    if mapping:
+        position = {case_id: i for i, case_id in enumerate(ids)}
+        truth = np.array([position.get(mapping.get(p), -1) for p in public_ids])
+    return base, queries, truth
+
+
+def _recall(approx, exact, k: int) -> float:
+    hits = sum(len(set(a[:k]) & set(e[:k])) for a, e in zip(approx, exact))
+    return hits / max(1, exact[:, :k].size)
+
+
+def _accuracy(indices, truth):
+    if truth is None:
+        return None
+    known = truth >= 0
+    return float((indices[known, 0] == truth[known]).mean()) if known.any() else None
+
+
+def best_of(fn, repeats: int):
+    """(fastest seconds, last result) of `repeats` calls."""
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(base, queries, truth=None, k: int = 5, candidates=DEFAULT_CANDIDATES,
+        dims: int = STAGE1_DIMS, repeats: int = 3) -> dict:
+    sq_norms = squared_norms(base)
+    exact_seconds, (_, exact) = best_of(
+        lambda: nearest_neighbors(queries, base, k=k, base_sq_norms=sq_norms), repeats
+    )
+
+    rows = []
+    for count in candidates:
+        searcher = CascadeSearcher(base, candidates=count, dims=dims)
+        seconds, (_, indices) = best_of(lambda: searcher.search(queries, k=k), repeats)
+        rows.append({
+            "candidates": count,
+            "recall@1": _recall(indices, exact, 1),
+            f"recall@{k}": _recall(indices, exact, k),
+            "accuracy@1": _accuracy(indices, truth),
+            "fallback": searcher.fallbacks / len(queries),
+            "ms_per_query": seconds * 1000 / len(queries),
+            "speedup": exact_seconds / seconds,
+        })
+
+    return {
+        "n": len(base),
+        "queries": len(queries),
+        "k": k,
+        "dims": dims,
+        "stage1_columns": len(subset_columns(dims=dims)),
+        "exact": {"accuracy@1": _accuracy(exact, truth),
+                  "ms_per_query": exact_seconds * 1000 / len(queries)},
+        "results": rows,
+    }
+
+
+def test_db_recall(synthetic_db):
+    """The recall gate on a synthetic database (see conftest.py)."""
+    base, queries, truth = db_corpus(truth=synthetic_db["truth"])
+    assert len(base) == synthetic_db["n_cases"]
+    assert (truth < 0).any()
+    report = run(base, queries, truth, candidates=[STAGE1_CANDIDATES], repeats=1)
+    assert report["results"][0]["recall@1"] >= MIN_RECALL
+    assert report["results"][0]["accuracy@1"] >= report["exact"]["accuracy@1"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cascade search recall / speed benchmark.")
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--n", type=int, default=100_000, help="Synthetic corpus size.")
+    parser.add_argument("--queries", type=int, default=2_000, help="Synthetic query count.")
+    parser.add_argument("--noise", type=float, default=SIGHTING_NOISE,
+                        help="Synthetic sighting noise.")
+    parser.add_argument("--normalized", action="store_true", help="Use face_mesh_norm (db).")
+    parser.add_argument("--truth", default=None, help="Ground truth JSON (--source db).")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, nargs="+", default=list(DEFAULT_CANDIDATES))
+    parser.add_argument("--dims", type=int, choices=[2, 3], default=STAGE1_DIMS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-recall", type=float, default=MIN_RECALL)
+    parser.add_argument("--out", default=None, help="Also write the results as JSON.")
+    args = parser.parse_args()
+
+    if args.source == "db":
+        base, queries, truth = db_corpus(args.normalized, args.truth)
+    else:
+        base, queries, truth = synthetic_corpus(args.n, args.queries, args.noise)
+    candidates = sorted(set(args.candidates) | {STAGE1_CANDIDATES})
+
+    report = run(base, queries, truth, k=args.k, candidates=candidates, dims=args.dims,
+                 repeats=args.repeats)
+    k, exact = report["k"], report["exact"]
+    fmt_acc = lambda value: f"{value:>7.3f}" if value is not None else f"{'—':>7}"  # noqa: E731
+    print(f"🔄 n={report['n']:,}, {report['queries']:,} queries, k={k}, "
+          f"stage 1 on {report['stage1_columns']} of {base.shape[1]} values")
+    print(f"\n   {'stage 1':>8} {'R@1':>7} {f'R@{k}':>7} {'Acc@1':>7} {'fallback':>9} "
+          f"{'ms/q':>8} {'speedup':>8}")
+    print(f"   {'exact':>8} {1:>7.3f} {1:>7.3f} {fmt_acc(exact['accuracy@1'])} {'—':>9} "
+          f"{exact['ms_per_query']:>8.3f} {1:>7.2f}x")
+    for row in report["results"]:
+        print(f"   {row['candidates']:>8} {row['recall@1']:>7.3f} {row[f'recall@{k}']:>7.3f} "
+              f"{fmt_acc(row['accuracy@1'])} {row['fallback']:>8.1%} {row['ms_per_query']:>8.3f} "
+              f"{row['speedup']:>7.2f}x  {'✅' if row['recall@1'] >= args.min_recall else '❌'}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Results written to {args.out}")
+    default = next(row for row in report["results"] if row["candidates"] == STAGE1_CANDIDATES)
+    if default["recall@1"] < args.min_recall:
+        sys.exit(1)
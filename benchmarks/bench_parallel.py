@@ -0,0 +1,115 @@
+"""
+=============================================================================
+  Week 2 — Performance
+  File: benchmarks/bench_parallel.py
+  Purpose: Scaling curve of exact k-NN search over worker processes.
+=============================================================================
+
+Times `parallel_search.ParallelSearcher.search` for 1, 2, 4, 8, 16 … workers
+(up to the number of CPUs) in both split modes:
+
+  batch   — many queries (a nightly match run), queries split per worker
+  single  — a handful of queries (one new submission), base split per worker
+
+and checks that every worker count returns exactly the indices of the
+single-process search. The pool is started once per worker count and is
+not part of the timing (a real deployment keeps it warm).
+
+Usage:
+    python bench_parallel.py --n 100000 --queries 2000 --k 5
+    python bench_parallel.py --workers 1 2 4 8 16 32 --out parallel.json
+=============================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "ml"))
+
+from knn_search import nearest_neighbors, squared_norms  # noqa: E402
+from parallel_search import ParallelSearcher  # noqa: E402
+
+DIM = 1404
+SINGLE_QUERIES = 4
+
+
+def default_worker_counts() -> list:
+    counts, w = [], 1
+    while w <= (os.cpu_count() or 1):
+        counts.append(w)
+        w *= 2
+    return counts
+
+
+def best_of(fn, repeats: int) -> float:
+    """Fastest of `repeats` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(n: int, n_queries: int, k: int, worker_counts, repeats: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    base = rng.random((n, DIM), dtype=np.float32)
+    queries = base[rng.choice(n, n_queries, replace=False)]
+    queries = queries + rng.normal(0, 0.01, queries.shape).astype(np.float32)
+    single = queries[:SINGLE_QUERIES]
+    sq_norms = squared_norms(base)
+
+    _, expected_batch = nearest_neighbors(queries, base, k=k, base_sq_norms=sq_norms)
+    _, expected_single = nearest_neighbors(single, base, k=k, base_sq_norms=sq_norms)
+
+    rows = []
+    for workers in worker_counts:
+        with ParallelSearcher(base, workers=workers, base_sq_norms=sq_norms) as searcher:
+            _, batch_idx = searcher.search(queries, k=k)
+            _, single_idx = searcher.search(single, k=k)
+            rows.append({
+                "workers": workers,
+                "batch_seconds": best_of(lambda: searcher.search(queries, k=k), repeats),
+                "single_ms": best_of(lambda: searcher.search(single, k=k), repeats) * 1000,
+                "identical": bool(np.array_equal(batch_idx, expected_batch)
+                                  and np.array_equal(single_idx, expected_single)),
+            })
+
+    for row in rows:
+        row["batch_speedup"] = rows[0]["batch_seconds"] / row["batch_seconds"]
+        row["single_speedup"] = rows[0]["single_ms"] / row["single_ms"]
+    return {"n": n, "queries": n_queries, "k": k, "cpus": os.cpu_count(), "results": rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel exact-search scaling curve.")
+    parser.add_argument("--n", type=int, default=100_000, help="Registered cases.")
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_worker_counts())
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--out", default=None, help="Also write the results as JSON.")
+    args = parser.parse_args()
+
+    print(f"🔄 n={args.n:,}, {args.queries:,} queries, k={args.k}, {os.cpu_count()} CPUs")
+    report = run(args.n, args.queries, args.k, args.workers, args.repeats)
+
+    print(f"\n   {'workers':>7} {'batch s':>9} {'speedup':>8} {'single ms':>10} "
+          f"{'speedup':>8}  identical")
+    for row in report["results"]:
+        print(f"   {row['workers']:>7} {row['batch_seconds']:>9.3f} {row['batch_speedup']:>7.2f}x "
+              f"{row['single_ms']:>10.2f} {row['single_speedup']:>7.2f}x  "
+              f"{'✅' if row['identical'] else '❌'}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Results written to {args.out}")
+    if not all(row["identical"] for row in report["results"]):
+        sys.exit(1)
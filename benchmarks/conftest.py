@@ -0,0 +1,73 @@
+"""
+=============================================================================
+  Week 2 — Performance
+  File: benchmarks/conftest.py
+  Purpose: pytest fixtures that provide synthetic benchmark databases.
+=============================================================================
+
+Each corpus is generated once per session (backend/synthetic_data.py) into
+its own temporary SQLite file and reused by every benchmark that asks for
+the same size. While a test runs, `db_queries.engine` — and therefore the
+ML loaders — points at that file; the project database is never touched.
+
+Usage (in a benchmark module):
+    @pytest.mark.parametrize("synthetic_db", ["10k"], indirect=True)
+    def test_load(synthetic_db):
+        ids, features = load_registered_vectors(status="NF")
+        assert len(ids) == synthetic_db["n_cases"]
+=============================================================================
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for folder in ("ml", "backend"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+from synthetic_data import generate, use_database  # noqa: E402
+
+
+# Named corpus sizes: (registered cases, public submissions)
+BENCH_SIZES = {
+    "1k": (1_000, 200),
+    "10k": (10_000, 2_000),
+    "100k": (100_000, 20_000),
+}
+
+
+@pytest.fixture(scope="session")
+def synthetic_corpus_factory(tmp_path_factory):
+    """
+    Return `make(n_cases, n_submissions, seed=0, **generate_kwargs)`, which
+    builds a synthetic database (once per distinct argument set) and returns
+    the `generate()` result plus its 'url'.
+    """
+    cache = {}
+
+    def make(n_cases: int, n_submissions: int, seed: int = 0, **kwargs):
+        key = (n_cases, n_submissions, seed, tuple(sorted(kwargs.items())))
+        if key not in cache:
+            url = f"sqlite:///{tmp_path_factory.mktemp('synthetic')}/bench.db"
+            with use_database(url):
+                dataset = generate(n_cases, n_submissions, seed=seed,
+                                   verbose=False, **kwargs)
+            cache[key] = {**dataset, "url": url}
+        return cache[key]
+
+    return make
+
+
+@pytest.fixture
+def synthetic_db(synthetic_corpus_factory, request):
+    """
+    A synthetic corpus, active as `db_queries.engine` for the test.
+
+    Defaults to the '1k' size; parametrize indirectly with a BENCH_SIZES key
+    for larger corpora.
+    """
+    dataset = synthetic_corpus_factory(*BENCH_SIZES[getattr(request, "param", "1k")])
+    with use_database(dataset["url"]):
+        yield dataset
@@ -0,0 +1,292 @@
+"""
+=============================================================================
+  Week 2 — Performance
+  File: benchmarks/run_benchmarks.py
+  Purpose: End-to-end benchmark harness with a regression check.
+=============================================================================
+
+For each corpus size (default 1k / 10k / 100k cases) a synthetic database
+is generated in a temporary directory (backend/synthetic_data.py) and the
+following are timed, each repeated several times:
+
+  load_registered   — feature_loader.load_registered_vectors (all NF cases)
+  train             — baseline_train.train for the busiest officer
+  match_full        — baseline_match.match(full=True), every pair re-scored
+  match_noop        — baseline_match.match() on an unchanged database
+  db_status_counts  — db_queries.get_case_status_counts
+  db_fetch_cases    — db_queries.fetch_registered_cases(user, "All")
+  db_page_public    — db_queries.page_public_cases (first page of 100)
+  db_candidates     — db_queries.fetch_candidates_for_public
+  query_single      — one submission against the officer's model (k=5)
+
+The corpus is generated in one child process, then every operation runs
+in a fresh child of its own against the same database file, so
+`peak_rss_mb` (ru_maxrss after the operation) covers that operation plus
+the interpreter and imports, not whatever ran before it. Operations run
+in the order above (match_noop relies on match_full's watermarks,
+query_single on the model `train` saved). Model artifacts and indexes go
+to the temporary directory, never to ml/models or ml/index, and the
+directory is removed afterwards.
+
+Results are written as JSON (p50 / p95 / p99 / mean in ms per operation).
+With a baseline file, every p50 is compared against it and the run fails
+(exit code 1) if any operation got slower than `--tolerance` allows.
+
+Usage:
+    python run_benchmarks.py --sizes 1k 10k --out results.json
+    python run_benchmarks.py --save-baseline           # record baseline.json
+    python run_benchmarks.py --baseline baseline.json  # compare, exit 1 on regression
+=============================================================================
+"""
+
+import os
+import sys
+import json
+import shutil
+import time
+import platform
+import resource
+import tempfile
+import argparse
+import multiprocessing
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for folder in ("ml", "backend"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+# (registered cases, public submissions) per named size
+SIZES = {
+    "1k": (1_000, 200),
+    "10k": (10_000, 2_000),
+    "100k": (100_000, 20_000),
+}
+
+# Repetitions per operation: heavy pipeline stages vs. single queries
+HEAVY_REPEATS = 5
+LIGHT_REPEATS = 200
+
+# A p50 more than 25% above the baseline counts as a regression, unless
+# the difference is below timer noise for sub-millisecond operations
+DEFAULT_TOLERANCE = 0.25
+MIN_REGRESSION_MS = 0.5
+
+# Timed operations, in run order (see run_operation)
+OPERATIONS = (
+    "load_registered", "train", "match_full", "match_noop", "db_status_counts",
+    "db_fetch_cases", "db_page_public", "db_candidates", "query_single",
+)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (Linux reports KiB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if platform.system() != "Darwin" else peak / 1024 / 1024
+
+
+def summarize(samples_ms) -> dict:
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(samples.size),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": float(samples.mean()),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def timed(fn, repeats: int, args_for=None) -> dict:
+    """Call `fn` `repeats` times (with `args_for(i)` if given) and summarize."""
+    samples = []
+    for i in range(repeats):
+        args = args_for(i) if args_for else ()
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def busiest_user(db_queries) -> str:
+    """The officer with the most registered cases (largest per-user model)."""
+    from sqlmodel import Session, select, func
+    from data_models import RegisteredCases
+
+    with Session(db_queries.engine) as session:
+        return session.exec(
+            select(RegisteredCases.submitted_by)
+            .group_by(RegisteredCases.submitted_by)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).one()
+
+
+def _use_work_dir(work_dir: str):
+    """Send model artifacts and indexes to `work_dir` instead of ml/."""
+    import ann_index
+    import model_store
+
+    model_store.MODELS_ROOT = os.path.join(work_dir, "models")
+    ann_index.INDEX_ROOT = os.path.join(work_dir, "index")
+
+
+def generate_corpus(size: str, seed: int, work_dir: str) -> dict:
+    """Write the synthetic database for `size` into `work_dir` (runs in a child)."""
+    import db_queries
+    from synthetic_data import generate, use_database
+
+    n_cases, n_submissions = SIZES[size]
+    with use_database(f"sqlite:///{work_dir}/bench.db"):
+        start = time.perf_counter()
+        dataset = generate(n_cases, n_submissions, seed=seed, verbose=False)
+        generate_seconds = time.perf_counter() - start
+        user = busiest_user(db_queries)
+    return {
+        "n_cases": n_cases,
+        "n_submissions": n_submissions,
+        "generate_seconds": generate_seconds,
+        "user": user,
+        "public_ids": list(dataset["truth"]),
+    }
+
+
+def run_operation(name: str, work_dir: str, user: str, public_ids: list,
+                  repeats: int = HEAVY_REPEATS, light_repeats: int = LIGHT_REPEATS) -> dict:
+    """Time one operation on the corpus in `work_dir` (runs in its own child)."""
+    import db_queries
+    import model_store
+    from baseline_match import match
+    from baseline_train import train
+    from feature_loader import load_public_vectors, load_registered_vectors
+    from synthetic_data import use_database
+
+    _use_work_dir(work_dir)
+    with use_database(f"sqlite:///{work_dir}/bench.db"):
+        if name == "load_registered":
+            return timed(lambda: load_registered_vectors(status="NF"), repeats)
+        if name == "train":
+            return timed(lambda: train(user), repeats)
+        if name == "match_full":
+            return timed(lambda: match(verbose=False, full=True), repeats)
+        if name == "match_noop":
+            return timed(lambda: match(verbose=False), repeats)
+        if name == "db_status_counts":
+            return timed(lambda: db_queries.get_case_status_counts(user), light_repeats)
+        if name == "db_fetch_cases":
+            return timed(lambda: db_queries.fetch_registered_cases(user, "All"), repeats)
+        if name == "db_page_public":
+            return timed(lambda: db_queries.page_public_cases(limit=100), light_repeats)
+        if name == "db_candidates":
+            return timed(
+                db_queries.fetch_candidates_for_public, light_repeats,
+                lambda i: (public_ids[i % len(public_ids)],),
+            )
+        if name == "query_single":
+            model = model_store.load_model(model_store.latest_model_dir(user))
+            _, queries = load_public_vectors(ids=public_ids[:light_repeats])
+            return timed(
+                lambda q: model.kneighbors(q, k=5), light_repeats,
+                lambda i: (queries[i % len(queries)],),
+            )
+    raise ValueError(f"Unknown operation {name!r}.")
+
+
+def run_size(size: str, seed: int = 0, repeats: int = HEAVY_REPEATS,
+             light_repeats: int = LIGHT_REPEATS) -> dict:
+    """Generate one corpus, then time every operation on it in its own child."""
+    context = multiprocessing.get_context("spawn")
+    work_dir = tempfile.mkdtemp(prefix=f"traceai-bench-{size}-")
+    try:
+        with context.Pool(1) as pool:
+            corpus = pool.apply(generate_corpus, (size, seed, work_dir))
+        results = {}
+        for name in OPERATIONS:
+            with context.Pool(1) as pool:
+                results[name] = pool.apply(run_operation, (
+                    name, work_dir, corpus["user"], corpus["public_ids"],
+                    repeats, light_repeats,
+                ))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "n_cases": corpus["n_cases"],
+        "n_submissions": corpus["n_submissions"],
+        "generate_seconds": corpus["generate_seconds"],
+        "operations": results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return [(size, operation, baseline_p50, current_p50)] regressions."""
+    regressions = []
+    for size, current in results["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if not previous:
+            continue
+        for name, stats in current["operations"].items():
+            old = previous["operations"].get(name)
+            if old and stats["p50_ms"] > max(old["p50_ms"] * (1 + tolerance),
+                                             old["p50_ms"] + MIN_REGRESSION_MS):
+                regressions.append((size, name, old["p50_ms"], stats["p50_ms"]))
+    return regressions
+
+
+def print_results(results: dict):
+    print("=" * 78)
+    print("  Benchmark Results")
+    print("=" * 78)
+    for size, report in results["sizes"].items():
+        print(f"\n--- {size}: {report['n_cases']:,} cases / "
+              f"{report['n_submissions']:,} submissions "
+              f"(generated in {report['generate_seconds']:.1f} s) ---")
+        print(f"   {'operation':<18} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'peak MB':>9}")
+        for name, stats in report["operations"].items():
+            print(f"   {name:<18} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} "
+                  f"{stats['p99_ms']:>10.3f} {stats['peak_rss_mb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TraceAI end-to-end benchmarks.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=HEAVY_REPEATS)
+    parser.add_argument("--out", default=os.path.join(HERE, "results.json"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Write the results to --baseline instead of comparing.")
+    args = parser.parse_args()
+
+    results = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "sizes": {},
+    }
+    for size in args.sizes:
+        print(f"🔄 Benchmarking {size}…")
+        results["sizes"][size] = run_size(size, args.seed, args.repeats)
+
+    print_results(results)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results written to {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for size, name, old, new in regressions:
+                print(f"   {size:<5} {name:<18} {old:10.3f} → {new:10.3f} ms")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline}.")
@@ -106,12 +106,12 @@ if st.session_state.get("authentication_status"):
     # --- Dashboard Metrics ---
     from pages.helper import db_queries
 
-    found_cases = db_queries.get_registered_cases_count(user_info["name"], "F")
-    non_found_cases = db_queries.get_registered_cases_count(user_info["name"], "NF")
+    # One GROUP BY count instead of loading every case row
+    case_counts = db_queries.get_case_status_counts(user_info["name"])
 
     col1, col2 = st.columns(2)
-    col1.metric("✅ Found Cases", value=len(found_cases))
-    col2.metric("🔍 Not Found Cases", value=len(non_found_cases))
+    col1.metric("✅ Found Cases", value=case_counts["F"])
+    col2.metric("🔍 Not Found Cases", value=case_counts["NF"])
 
 elif st.session_state.get("authentication_status") is False:
     st.error("❌ Username or password is incorrect.")
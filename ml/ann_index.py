@@ -0,0 +1,583 @@
+"""
+=============================================================================
+  Week 2 — ML Engineer
+  File: ann_index.py
+  Purpose: Persistent, incrementally updated approximate nearest-neighbour
+           (IVF) index over face-mesh vectors.
+=============================================================================
+
+An inverted-file (IVF) index: k-means splits the vectors into `n_lists`
+cells, and a query only scans the `n_probe` cells whose centroids are
+closest to it. Queries are processed in batches — every probed cell is
+scored against all queries that probe it with one BLAS product — and the
+final top-k are re-scored exactly, so returned distances are directly
+comparable with `baseline_match.match`.
+
+Incremental updates
+-------------------
+`db_queries` appends every vector change to the IndexJournal table in the
+same transaction as the change itself:
+  - register_new_case / new_public_case → 'add'
+  - update_found_status                 → 'remove' (case and submission)
+`sync_index()` replays journal entries newer than the index snapshot:
+additions go to a small delta segment that every query scans exhaustively,
+removals become tombstones that queries skip. New cases are therefore
+searchable as soon as the next query syncs, without a rebuild.
+`compact()` (run periodically, e.g. `python ann_index.py --compact` from
+cron) folds the delta into the cells, drops tombstoned rows and writes a
+new snapshot.
+
+On-disk layout (one directory per kind, e.g. index/registered/):
+    manifest.json         — format version, current snapshot, journal seq, …
+    snap-<id>/centroids.npy  — (n_lists, d) float32 coarse centroids
+    snap-<id>/vectors.npy    — (n, d) float32 vectors, grouped by cell
+    snap-<id>/sq_norms.npy   — (n,) float32 squared norms of `vectors`
+    snap-<id>/ids.npy        — (n,) record ids, same order as `vectors`
+    snap-<id>/offsets.npy    — (n_lists + 1,) start of each cell in `vectors`
+
+Snapshots are immutable and the manifest is swapped atomically, so readers
+in other processes never see a half-written index. Arrays are opened with
+mmap_mode='r': loading is lazy and processes share pages via the OS cache.
+
+Usage:
+    python ann_index.py                    # build index/registered/
+    python ann_index.py --kind public      # build index/public/
+    python ann_index.py --compact          # fold journal updates into a snapshot
+=============================================================================
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from knn_search import nearest_neighbors, squared_norms
+
+
+INDEX_FORMAT_VERSION = 2
+INDEX_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index")
+INDEX_DIR = os.path.join(INDEX_ROOT, "registered")
+
+# k-means training: points sampled per centroid, Lloyd iterations
+KMEANS_POINTS_PER_LIST = 64
+KMEANS_ITERATIONS = 20
+DEFAULT_N_PROBE = 8
+
+# Journal rows read per round-trip, ids per vector lookup while syncing
+JOURNAL_BATCH_SIZE = 10_000
+SYNC_LOAD_BATCH_SIZE = 500
+# Older snapshots kept on disk for processes that still have them mapped
+SNAPSHOTS_KEPT = 2
+
+
+def default_n_lists(n: int) -> int:
+    """Rule of thumb: about 4·√n cells (≈1 265 for 100k vectors)."""
+    return max(1, min(n, int(4 * np.sqrt(n))))
+
+
+def index_dir(kind: str) -> str:
+    """Directory holding the index for 'registered' or 'public' vectors."""
+    return os.path.join(INDEX_ROOT, kind)
+
+
+# ---------------------------------------------------------------------------
+# Coarse quantizer
+# ---------------------------------------------------------------------------
+def train_kmeans(vectors: np.ndarray, n_lists: int, n_iter: int = KMEANS_ITERATIONS,
+                 seed: int = 0) -> np.ndarray:
+    """
+    Lloyd's k-means on a random sample of `vectors`.
+
+    Assignment uses the batched BLAS search from knn_search; empty cells are
+    re-seeded with random sample points so every centroid stays useful.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    sample_size = min(n, n_lists * KMEANS_POINTS_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(n, sample_size, replace=False))],
+                        dtype=np.float32)
+    centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignment = nearest_neighbors(sample, centroids, k=1)[1][:, 0]
+        counts = np.bincount(assignment, minlength=n_lists)
+        filled = counts > 0
+
+        # Segment sums over the sample sorted by cell (much faster than add.at)
+        order = np.argsort(assignment, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        sums = np.add.reduceat(sample[order], starts, axis=0, dtype=np.float64)
+        centroids[filled] = (sums / counts[filled, None]).astype(np.float32)
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+
+    return centroids
+
+
+def _group_by_cell(ids, vectors, cells, n_lists: int):
+    """Sort rows by cell; return (ids, vectors, sq_norms, offsets)."""
+    order = np.argsort(cells, kind="stable")
+    counts = np.bincount(cells, minlength=n_lists)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    grouped = np.ascontiguousarray(vectors[order], dtype=np.float32)
+    return ids[order], grouped, squared_norms(grouped).astype(np.float32), offsets
+
+
+# ---------------------------------------------------------------------------
+# Search kernels
+# ---------------------------------------------------------------------------
+def _score(queries, vectors, sq_norms, dead):
+    """Ranking scores ||b||² - 2 q·b (||q||² is constant per query)."""
+    block = queries @ np.asarray(vectors).T
+    block *= -2.0
+    block += sq_norms
+    if dead.any():
+        block[:, dead] = np.inf
+    return block
+
+
+def _merge(best_score, best_pos, q_rows, block, lo, k):
+    """Fold one block's candidate scores into the running per-query top-k."""
+    kk = min(k, block.shape[1])
+    if kk < block.shape[1]:
+        top = np.argpartition(block, kk - 1, axis=1)[:, :kk]
+    else:
+        top = np.broadcast_to(np.arange(block.shape[1]), block.shape)
+    scores = np.concatenate(
+        [best_score[q_rows], np.take_along_axis(block, top, axis=1)], axis=1
+    )
+    positions = np.concatenate([best_pos[q_rows], top + lo], axis=1)
+    positions[np.isinf(scores)] = -1
+    keep = np.argpartition(scores, k - 1, axis=1)[:, :k]
+    best_score[q_rows] = np.take_along_axis(scores, keep, axis=1)
+    best_pos[q_rows] = np.take_along_axis(positions, keep, axis=1)
+
+
+def _finalize(queries, best_pos, main, delta):
+    """Exactly re-score the surviving candidates (snapshot or delta rows) and sort."""
+    n_main = len(main[2])
+    found = best_pos >= 0
+    positions = np.where(found, best_pos, 0)
+    in_main = positions < n_main
+
+    rows = np.empty(positions.shape + (queries.shape[1],), dtype=np.float64)
+    rows[in_main] = main[0][positions[in_main]]
+    rows[~in_main] = delta[0][positions[~in_main] - n_main]
+    rows -= queries[:, None, :]
+    distances = np.sqrt(np.einsum("ijk,ijk->ij", rows, rows))
+    distances[~found] = np.inf
+
+    order = np.argsort(distances, axis=1, kind="stable")
+    distances = np.take_along_axis(distances, order, axis=1)
+    best_pos = np.take_along_axis(best_pos, order, axis=1)
+
+    all_ids = np.concatenate([main[2], delta[2]])
+    ids = np.where(best_pos >= 0, all_ids[np.maximum(best_pos, 0)], None)
+    return ids, distances
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+class IVFIndex:
+    """
+    Inverted-file index with a brute-force delta segment and tombstones.
+
+    Row positions [0, n_main) address the cell-grouped snapshot arrays and
+    [n_main, n_main + n_delta) the delta segment; `deleted` covers both.
+    """
+
+    def __init__(self, centroids, vectors, sq_norms, ids, offsets,
+                 n_probe: int = DEFAULT_N_PROBE, path: str = None,
+                 kind: str = "registered", journal_seq: int = 0):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.sq_norms = sq_norms
+        self.ids = ids
+        self.offsets = offsets
+        self.n_probe = n_probe
+        self.path = path
+        self.kind = kind
+        self.journal_seq = journal_seq
+
+        dim = centroids.shape[1]
+        self.delta_vectors = np.empty((0, dim), dtype=np.float32)
+        self.delta_sq_norms = np.empty(0, dtype=np.float32)
+        self.delta_ids = np.empty(0, dtype=object)
+        self.deleted = np.zeros(len(ids), dtype=bool)
+        self._positions = None
+        self._lock = threading.RLock()
+
+    # -- construction -------------------------------------------------------
+    @classmethod
+    def build(cls, ids, vectors, n_lists: int = None, n_probe: int = DEFAULT_N_PROBE,
+              seed: int = 0, kind: str = "registered") -> "IVFIndex":
+        """Cluster `vectors` into `n_lists` cells and group them by cell."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=object)
+        if len(vectors) == 0:
+            raise ValueError("Cannot build an index over zero vectors.")
+
+        n_lists = n_lists or default_n_lists(len(vectors))
+        centroids = train_kmeans(vectors, n_lists, seed=seed)
+        cells = nearest_neighbors(vectors, centroids, k=1)[1][:, 0]
+        ids, grouped, sq_norms, offsets = _group_by_cell(ids, vectors, cells, n_lists)
+
+        return cls(centroids=centroids, vectors=grouped, sq_norms=sq_norms, ids=ids,
+                   offsets=offsets, n_probe=n_probe, kind=kind)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def n_main(self) -> int:
+        return len(self.ids)
+
+    def __len__(self) -> int:
+        """Number of live (non-tombstoned) vectors."""
+        return self.n_main + len(self.delta_ids) - int(self.deleted.sum())
+
+    def stats(self) -> dict:
+        """Sizes useful for deciding when to compact."""
+        return {
+            "live": len(self),
+            "snapshot_rows": self.n_main,
+            "delta_rows": len(self.delta_ids),
+            "tombstones": int(self.deleted.sum()),
+            "journal_seq": self.journal_seq,
+        }
+
+    # -- incremental updates ------------------------------------------------
+    def _position_map(self) -> dict:
+        """id → live row position (built on first update, then maintained)."""
+        if self._positions is None:
+            all_ids = np.concatenate([np.asarray(self.ids, dtype=object), self.delta_ids])
+            live = np.flatnonzero(~self.deleted)
+            self._positions = dict(zip(all_ids[live], live.tolist()))
+        return self._positions
+
+    def add(self, ids, vectors) -> int:
+        """Append vectors to the delta segment, skipping ids already live."""
+        with self._lock:
+            positions = self._position_map()
+            keep, seen = [], set()
+            for i, record_id in enumerate(ids):
+                if record_id not in positions and record_id not in seen:
+                    keep.append(i)
+                    seen.add(record_id)
+            if not keep:
+                return 0
+
+            new_vectors = np.asarray(vectors, dtype=np.float32)[keep]
+            start = self.n_main + len(self.delta_ids)
+            self.delta_vectors = np.concatenate([self.delta_vectors, new_vectors])
+            self.delta_sq_norms = np.concatenate(
+                [self.delta_sq_norms, squared_norms(new_vectors).astype(np.float32)]
+            )
+            self.delta_ids = np.concatenate(
+                [self.delta_ids, np.asarray(ids, dtype=object)[keep]]
+            )
+            self.deleted = np.concatenate([self.deleted, np.zeros(len(keep), dtype=bool)])
+            for offset, i in enumerate(keep):
+                positions[ids[i]] = start + offset
+            return len(keep)
+
+    def remove(self, ids) -> int:
+        """Tombstone the given ids; unknown ids are ignored."""
+        with self._lock:
+            positions = self._position_map()
+            dead = [positions.pop(record_id) for record_id in ids if record_id in positions]
+            if dead:
+                deleted = self.deleted.copy()
+                deleted[dead] = True
+                self.deleted = deleted
+            return len(dead)
+
+    def apply_journal(self, rows, loader) -> int:
+        """
+        Apply (seq, op, record_id) journal rows in order.
+
+        Removals are applied first, then additions that were not removed
+        again later in the same batch; `loader(status=None, ids=…)` fetches
+        the vectors to add.
+        """
+        pending, removed = {}, []
+        for _, op, record_id in rows:
+            if op == "add":
+                pending[record_id] = True
+            else:
+                pending.pop(record_id, None)
+                removed.append(record_id)
+
+        with self._lock:
+            changed = self.remove(removed)
+            add_ids = list(pending)
+            for start in range(0, len(add_ids), SYNC_LOAD_BATCH_SIZE):
+                ids, vectors = loader(status=None, ids=add_ids[start:start + SYNC_LOAD_BATCH_SIZE])
+                changed += self.add(ids, vectors)
+            self.journal_seq = rows[-1][0]
+        return changed
+
+    # -- search -------------------------------------------------------------
+    def query(self, vectors, k: int = 1, n_probe: int = None):
+        """
+        Approximate k-nearest neighbours for each query vector.
+
+        Updates replace arrays instead of writing into them, so the search
+        runs on references taken under the lock and concurrent queries do
+        not serialize on it.
+
+        Returns
+        -------
+        ids : np.ndarray       — (m, k) record ids (None where fewer than k found)
+        distances : np.ndarray — (m, k) float64 Euclidean distances (inf if none)
+        """
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        m = len(queries)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+
+        best_score = np.full((m, k), np.inf, dtype=np.float32)
+        best_pos = np.full((m, k), -1, dtype=np.int64)
+        if m == 0 or len(self) == 0:
+            return np.full((m, k), None, dtype=object), best_score.astype(np.float64)
+
+        with self._lock:
+            centroids, offsets, deleted = self.centroids, self.offsets, self.deleted
+            main = (self.vectors, self.sq_norms, np.asarray(self.ids, dtype=object))
+            delta = (self.delta_vectors, self.delta_sq_norms, self.delta_ids)
+        n_main = len(main[2])
+
+        probes = nearest_neighbors(queries, centroids, k=n_probe)[1]
+
+        # Group (query, cell) pairs by cell so each cell is scanned once
+        flat_cells = probes.ravel()
+        flat_queries = np.repeat(np.arange(m), n_probe)
+        order = np.argsort(flat_cells, kind="stable")
+        flat_cells, flat_queries = flat_cells[order], flat_queries[order]
+        bounds = np.flatnonzero(np.diff(flat_cells)) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(flat_cells)]])
+
+        for a, b in zip(starts, ends):
+            cell = flat_cells[a]
+            lo, hi = offsets[cell], offsets[cell + 1]
+            if lo == hi:
+                continue
+            q_rows = flat_queries[a:b]
+            block = _score(queries[q_rows], main[0][lo:hi], main[1][lo:hi], deleted[lo:hi])
+            _merge(best_score, best_pos, q_rows, block, lo, k)
+
+        if len(delta[2]):
+            block = _score(queries, delta[0], delta[1], deleted[n_main:])
+            _merge(best_score, best_pos, np.arange(m), block, n_main, k)
+
+        return _finalize(queries, best_pos, main, delta)
+
+    # -- compaction & persistence -------------------------------------------
+    def compact(self, path: str = None):
+        """
+        Fold the delta segment into the cells (using the existing centroids),
+        drop tombstoned rows and persist the result as a new snapshot.
+        """
+        with self._lock:
+            live = ~self.deleted
+            main_live = live[:self.n_main]
+            delta_live = live[self.n_main:]
+
+            main_cells = np.repeat(np.arange(self.n_lists), np.diff(self.offsets))[main_live]
+            delta_vectors = self.delta_vectors[delta_live]
+            delta_cells = (
+                nearest_neighbors(delta_vectors, self.centroids, k=1)[1][:, 0]
+                if len(delta_vectors) else np.empty(0, dtype=np.int64)
+            )
+
+            ids = np.concatenate([np.asarray(self.ids, dtype=object)[main_live],
+                                  self.delta_ids[delta_live]])
+            vectors = np.concatenate([np.asarray(self.vectors)[main_live], delta_vectors])
+            cells = np.concatenate([main_cells, delta_cells])
+            self.ids, self.vectors, self.sq_norms, self.offsets = _group_by_cell(
+                ids, vectors, cells, self.n_lists
+            )
+
+            dim = self.centroids.shape[1]
+            self.delta_vectors = np.empty((0, dim), dtype=np.float32)
+            self.delta_sq_norms = np.empty(0, dtype=np.float32)
+            self.delta_ids = np.empty(0, dtype=object)
+            self.deleted = np.zeros(len(self.ids), dtype=bool)
+            self._positions = None
+            self.save(path or self.path)
+
+    def save(self, path: str = INDEX_DIR):
+        """Write the snapshot arrays to a new directory, then swap the manifest."""
+        with self._lock:
+            if len(self.delta_ids) or self.deleted.any():
+                return self.compact(path)
+
+            snapshot = f"snap-{int(time.time() * 1000)}"
+            snapshot_dir = os.path.join(path, snapshot)
+            os.makedirs(snapshot_dir, exist_ok=True)
+            np.save(os.path.join(snapshot_dir, "centroids.npy"), np.asarray(self.centroids))
+            np.save(os.path.join(snapshot_dir, "vectors.npy"), np.asarray(self.vectors))
+            np.save(os.path.join(snapshot_dir, "sq_norms.npy"), np.asarray(self.sq_norms))
+            np.save(os.path.join(snapshot_dir, "ids.npy"), np.asarray(self.ids, dtype=str))
+            np.save(os.path.join(snapshot_dir, "offsets.npy"), np.asarray(self.offsets))
+
+            manifest = {
+                "format_version": INDEX_FORMAT_VERSION,
+                "kind": self.kind,
+                "snapshot": snapshot,
+                "journal_seq": self.journal_seq,
+                "dim": int(self.centroids.shape[1]),
+                "n_lists": self.n_lists,
+                "n_probe": self.n_probe,
+                "count": self.n_main,
+                "built_at": datetime.utcnow().isoformat(),
+            }
+            tmp_path = os.path.join(path, "manifest.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, os.path.join(path, "manifest.json"))
+            self.path = path
+            _prune_snapshots(path, keep=snapshot)
+
+    @classmethod
+    def load(cls, path: str = INDEX_DIR, mmap: bool = True) -> "IVFIndex":
+        """Open the current snapshot under `path`; arrays are memory-mapped by default."""
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported index format {manifest.get('format_version')} in {path}; "
+                f"rebuild it with `python ann_index.py`."
+            )
+
+        snapshot_dir = os.path.join(path, manifest["snapshot"])
+        mode = "r" if mmap else None
+        return cls(
+            centroids=np.load(os.path.join(snapshot_dir, "centroids.npy")),
+            vectors=np.load(os.path.join(snapshot_dir, "vectors.npy"), mmap_mode=mode),
+            sq_norms=np.load(os.path.join(snapshot_dir, "sq_norms.npy"), mmap_mode=mode),
+            ids=np.load(os.path.join(snapshot_dir, "ids.npy")).astype(object),
+            offsets=np.load(os.path.join(snapshot_dir, "offsets.npy")),
+            n_probe=manifest["n_probe"],
+            path=path,
+            kind=manifest["kind"],
+            journal_seq=manifest["journal_seq"],
+        )
+
+
+def _prune_snapshots(path: str, keep: str):
+    """Delete all but the newest SNAPSHOTS_KEPT snapshot directories."""
+    snapshots = sorted(d for d in os.listdir(path) if d.startswith("snap-"))
+    for name in snapshots[:-SNAPSHOTS_KEPT]:
+        if name != keep:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Journal replay
+# ---------------------------------------------------------------------------
+def sync_index(index: IVFIndex) -> int:
+    """
+    Bring `index` up to date with the IndexJournal table.
+
+    Cheap when nothing changed (one indexed SELECT), so callers can sync
+    before every query. Returns the number of vectors added or removed.
+    """
+    from feature_loader import LOADERS, backend_cwd, import_db_queries
+
+    db_queries = import_db_queries()
+    changed = 0
+    while True:
+        with backend_cwd():
+            rows = db_queries.fetch_index_journal(
+                index.kind, after_seq=index.journal_seq, limit=JOURNAL_BATCH_SIZE
+            )
+        if not rows:
+            return changed
+        changed += index.apply_journal(rows, LOADERS[index.kind])
+
+
+# ---------------------------------------------------------------------------
+# Lazy, process-wide access
+# ---------------------------------------------------------------------------
+_index_cache = {}
+_index_lock = threading.Lock()
+
+
+def get_index(kind: str = "registered", sync: bool = True) -> IVFIndex:
+    """
+    Return the index for `kind`, loading it on first use.
+
+    The cached instance is reused until another process swaps the manifest
+    (e.g. after compaction), at which point it is reloaded. With `sync=True`
+    pending journal entries are applied before returning.
+    """
+    path = index_dir(kind)
+    mtime = os.path.getmtime(os.path.join(path, "manifest.json"))
+    with _index_lock:
+        cached = _index_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, IVFIndex.load(path))
+            _index_cache[path] = cached
+        index = cached[1]
+    if sync:
+        sync_index(index)
+    return index
+
+
+def build_index(kind: str = "registered", n_lists: int = None,
+                n_probe: int = DEFAULT_N_PROBE) -> dict:
+    """Build the IVF index over NF vectors of `kind` and persist it."""
+    from feature_loader import LOADERS, backend_cwd, import_db_queries
+
+    # Read the journal head first: anything newer is replayed on top later
+    db_queries = import_db_queries()
+    with backend_cwd():
+        journal_seq = db_queries.get_index_journal_head()
+
+    ids, vectors = LOADERS[kind](status="NF")
+    if len(ids) == 0:
+        return {"status": False, "message": f"No {kind} vectors to index."}
+
+    index = IVFIndex.build(ids, vectors, n_lists=n_lists, n_probe=n_probe, kind=kind)
+    index.journal_seq = journal_seq
+    index.save(index_dir(kind))
+    return {
+        "status": True,
+        "message": f"Index built: {len(index):,} {kind} vectors in "
+                   f"{index.n_lists} lists → {index_dir(kind)}",
+    }
+
+
+def compact_index(kind: str = "registered") -> dict:
+    """Sync the index with the journal and write a compacted snapshot."""
+    index = get_index(kind, sync=True)
+    before = index.stats()
+    index.compact()
+    return {"status": True, "message": f"Compacted {kind} index: {before} → {index.stats()}"}
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or compact the IVF index.")
+    parser.add_argument("--kind", choices=["registered", "public"], default="registered")
+    parser.add_argument("--compact", action="store_true",
+                        help="Fold journal updates into a new snapshot instead of rebuilding.")
+    args = parser.parse_args()
+
+    if args.compact:
+        print(f"🔄 Compacting {args.kind} index…\n")
+        print(f"📋 Result: {compact_index(args.kind)}")
+    else:
+        print(f"🔄 Building IVF index over {args.kind} vectors…\n")
+        print(f"📋 Result: {build_index(args.kind)}")
@@ -0,0 +1,169 @@
+"""
+=============================================================================
+  Week 2 — ML Engineer
+  File: ann_report.py
+  Purpose: Recall-vs-latency report for the IVF index against exact search.
+=============================================================================
+
+Builds an IVFIndex over a corpus, then sweeps `n_probe` and reports, for
+each setting:
+  - recall@1 and recall@k against the exact search used by
+    `baseline_match.match` (knn_search.nearest_neighbors),
+  - batched throughput (ms per query),
+  - single-query latency p50 / p95 (ms),
+  - fraction of the corpus scanned per query.
+
+The default corpus is synthetic and clustered, with queries drawn as noisy
+copies of indexed vectors (the shape of a real re-sighting). Use
+`--source db` to run against the NF registered cases instead, with the NF
+public submissions as queries.
+
+Usage:
+    python ann_report.py --n 100000 --queries 1000 --k 10
+    python ann_report.py --source db --json ann_report.json
+=============================================================================
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+
+from ann_index import IVFIndex, default_n_lists
+from knn_search import nearest_neighbors
+
+DIM = 1404
+DEFAULT_PROBES = (1, 2, 4, 8, 16, 32, 64)
+
+
+def synthetic_corpus(n: int, n_queries: int, n_clusters: int = 256,
+                     noise: float = 0.01, seed: int = 0):
+    """Clustered base vectors plus queries that are noisy copies of base rows."""
+    rng = np.random.default_rng(seed)
+    centers = rng.random((n_clusters, DIM), dtype=np.float32)
+    base = centers[rng.integers(0, n_clusters, n)]
+    base += rng.normal(0, 0.05, base.shape).astype(np.float32)
+    picked = rng.integers(0, n, n_queries)
+    queries = base[picked] + rng.normal(0, noise, (n_queries, DIM)).astype(np.float32)
+    ids = np.array([f"case-{i}" for i in range(n)], dtype=object)
+    return ids, base, queries
+
+
+def db_corpus():
+    """NF registered cases as the corpus, NF public submissions as queries."""
+    from feature_loader import load_public_vectors, load_registered_vectors
+
+    ids, base = load_registered_vectors(status="NF")
+    _, queries = load_public_vectors(status="NF")
+    return ids, base, queries
+
+
+def _recall(approx_ids, exact_ids, k: int) -> float:
+    """Fraction of the exact top-k ids that appear in the approximate top-k."""
+    hits = sum(
+        len(set(a[:k]) & set(e[:k])) for a, e in zip(approx_ids, exact_ids)
+    )
+    return hits / max(1, exact_ids[:, :k].size)
+
+
+def run_report(ids, base, queries, k: int = 10, n_lists: int = None,
+               probes=DEFAULT_PROBES, latency_samples: int = 200) -> dict:
+    """Build the index, sweep n_probe and return the report as a dict."""
+    n_lists = n_lists or default_n_lists(len(base))
+    if len(queries) == 0:
+        return {"corpus_size": len(base), "queries": 0, "k": k, "sweep": []}
+
+    start = time.perf_counter()
+    index = IVFIndex.build(ids, base, n_lists=n_lists)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact_pos = nearest_neighbors(queries, base, k=k)[1]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    exact_ids = np.asarray(ids)[exact_pos]
+
+    sizes = np.diff(index.offsets)
+    probed = nearest_neighbors(queries, index.centroids, k=min(max(probes), index.n_lists))[1]
+    rows = []
+    for n_probe in probes:
+        if n_probe > index.n_lists:
+            break
+        start = time.perf_counter()
+        approx_ids, _ = index.query(queries, k=k, n_probe=n_probe)
+        batch_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        single = []
+        for q in queries[:latency_samples]:
+            t0 = time.perf_counter()
+            index.query(q, k=k, n_probe=n_probe)
+            single.append((time.perf_counter() - t0) * 1000)
+
+        rows.append({
+            "n_probe": n_probe,
+            "recall@1": _recall(approx_ids, exact_ids, 1),
+            f"recall@{k}": _recall(approx_ids, exact_ids, k),
+            "batch_ms_per_query": batch_ms,
+            "single_p50_ms": float(np.percentile(single, 50)),
+            "single_p95_ms": float(np.percentile(single, 95)),
+            "scanned_fraction": float(
+                sizes[probed[:, :n_probe]].sum(axis=1).mean() / max(1, len(base))
+            ),
+        })
+
+    return {
+        "corpus_size": len(base),
+        "queries": len(queries),
+        "k": k,
+        "n_lists": index.n_lists,
+        "build_seconds": build_seconds,
+        "exact_batch_ms_per_query": exact_ms,
+        "sweep": rows,
+    }
+
+
+def print_report(report: dict):
+    k = report["k"]
+    print("=" * 78)
+    print("  IVF Recall vs Latency Report")
+    print("=" * 78)
+    print(f"   Corpus size        : {report['corpus_size']:,}")
+    print(f"   Queries            : {report['queries']:,}")
+    if not report["queries"]:
+        print("\n   No queries — nothing to report.")
+        return
+    print(f"   n_lists            : {report['n_lists']}")
+    print(f"   Build time         : {report['build_seconds']:.2f} s")
+    print(f"   Exact search       : {report['exact_batch_ms_per_query']:.3f} ms/query (batched)")
+    print()
+    print(f"   {'n_probe':>7} {'R@1':>7} {f'R@{k}':>7} {'batch ms':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'scanned':>8}")
+    for row in report["sweep"]:
+        print(
+            f"   {row['n_probe']:>7} {row['recall@1']:>7.3f} {row[f'recall@{k}']:>7.3f} "
+            f"{row['batch_ms_per_query']:>9.3f} {row['single_p50_ms']:>8.3f} "
+            f"{row['single_p95_ms']:>8.3f} {row['scanned_fraction']:>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IVF recall-vs-latency report.")
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--n", type=int, default=100_000, help="Synthetic corpus size.")
+    parser.add_argument("--queries", type=int, default=1_000, help="Synthetic query count.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--json", default=None, help="Also write the report here.")
+    args = parser.parse_args()
+
+    if args.source == "db":
+        ids, base, queries = db_corpus()
+    else:
+        ids, base, queries = synthetic_corpus(args.n, args.queries)
+
+    report = run_report(ids, base, queries, k=args.k, n_lists=args.n_lists)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
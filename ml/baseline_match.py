@@ -6,160 +6,501 @@
 =============================================================================
 
 This script runs the matching algorithm that compares public submissions
-against registered cases using KNN on face-mesh landmarks.
+against registered cases using exact nearest-neighbour search on face-mesh
+landmarks. All submissions are scored in one batched pass (chunked BLAS
+distance computation) rather than one tree search per row.
+
+Matching is incremental. The top-k cases per submission are stored in
+CandidateMatches (read back by the review UI) and a MatchWatermark per
+table records the last IndexJournal seq already scored (commit order, so
+back-dated rows are not skipped), so each run only scores
+  - new submissions against all NF cases, and
+  - older submissions against newly registered cases only,
+and then reads the nearest stored candidate per submission. On an
+unchanged database a run is a handful of small queries. The distance space
+(raw or normalized landmarks, and the PCA projection if any) is stored with
+the watermarks; a run in a different space re-scores everything instead of
+mixing distances.
 
 Usage:
-    python baseline_match.py
+    python baseline_match.py          # score only what changed
+    python baseline_match.py --full   # re-score everything
+    python baseline_match.py --metrics match.prom   # + stage timings
+    python baseline_match.py --workers 8  # exact search on 8 processes
+    python baseline_match.py --full --pca 128   # search in 128 PCA dimensions
+    python baseline_match.py --full --pca 128 --whiten   # … with the whitened projection
+    python baseline_match.py --full --normalized   # pose-normalized landmarks
+    python baseline_match.py --quantized pq   # scan PQ codes, exact re-rank
+    python baseline_match.py --full --cascade 200   # landmark prefilter, top 200 re-ranked
+    python baseline_match.py --sharded   # region-first (build sharded_index.py first)
 =============================================================================
 """
 
-import os
-import sys
-import json
+import argparse
 import traceback
 import warnings
 from collections import defaultdict
+from functools import partial
 
-import pandas as pd
 import numpy as np
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.preprocessing import LabelEncoder
+
+from ann_index import get_index
+from cascade_search import cascade_nearest_neighbors
+from feature_loader import (
+    backend_cwd,
+    import_db_queries,
+    load_public_vectors,
+    load_registered_vectors,
+    metrics,
+)
+from knn_search import DEFAULT_CHUNK_SIZE, nearest_neighbors
+from parallel_search import parallel_nearest_neighbors
+from projection import get_projection
+from quantization import get_quantized_index
+from sharded_index import get_sharded_index, submission_regions
 
 warnings.filterwarnings(action="ignore")
 
-# ---------------------------------------------------------------------------
-BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
-sys.path.insert(0, BACKEND_DIR)
+# Candidates stored per submission
+DEFAULT_TOP_K = 5
+
+# Recorded with each candidate so reviewers know which scorer produced it
+MODEL_VERSION_EXACT = "exact-l2"
+MODEL_VERSION_IVF = "ivf-l2"
+
+# Worker processes for exact search (1 = search in this process)
+MATCH_WORKERS = 1
+# Smaller scans (submissions × cases) stay in this process even with workers > 1:
+# spawning the pool costs ~0.5-1 s per worker, as long as ~10M pairs take on one core
+PARALLEL_MIN_PAIRS = 50_000_000
+
+# PCA dimensions used for exact search (None = all 1404; see projection.py)
+MATCH_PCA_COMPONENTS = None
+# Use the whitened shared projection (only with MATCH_PCA_COMPONENTS)
+MATCH_PCA_WHITEN = False
+
+# Score pose-normalized landmarks (face_mesh_norm) instead of raw ones
+MATCH_NORMALIZED = False
+
+# Quantized index scanned for new submissions (None = exact; see quantization.py)
+MATCH_QUANTIZATION = None
+
+# Stage-1 survivors of the landmark-subset cascade (None = full scan; see cascade_search.py)
+MATCH_CASCADE_CANDIDATES = None
+
+# Search new submissions in their region's shards first (see sharded_index.py)
+MATCH_SHARDED = False
 
 
 # ---------------------------------------------------------------------------
 # Data loaders
 # ---------------------------------------------------------------------------
 def get_public_cases_data(status="NF"):
-    """Fetch public submissions with face-mesh data."""
-    original_cwd = os.getcwd()
-    os.chdir(BACKEND_DIR)
+    """Fetch (ids, features) for public submissions, or None on DB error."""
+    try:
+        return load_public_vectors(status=status)
+    except Exception:
+        traceback.print_exc()
+        return None
 
-    import db_queries
 
+def get_registered_cases_data(status="NF"):
+    """Fetch (ids, features) for registered cases, or None on DB error."""
     try:
-        result = db_queries.fetch_public_cases(train_data=True, status=status)
-        d1 = pd.DataFrame(result, columns=["label", "face_mesh"])
-        d1["face_mesh"] = d1["face_mesh"].apply(lambda x: json.loads(x))
-        d2 = pd.DataFrame(
-            d1.pop("face_mesh").values.tolist(), index=d1.index
-        ).rename(columns=lambda x: f"fm_{x + 1}")
-        df = d1.join(d2)
-        for col in df.columns:
-            if col != "label":
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-        os.chdir(original_cwd)
-        return df
-    except Exception as e:
-        os.chdir(original_cwd)
+        return load_registered_vectors(status=status)
+    except Exception:
         traceback.print_exc()
         return None
 
 
-def get_registered_cases_data(status="NF"):
-    """Fetch registered cases with face-mesh data."""
-    original_cwd = os.getcwd()
-    os.chdir(BACKEND_DIR)
+# ---------------------------------------------------------------------------
+# Batch nearest-neighbour lookup
+# ---------------------------------------------------------------------------
+def find_top_k(public_features, registered_ids, registered_features, k: int = 1,
+               chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = MATCH_WORKERS,
+               cascade: int = MATCH_CASCADE_CANDIDATES):
+    """
+    Find the `k` nearest registered cases for every public submission at once.
 
-    from db_queries import engine
-    from data_models import RegisteredCases
-    from sqlmodel import Session, select
+    Public rows are scored against the whole registered matrix in chunks of
+    `chunk_size`, one BLAS call per chunk (see knn_search.nearest_neighbors).
+    With `workers` > 1 the chunks of scans of at least PARALLEL_MIN_PAIRS
+    pairs are spread over that many processes (parallel_search.py); the
+    results are identical. With `cascade` = C the
+    cases are first ranked on a landmark subset and only the best C per
+    submission are scored on the full vector; submissions the subset cannot
+    certify are re-scanned, so results stay exact (cascade_search.py).
 
-    try:
-        with Session(engine) as session:
-            result = session.exec(
-                select(
-                    RegisteredCases.id,
-                    RegisteredCases.face_mesh,
-                    RegisteredCases.status,
+    Returns
+    -------
+    nearest_ids : np.ndarray — (m, min(k, n)) registered ids, nearest first
+    distances : np.ndarray   — matching Euclidean distances
+    """
+    search, method = nearest_neighbors, "exact"
+    if cascade:
+        search, method = partial(cascade_nearest_neighbors, candidates=cascade), "cascade"
+    elif workers > 1 and len(public_features) * len(registered_ids) >= PARALLEL_MIN_PAIRS:
+        search = partial(parallel_nearest_neighbors, workers=workers)
+    with metrics.span("traceai_stage_seconds", stage="search", method=method):
+        distances, indices = search(
+            public_features, registered_features,
+            k=min(k, len(registered_ids)), chunk_size=chunk_size,
+        )
+    metrics.inc("traceai_pairs_scored_total", len(public_features) * len(registered_ids),
+                method=method)
+    return np.asarray(registered_ids)[indices], distances
+
+
+def find_nearest(public_features, registered_ids, registered_features,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Find the nearest registered case for every public submission at once.
+
+    Returns
+    -------
+    nearest_ids : np.ndarray — registered id closest to each submission
+    distances : np.ndarray   — Euclidean distance to that case
+    """
+    nearest_ids, distances = find_top_k(
+        public_features, registered_ids, registered_features, k=1, chunk_size=chunk_size
+    )
+    return nearest_ids[:, 0], distances[:, 0]
+
+
+# ---------------------------------------------------------------------------
+# Incremental scoring
+# ---------------------------------------------------------------------------
+def _load_public_by_ids(public_ids, chunk: int = 500, normalized: bool = False):
+    """(ids, features) of the given NF submissions, fetched `chunk` ids at a time."""
+    parts = [
+        load_public_vectors(ids=public_ids[i:i + chunk], normalized=normalized)
+        for i in range(0, len(public_ids), chunk)
+    ]
+    if not parts:
+        return load_public_vectors(ids=[], normalized=normalized)
+    return (np.concatenate([p[0] for p in parts]),
+            np.concatenate([p[1] for p in parts]))
+
+
+def _exact_version(projection, normalized: bool = False, cascade: int = None,
+                   sharded: bool = False) -> str:
+    """model_version of exact-search candidates, e.g. 'norm-pca128-l2'."""
+    version = MODEL_VERSION_EXACT
+    if sharded:
+        version = "shard-l2"
+    elif cascade:
+        version = f"cascade{cascade}-l2"
+    elif projection is not None:
+        version = f"pca{projection.n_components}{'w' if projection.whiten else ''}-l2"
+    return f"norm-{version}" if normalized else version
+
+
+def scoring_space(projection=None, normalized: bool = False) -> str:
+    """
+    Distance space of stored candidates, e.g. 'raw' or 'norm-pca128w:<fit time>'.
+
+    IVF, quantized, cascade and sharded scoring re-rank on the same vectors
+    as the exact scan, so only the vectors and the projection count.
+    """
+    space = "norm" if normalized else "raw"
+    if projection is not None:
+        space += (f"-pca{projection.n_components}{'w' if projection.whiten else ''}"
+                  f":{projection.info.get('created_at', '')}")
+    return space
+
+
+def _candidate_rows(public_ids, nearest_ids, distances, model_version: str):
+    """Flatten (m, k) search results into CandidateMatches rows."""
+    return [
+        (public_id, registered_id, distance, model_version)
+        for public_id, row_ids, row_distances in zip(public_ids, nearest_ids, distances)
+        for registered_id, distance in zip(row_ids, row_distances)
+        if registered_id is not None
+    ]
+
+
+def score_new_rows(watermarks: dict, newest: dict, stale_ids=(), k: int = DEFAULT_TOP_K,
+                   use_index: bool = False, workers: int = MATCH_WORKERS,
+                   projection=None, normalized: bool = False,
+                   quantization: str = None, cascade: int = None,
+                   sharded: bool = False) -> list:
+    """
+    Score every (submission, case) pair the stored candidates do not cover.
+
+    Parameters
+    ----------
+    watermarks : dict
+        {kind: IndexJournal.seq} already scored (empty = first / full run).
+    newest : dict
+        {kind: IndexJournal.seq} of the journal head; this run scores up to
+        it and it becomes the next watermarks.
+    stale_ids : list of str
+        Already-scored submissions to re-score against every NF case.
+    k : int
+        Candidates kept per submission and scoring pass.
+    use_index : bool
+        Score new submissions with the IVF index instead of an exact scan.
+    workers : int
+        Processes used by the exact scans (see find_top_k).
+    projection : projection.Projection, optional
+        Project both sides before the exact scans.
+    normalized : bool
+        Score the stored pose-normalized vectors instead of the raw ones.
+    quantization : str, optional
+        Score new submissions with this quantized index (codec name) instead
+        of an exact scan; candidates are re-ranked exactly.
+    cascade : int, optional
+        Stage-1 survivors per submission for the cascade exact scans.
+    sharded : bool
+        Score new submissions against the region / age-band shards of their
+        location first (`workers` threads run the shard jobs).
+
+    Returns
+    -------
+    list of (public_id, registered_id, distance, model_version)
+    """
+    public_mark = watermarks.get("public")
+    registered_mark = watermarks.get("registered")
+    exact_version = _exact_version(projection, normalized, cascade)
+    project = projection.transform if projection is not None else (lambda x: x)
+    rows = []
+
+    # 1. New (and stale) submissions against every NF case
+    new_ids, new_features = load_public_vectors(after=public_mark, upto=newest["public"],
+                                                normalized=normalized)
+    if len(stale_ids):
+        stale = _load_public_by_ids(list(stale_ids), normalized=normalized)
+        new_ids = np.concatenate([new_ids, stale[0]])
+        new_features = np.concatenate([new_features, stale[1]])
+
+    if len(new_ids):
+        if use_index:
+            index = get_index()
+            with metrics.span("traceai_stage_seconds", stage="search", method="ivf"):
+                nearest_ids, distances = index.query(new_features, k=k)
+            rows.extend(_candidate_rows(new_ids, nearest_ids, distances, MODEL_VERSION_IVF))
+        elif quantization:
+            index = get_quantized_index(quantization)
+            nearest_ids, distances = index.search(new_features, k=k)
+            rows.extend(_candidate_rows(new_ids, nearest_ids, distances, f"{quantization}-l2"))
+        elif sharded:
+            index = get_sharded_index()
+            if len(index):
+                nearest_ids, distances = index.query(new_features, submission_regions(new_ids),
+                                                     k=k, workers=workers)
+                rows.extend(_candidate_rows(new_ids, nearest_ids, distances,
+                                            _exact_version(None, normalized, sharded=True)))
+        else:
+            reg_ids, reg_features = load_registered_vectors(upto=newest["registered"],
+                                                            normalized=normalized)
+            if len(reg_ids):
+                nearest_ids, distances = find_top_k(
+                    project(new_features), reg_ids, project(reg_features), k,
+                    workers=workers, cascade=cascade,
                 )
-            ).all()
-            d1 = pd.DataFrame(result, columns=["label", "face_mesh", "status"])
-            if status:
-                d1 = d1[d1["status"] == status]
-            d1["face_mesh"] = d1["face_mesh"].apply(lambda x: json.loads(x))
-            d2 = pd.DataFrame(
-                d1.pop("face_mesh").values.tolist(), index=d1.index
-            ).rename(columns=lambda x: f"fm_{x + 1}")
-            df = d1.join(d2)
-            for col in df.columns:
-                if col not in ["label", "status"]:
-                    df[col] = pd.to_numeric(df[col], errors="coerce")
-            os.chdir(original_cwd)
-            return df
-    except Exception as e:
-        os.chdir(original_cwd)
-        traceback.print_exc()
-        return None
+                rows.extend(_candidate_rows(new_ids, nearest_ids, distances, exact_version))
+
+    # 2. Already-scored submissions against newly registered cases only
+    if public_mark is not None:
+        reg_ids, reg_features = load_registered_vectors(
+            after=registered_mark, upto=newest["registered"], normalized=normalized
+        )
+        if len(reg_ids):
+            old_ids, old_features = load_public_vectors(upto=public_mark,
+                                                        normalized=normalized)
+            if len(old_ids):
+                nearest_ids, distances = find_top_k(
+                    project(old_features), reg_ids, project(reg_features), k,
+                    workers=workers, cascade=cascade,
+                )
+                rows.extend(_candidate_rows(old_ids, nearest_ids, distances, exact_version))
+
+    return rows
+
+
+def _scoring_error(error: Exception, use_index: bool, quantization: str,
+                   sharded: bool = False) -> str:
+    """User-facing message for an OSError / ValueError raised while scoring."""
+    if isinstance(error, OSError) and use_index:
+        return f"IVF index not available ({error}); build it with ann_index.py."
+    if isinstance(error, OSError) and sharded:
+        return f"Sharded index not available ({error}); build it with sharded_index.py."
+    if isinstance(error, OSError) and quantization:
+        return (f"{quantization} index not available ({error}); build it with "
+                f"quantization.py --codec {quantization}.")
+    if isinstance(error, OSError):
+        return f"Couldn't read the face-mesh vectors: {error}"
+    return f"Scoring failed: {error}"
 
 
 # ---------------------------------------------------------------------------
 # Matching function
 # ---------------------------------------------------------------------------
-def match(distance_threshold: float = 3.0) -> dict:
+@metrics.timed("traceai_stage_seconds", stage="match")
+def match(distance_threshold: float = 3.0, verbose: bool = True,
+          use_index: bool = False, full: bool = False, k: int = DEFAULT_TOP_K,
+          workers: int = MATCH_WORKERS,
+          n_components: int = MATCH_PCA_COMPONENTS,
+          whiten: bool = MATCH_PCA_WHITEN,
+          normalized: bool = MATCH_NORMALIZED,
+          quantization: str = MATCH_QUANTIZATION,
+          cascade: int = MATCH_CASCADE_CANDIDATES,
+          sharded: bool = MATCH_SHARDED) -> dict:
     """
-    For each public submission, find the nearest registered case using KNN.
+    For each public submission, find the nearest registered case.
     If the distance is >= threshold, consider it a match.
 
     Parameters
     ----------
     distance_threshold : float
         Minimum distance to accept as a match (higher = more lenient).
+    verbose : bool
+        Print one line per submission (disable for large batch runs).
+    use_index : bool
+        Score new submissions with the persisted IVF index (ann_index.py)
+        instead of scanning every registered case. Approximate; see
+        ann_report.py.
+    full : bool
+        Ignore the watermarks and re-score everything from scratch. Implied
+        when the stored candidates were scored in another space (see
+        scoring_space).
+    k : int
+        Candidates stored per submission for review (see
+        db_queries.fetch_candidates_for_public / _for_registered).
+    workers : int
+        Processes used for exact search; worth it for large runs only, since
+        starting the pool costs up to a second per worker. Scans smaller than
+        PARALLEL_MIN_PAIRS (e.g. old submissions against a few new cases)
+        run in-process regardless.
+    n_components : int, optional
+        Score in the shared PCA space (projection.py). The projection must
+        already be fitted (`projection.py --fit N`); match() never fits or
+        replaces it. Switching it on, off or to a new fit re-scores
+        everything on the next run.
+    whiten : bool
+        Use the whitened projection (`projection.py --fit N --whiten`;
+        only with `n_components`).
+    normalized : bool
+        Score the pose-normalized vectors stored at ingest. Distances shrink
+        to the unit-scale mesh, so the threshold must be re-tuned; the first
+        run after switching re-scores everything.
+    quantization : str, optional
+        Scan a quantized index ("float16", "int8" or "pq"; build it with
+        quantization.py) for new submissions. Candidates are re-ranked on the
+        full vectors, so distances stay exact; only recall can drop.
+    cascade : int, optional
+        Run the exact scans as a cascade (cascade_search.py): rank on eye,
+        nose and jaw landmarks, re-score this many cases per submission on
+        the full vector, and re-scan exactly every submission the stage-1
+        lower bound cannot certify. Results equal the exact scan's; the
+        fallback rate decides the speed (100% on synthetic data, where the
+        cascade is slower; see benchmarks/bench_cascade.py).
+    sharded : bool
+        Score new submissions region-first against the persisted, journal-
+        synced shard layout (build it with sharded_index.py): the cases of
+        their own and the nearest regions (all age bands), then the whole
+        corpus if nothing there is within FALLBACK_DISTANCE. Already-scored
+        submissions are still matched against new cases exactly. Raw
+        vectors only (FALLBACK_DISTANCE is in raw units). Not a speed-up
+        for batch runs: in shard_report.py about a third of a synthetic
+        batch falls back and a batched run took 0.9-1.2x the exact scan's
+        time; only single-submission latency fell (~4x). Only the top-1
+        candidate is reliable (recall@10 ~0.48).
 
     Returns
     -------
     dict with 'status' and 'result' (mapping: registered_id → [public_ids]).
+    The number of candidates this run stored is counted in the
+    traceai_candidates_stored_total metric (and printed when verbose).
     """
-    public_df = get_public_cases_data()
-    registered_df = get_registered_cases_data()
+    if use_index and (n_components or normalized):
+        return {"status": False,
+                "message": "PCA / normalized scoring is not supported with the IVF index."}
+    if quantization and (use_index or n_components or normalized):
+        return {"status": False,
+                "message": "Quantized scoring cannot be combined with the IVF index, "
+                           "PCA or normalized scoring."}
+    if cascade and (n_components or workers > 1):
+        return {"status": False,
+                "message": "Cascade scoring cannot be combined with PCA or multiple workers."}
+    if sharded and (use_index or quantization or cascade or n_components or normalized):
+        return {"status": False,
+                "message": "Sharded scoring cannot be combined with the IVF / quantized "
+                           "indexes, cascade, PCA or normalized scoring "
+                           "(FALLBACK_DISTANCE is in raw landmark units)."}
 
-    if public_df is None or registered_df is None:
+    try:
+        projection = (get_projection(n_components, whiten, normalized, fit=False)
+                      if n_components else None)
+    except (OSError, ValueError) as e:
+        return {"status": False, "message": str(e)}
+    scoring = scoring_space(projection, normalized)
+
+    try:
+        db_queries = import_db_queries()
+        with backend_cwd():
+            stored = db_queries.get_match_scoring()
+            if not full and stored and stored != {scoring}:
+                print(f"⚠️  Stored candidates were scored in "
+                      f"{', '.join(sorted(space or 'unknown' for space in stored))}, "
+                      f"this run scores in {scoring}: re-scoring everything.")
+                full = True
+            watermarks = {} if full else db_queries.get_match_watermarks()
+            newest = db_queries.get_match_heads()
+            stale_ids = [] if full else db_queries.fetch_stale_match_ids()
+    except Exception:
+        traceback.print_exc()
         return {"status": False, "message": "Couldn't connect to database."}
-    if len(public_df) == 0 or len(registered_df) == 0:
-        return {"status": False, "message": "No public or registered cases found."}
 
-    original_reg_labels = registered_df.iloc[:, 0].tolist()
-    original_pub_labels = public_df.iloc[:, 0].tolist()
+    try:
+        rows = score_new_rows(watermarks, newest, stale_ids, k=k, use_index=use_index,
+                              workers=workers, projection=projection,
+                              normalized=normalized, quantization=quantization,
+                              cascade=cascade, sharded=sharded)
+    except (OSError, ValueError) as e:
+        traceback.print_exc()
+        return {"status": False, "message": _scoring_error(e, use_index, quantization, sharded)}
+    except Exception:
+        traceback.print_exc()
+        return {"status": False, "message": "Couldn't connect to database."}
 
-    reg_features = registered_df.iloc[:, 2:].values.astype(float)
-    numeric_labels = list(range(len(reg_features)))
+    try:
+        with backend_cwd():
+            db_queries.save_match_results(
+                rows, newest, replace_public_ids=stale_ids, reset=full, top_k=k,
+                scoring=scoring,
+            )
+            best = db_queries.fetch_best_matches()
+    except Exception:
+        traceback.print_exc()
+        return {"status": False, "message": "Couldn't save the match results."}
 
-    knn = KNeighborsClassifier(
-        n_neighbors=1, algorithm="ball_tree", weights="distance"
-    )
-    knn.fit(reg_features, numeric_labels)
+    if not best:
+        return {"status": False, "message": "No public or registered cases found."}
 
     matched_images = defaultdict(list)
+    metrics.inc("traceai_candidates_stored_total", len(rows))
+    if verbose:
+        print(f"  📊 {len(rows):,} candidates scored this run"
+              f"{' (full re-score)' if full else ''}.")
+    metrics.observe("traceai_match_distance", [row[2] for row in best],
+                    buckets=metrics.DISTANCE_BUCKETS)
 
-    for i, row in public_df.iterrows():
-        pub_label = original_pub_labels[i]
-        face_encoding = np.array(row[1:]).astype(float)
-
-        try:
-            closest_distances = knn.kneighbors([face_encoding])[0][0]
-            closest_distance = np.min(closest_distances)
-
-            if closest_distance >= distance_threshold:
-                predicted_idx = knn.predict([face_encoding])[0]
-                reg_label = original_reg_labels[predicted_idx]
-                matched_images[reg_label].append(pub_label)
+    for pub_label, reg_label, closest_distance in best:
+        if closest_distance >= distance_threshold:
+            matched_images[reg_label].append(pub_label)
+            if verbose:
                 print(
                     f"  ✅ Public {pub_label[:8]}… → Registered {reg_label[:8]}… "
                     f"(dist={closest_distance:.4f})"
                 )
-            else:
-                print(
-                    f"  ❌ Public {pub_label[:8]}… — no match "
-                    f"(dist={closest_distance:.4f} < threshold {distance_threshold})"
-                )
-        except Exception as e:
-            print(f"  ⚠️  Error on {pub_label[:8]}…: {e}")
+        elif verbose:
+            print(
+                f"  ❌ Public {pub_label[:8]}… — no match "
+                f"(dist={closest_distance:.4f} < threshold {distance_threshold})"
+            )
 
+    metrics.inc("traceai_matches_total", sum(map(len, matched_images.values())))
     return {"status": True, "result": dict(matched_images)}
 
 
@@ -167,6 +508,36 @@ def match(distance_threshold: float = 3.0) -> dict:
 # Entry point
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score public submissions against "
+                                                 "registered cases.")
+    parser.add_argument("--full", action="store_true", help="Re-score everything.")
+    parser.add_argument("--metrics", default=None, metavar="FILE",
+                        help="Also write stage timings / counters (Prometheus text).")
+    parser.add_argument("--workers", type=int, default=MATCH_WORKERS,
+                        help="Spread the exact search over N processes.")
+    parser.add_argument("--pca", type=int, default=MATCH_PCA_COMPONENTS, metavar="N",
+                        help="Score in N PCA dimensions.")
+    parser.add_argument("--whiten", action="store_true", default=MATCH_PCA_WHITEN,
+                        help="Use the whitened projection (with --pca).")
+    parser.add_argument("--normalized", action="store_true", default=MATCH_NORMALIZED,
+                        help="Score pose-normalized landmarks.")
+    parser.add_argument("--quantized", default=MATCH_QUANTIZATION, metavar="CODEC",
+                        help="Scan the float16 / int8 / pq index for new submissions.")
+    parser.add_argument("--cascade", type=int, default=MATCH_CASCADE_CANDIDATES, metavar="C",
+                        help="Landmark-subset prefilter, C cases per submission re-ranked.")
+    parser.add_argument("--sharded", action="store_true", default=MATCH_SHARDED,
+                        help="Nearest-region shards first, global fallback.")
+    args = parser.parse_args()
+
     print("🔄 Running baseline matching algorithm…\n")
-    result = match()
+    if args.metrics:
+        metrics.enable()
+
+    result = match(full=args.full, workers=args.workers, n_components=args.pca,
+                   whiten=args.whiten, normalized=args.normalized, quantization=args.quantized,
+                   cascade=args.cascade, sharded=args.sharded)
     print(f"\n📋 Match result: {result}")
+
+    if args.metrics:
+        metrics.write_prometheus(args.metrics)
+        print(f"📈 Metrics written to {args.metrics}")
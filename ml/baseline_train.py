@@ -3,7 +3,7 @@
   Week 1 — ML Engineer
   File: baseline_train.py
   Purpose: Reproduce the baseline KNN training pipeline and verify that
-           a classifier.pkl file is generated correctly.
+           the model artifact (models/<user>/v<N>/) is generated correctly.
 =============================================================================
 
 This script mirrors the original `train_model.py` logic but is self-contained
@@ -14,110 +14,108 @@ Usage:
 =============================================================================
 """
 
-import os
-import sys
-import json
-import pickle
+import shutil
 import traceback
 
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder
-from sklearn.neighbors import KNeighborsClassifier
+from feature_loader import backend_cwd, import_db_queries, load_registered_vectors, metrics
+from model_store import load_model, model_exists, save_model, user_model_dir
+from projection import get_projection
 
-# ---------------------------------------------------------------------------
-# Add the sibling backend/ folder so we can import db_queries & data_models
-# ---------------------------------------------------------------------------
-BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
-sys.path.insert(0, BACKEND_DIR)
+
+# PCA dimensions the artifact is reduced to (None = keep all 1404); see
+# projection.py and pca_report.py before changing
+PCA_COMPONENTS = None
+PCA_WHITEN = False
+
+# Train on pose-normalized landmarks (face_mesh_norm) instead of raw ones
+TRAIN_NORMALIZED = False
+
+# train() message for a user with no NF cases (the registry caches that outcome)
+NO_CASES_MESSAGE = "No cases submitted by this user."
 
 
 # ---------------------------------------------------------------------------
 # Data loader — fetch face-mesh training rows from the database
 # ---------------------------------------------------------------------------
-def get_train_data(submitted_by: str):
+def get_train_data(submitted_by: str, normalized: bool = False):
     """
-    Query the database for (id, face_mesh) rows belonging to `submitted_by`
-    with status = 'NF', then expand the JSON face-mesh into feature columns.
+    Load the face-mesh vectors of `submitted_by`'s cases with status = 'NF'
+    (the stored pose-normalized copies with `normalized`).
 
     Returns
     -------
-    labels : pd.Series   — case IDs (used as class labels)
-    features : pd.DataFrame — numeric face-mesh columns (fm_1 … fm_1404)
+    labels : np.ndarray   — case IDs (used as class labels)
+    features : np.ndarray — (n, 1404) float32 face-mesh matrix
     """
-    # Change working directory to backend/ so SQLite DB is found
-    original_cwd = os.getcwd()
-    os.chdir(BACKEND_DIR)
-
-    import db_queries
-    result = db_queries.get_training_data(submitted_by)
-
-    os.chdir(original_cwd)
-
-    if not result:
-        return pd.Series(dtype=str), pd.DataFrame()
-
-    d1 = pd.DataFrame(result, columns=["label", "face_mesh"])
-    d1["face_mesh"] = d1["face_mesh"].apply(lambda x: json.loads(x))
-
-    d2 = pd.DataFrame(
-        d1.pop("face_mesh").values.tolist(), index=d1.index
-    ).rename(columns=lambda x: f"fm_{x + 1}")
-
-    df = d1.join(d2)
-    return df["label"], df.drop("label", axis=1)
+    return load_registered_vectors(submitted_by=submitted_by, status="NF",
+                                   normalized=normalized)
 
 
 # ---------------------------------------------------------------------------
 # Training function
 # ---------------------------------------------------------------------------
-MODEL_FILE = "classifier.pkl"
+def get_data_version(submitted_by: str) -> int:
+    """Current case-set version of `submitted_by` (see CaseSetVersion)."""
+    db_queries = import_db_queries()
+    with backend_cwd():
+        return db_queries.get_case_set_version(submitted_by)
 
 
-def train(submitted_by: str) -> dict:
+@metrics.timed("traceai_stage_seconds", stage="train")
+def train(submitted_by: str, model_dir: str = None, n_components: int = PCA_COMPONENTS,
+          whiten: bool = PCA_WHITEN, normalized: bool = TRAIN_NORMALIZED) -> dict:
     """
-    Train a K-Nearest Neighbors classifier on the registered cases and
-    serialize the model + label encoder to `classifier.pkl`.
+    Build the nearest-neighbour model for the registered cases and save it
+    as a memory-mappable artifact (see model_store.py).
 
     Parameters
     ----------
     submitted_by : str
         The username whose cases should be used for training.
+    model_dir : str, optional
+        Directory the artifact is written to. Defaults to the user's own
+        models/<user>/v<version>/ directory, so officers never overwrite
+        each other's model.
+    n_components : int, optional
+        Store the vectors reduced by the shared PCA projection; queries
+        against the artifact are projected the same way. The projection
+        must already be fitted (`projection.py --fit N`); train() never fits
+        or replaces it, since match() and other officers' models share it.
+    whiten : bool
+        Use the whitened projection (only with `n_components`).
+    normalized : bool
+        Train on the stored pose-normalized vectors; the artifact then
+        normalizes raw queries itself.
 
     Returns
     -------
-    dict with keys 'status' (bool) and 'message' (str).
+    dict with keys 'status' (bool), 'message' (str) and, on success,
+    'model_dir' (str).
     """
-    # Remove stale model
-    if os.path.isfile(MODEL_FILE):
-        os.remove(MODEL_FILE)
-
     try:
-        labels, key_pts = get_train_data(submitted_by)
+        if model_dir is None:
+            # Read the version before the data: a concurrent change can only
+            # make the artifact newer than its label, never older
+            model_dir = user_model_dir(submitted_by, get_data_version(submitted_by))
 
-        if len(labels) == 0:
-            return {"status": False, "message": "No cases submitted by this user."}
-
-        # Encode string labels → integers
-        le = LabelEncoder()
-        encoded_labels = le.fit_transform(labels)
+        labels, key_pts = get_train_data(submitted_by, normalized)
 
-        # Build KNN classifier
-        classifier = KNeighborsClassifier(
-            n_neighbors=len(labels),
-            algorithm="ball_tree",
-            weights="distance",
-        )
-        classifier.fit(key_pts, encoded_labels)
+        if len(labels) == 0:
+            # Don't leave a stale model behind for a user with no open cases
+            shutil.rmtree(model_dir, ignore_errors=True)
+            return {"status": False, "message": NO_CASES_MESSAGE}
 
-        # Save (LabelEncoder, KNN) tuple
-        with open(MODEL_FILE, "wb") as f:
-            pickle.dump((le, classifier), f)
+        projection = (get_projection(n_components, whiten, normalized, fit=False)
+                      if n_components else None)
+        with metrics.span("traceai_stage_seconds", stage="fit"):
+            model = save_model(model_dir, labels, key_pts, projection=projection,
+                               submitted_by=submitted_by, normalized=normalized)
 
-        file_size = os.path.getsize(MODEL_FILE)
         return {
             "status": True,
-            "message": f"Model trained & saved ({file_size:,} bytes). "
-                       f"Classes: {len(le.classes_)}, Features: {key_pts.shape[1]}.",
+            "message": f"Model trained & saved ({model.nbytes:,} bytes). "
+                       f"Classes: {len(model)}, Features: {model.n_features}.",
+            "model_dir": model_dir,
         }
 
     except Exception as e:
@@ -128,22 +126,20 @@ def train(submitted_by: str) -> dict:
 # ---------------------------------------------------------------------------
 # Verification — load the saved model and print summary
 # ---------------------------------------------------------------------------
-def verify_model():
-    """Load classifier.pkl and print basic stats."""
-    if not os.path.isfile(MODEL_FILE):
-        print("❌ classifier.pkl not found — run train() first.")
+def verify_model(model_dir: str):
+    """Load the model artifact and print basic stats."""
+    if not model_dir or not model_exists(model_dir):
+        print("❌ Model artifact not found — run train() first.")
         return
 
-    with open(MODEL_FILE, "rb") as f:
-        le, clf = pickle.load(f)
+    model = load_model(model_dir)
 
     print("✅ Model loaded successfully.")
-    print(f"   Label Encoder classes : {list(le.classes_)}")
-    print(f"   KNN n_neighbors       : {clf.n_neighbors}")
-    print(f"   KNN algorithm         : {clf.algorithm}")
-    print(f"   KNN metric            : {clf.metric}")
-    print(f"   Training samples      : {clf.n_samples_fit_}")
-    print(f"   Feature dimensions    : {clf.n_features_in_}")
+    print(f"   Format version        : {model.manifest['format_version']}")
+    print(f"   Algorithm             : {model.manifest['algorithm']}")
+    print(f"   Trained for           : {model.manifest.get('submitted_by', '?')}")
+    print(f"   Training samples      : {len(model)}")
+    print(f"   Feature dimensions    : {model.n_features}")
 
 
 # ---------------------------------------------------------------------------
@@ -154,4 +150,4 @@ if __name__ == "__main__":
     print(f"🔄 Training baseline model for user: {user}\n")
     result = train(user)
     print(f"\n📋 Result: {result}\n")
-    verify_model()
+    verify_model(result.get("model_dir"))
@@ -0,0 +1,158 @@
+"""
+=============================================================================
+  Week 3 — ML Engineer
+  File: cascade_search.py
+  Purpose: Two-stage exact search — coarse landmark subset, then full-vector
+           re-rank of the survivors.
+=============================================================================
+
+Most (submission, case) pairs are obvious non-matches, yet the exact scan
+spends all 1404 coordinates on each of them. The cascade splits the work:
+
+  1. coarse  — rank every case on a small set of stable landmarks (eye
+               corners, nose tip, jaw contour), by default only their x / y
+               coordinates (MediaPipe's z is the noisiest axis): 26
+               landmarks × 2 = 52 values instead of 1404;
+  2. re-rank — gather the best `candidates` cases per query, rank them on
+               the full vector (float32 batched matmul) and re-score the
+               k winners in float64.
+
+  3. check    — the subset distance is a lower bound of the full distance
+               (it sums fewer squared differences), so a query whose k-th
+               re-ranked distance is at most the last shortlisted stage-1
+               distance cannot have a better case outside the shortlist.
+               Queries failing the check are re-scanned exactly.
+
+Results therefore equal the exact scan's (up to ties), for sightings and
+strangers alike, and plug into `baseline_match` unchanged. What the subset
+decides is speed: a stranger has no close case, its nearest full distance
+is far above any stage-1 distance, and it falls back to the full scan.
+`benchmarks/bench_cascade.py` measures the fallback rate and speed for a
+range of `candidates`. The subset is most selective on pose-normalized
+vectors (`face_mesh_norm`), where the landmarks sit in a common frame.
+
+Usage:
+    from cascade_search import cascade_nearest_neighbors
+    distances, indices = cascade_nearest_neighbors(queries, base, k=5, candidates=200)
+=============================================================================
+"""
+
+import numpy as np
+
+from feature_loader import metrics
+from knn_search import (
+    DEFAULT_CHUNK_SIZE,
+    exact_distances,
+    nearest_neighbors,
+    squared_norms,
+)
+
+
+# MediaPipe FaceMesh landmark indices used by stage 1
+EYE_CORNERS = (33, 133, 362, 263)
+NOSE_TIP = (1,)
+JAW_CONTOUR = (234, 93, 132, 58, 172, 136, 150, 149, 176, 148, 152,
+               377, 400, 378, 379, 365, 397, 288, 361, 323, 454)
+CASCADE_LANDMARKS = EYE_CORNERS + NOSE_TIP + JAW_CONTOUR
+
+# Coordinates per landmark in stage 1 (2 = x, y; 3 = x, y, z)
+STAGE1_DIMS = 2
+# Cases per query that survive stage 1 and are re-scored on the full vector
+STAGE1_CANDIDATES = 200
+# Upper bound on the gathered (queries × candidates × 1404) float32 block;
+# small blocks stay in cache, which matters more here than BLAS call count
+RERANK_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def subset_columns(landmarks=CASCADE_LANDMARKS, dims: int = STAGE1_DIMS) -> np.ndarray:
+    """Positions of the landmarks' first `dims` coordinates in a 1404-value vector."""
+    if dims not in (2, 3):
+        raise ValueError("dims must be 2 (x, y) or 3 (x, y, z).")
+    landmarks = np.asarray(landmarks, dtype=np.int64)
+    return (landmarks[:, None] * 3 + np.arange(dims)).ravel()
+
+
+class CascadeSearcher:
+    """
+    Two-stage search over one base matrix.
+
+    The coarse (n, len(landmarks) × dims) matrix and both sets of norms are
+    built once, so keep the searcher around when the same base is queried
+    repeatedly.
+    """
+
+    def __init__(self, base, candidates: int = STAGE1_CANDIDATES,
+                 landmarks=CASCADE_LANDMARKS, dims: int = STAGE1_DIMS,
+                 base_sq_norms=None):
+        self.base = np.asarray(base, dtype=np.float32)
+        self.candidates = candidates
+        self.columns = subset_columns(landmarks, dims)
+        self.coarse = np.ascontiguousarray(self.base[:, self.columns])
+        self.coarse_sq_norms = squared_norms(self.coarse)
+        self.base_sq_norms = (squared_norms(self.base) if base_sq_norms is None
+                              else np.asarray(base_sq_norms)).astype(np.float32)
+        self.fallbacks = 0
+
+    def search(self, queries, k: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        k nearest base rows for every query; same return value as
+        knn_search.nearest_neighbors (float64 distances, int64 positions).
+        `self.fallbacks` is set to the number of queries re-scanned exactly.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        m, n = len(queries), len(self.base)
+        k = min(k, n)
+        if m == 0 or k == 0:
+            return np.empty((m, k), dtype=np.float64), np.empty((m, k), dtype=np.int64)
+        survivors = min(max(k, self.candidates), n)
+
+        with metrics.span("traceai_stage_seconds", stage="search", method="cascade_coarse"):
+            coarse, shortlist = nearest_neighbors(
+                queries[:, self.columns], self.coarse, k=survivors,
+                chunk_size=chunk_size, base_sq_norms=self.coarse_sq_norms,
+            )
+
+        distances = np.empty((m, k), dtype=np.float64)
+        indices = np.empty((m, k), dtype=np.int64)
+        step = max(1, RERANK_BLOCK_BYTES // (survivors * queries.shape[1] * 4))
+        with metrics.span("traceai_stage_seconds", stage="search", method="cascade_rerank"):
+            for start in range(0, m, step):
+                rows = slice(start, start + step)
+                chunk, candidates = queries[rows], shortlist[rows]
+                # ||q||² is constant per row, so it does not affect the ranking
+                scores = np.matmul(self.base[candidates], chunk[:, :, None])[:, :, 0]
+                scores *= -2.0
+                scores += self.base_sq_norms[candidates]
+                if k < survivors:
+                    top = np.argpartition(scores, k - 1, axis=1)[:, :k]
+                    candidates = np.take_along_axis(candidates, top, axis=1)
+
+                exact = exact_distances(chunk, self.base, candidates)
+                order = np.argsort(exact, axis=1, kind="stable")
+                distances[rows] = np.take_along_axis(exact, order, axis=1)
+                indices[rows] = np.take_along_axis(candidates, order, axis=1)
+
+        # Every case left out of the shortlist is at least coarse[:, -1] away
+        if survivors < n:
+            unproven = np.flatnonzero(distances[:, -1] > coarse[:, -1])
+            if len(unproven):
+                with metrics.span("traceai_stage_seconds", stage="search",
+                                  method="cascade_fallback"):
+                    distances[unproven], indices[unproven] = nearest_neighbors(
+                        queries[unproven], self.base, k=k, chunk_size=chunk_size,
+                        base_sq_norms=self.base_sq_norms,
+                    )
+            metrics.inc("traceai_cascade_fallbacks_total", len(unproven))
+            self.fallbacks = len(unproven)
+        else:
+            self.fallbacks = 0
+        return distances, indices
+
+
+def cascade_nearest_neighbors(queries, base, k: int = 1, candidates: int = STAGE1_CANDIDATES,
+                              chunk_size: int = DEFAULT_CHUNK_SIZE, base_sq_norms=None,
+                              landmarks=CASCADE_LANDMARKS, dims: int = STAGE1_DIMS):
+    """One-off cascade search; drop-in for knn_search.nearest_neighbors."""
+    searcher = CascadeSearcher(base, candidates=candidates, landmarks=landmarks, dims=dims,
+                               base_sq_norms=base_sq_norms)
+    return searcher.search(queries, k=k, chunk_size=chunk_size)
@@ -0,0 +1,243 @@
+"""
+=============================================================================
+  Week 2 — ML Engineer
+  File: feature_loader.py
+  Purpose: Shared face-mesh feature loader for training and matching.
+=============================================================================
+
+Streams (id, face_mesh) rows straight from the database into a preallocated,
+C-contiguous (n, 1404) float32 matrix plus a parallel id array. Each blob is
+copied exactly once — no JSON decoding, no intermediate DataFrame and no
+per-column conversion — so load time and peak memory grow linearly with the
+number of cases.
+
+Usage:
+    from feature_loader import load_registered_vectors, load_public_vectors
+    ids, features = load_registered_vectors(submitted_by="Gagandeep Singh")
+=============================================================================
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Add the sibling backend/ folder so we can import db_queries & data_models
+# ---------------------------------------------------------------------------
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, BACKEND_DIR)
+
+# Shared instrumentation (backend/metrics.py); ml modules use it via
+# `from feature_loader import metrics`
+import metrics  # noqa: E402
+
+# Rows fetched from the cursor per round-trip while streaming
+STREAM_BATCH_SIZE = 1000
+# Above this many ids, load_attributes scans the table instead of IN lists
+ATTRIBUTE_ID_LIMIT = 20_000
+
+
+@contextmanager
+def backend_cwd():
+    """Run the body from backend/ so the relative SQLite path resolves."""
+    original_cwd = os.getcwd()
+    os.chdir(BACKEND_DIR)
+    try:
+        yield
+    finally:
+        os.chdir(original_cwd)
+
+
+def import_db_queries():
+    """Import backend/db_queries.py (its engine binds the SQLite path on import)."""
+    with backend_cwd():
+        import db_queries
+    return db_queries
+
+
+def _load_vectors(model, filters, batch_size: int = STREAM_BATCH_SIZE,
+                  normalized: bool = False):
+    """
+    Load (ids, features) for rows of `model` matching all `filters`.
+
+    The row count is taken first so the feature matrix can be allocated
+    once; rows are then streamed `batch_size` at a time and copied into
+    place. If rows are inserted between the two queries the arrays are
+    grown, and if rows disappear they are trimmed.
+
+    With `normalized` the stored face_mesh_norm vectors are read instead;
+    rows saved before it existed (not yet backfilled by migrations.py) are
+    normalized on the fly.
+    """
+    from sqlmodel import Session, select, func
+    from data_models import FACE_MESH_DIM
+    from face_normalization import normalize_face_meshes
+
+    db_queries = import_db_queries()
+    engine, unpack_face_mesh = db_queries.engine, db_queries.unpack_face_mesh
+
+    with metrics.span("traceai_stage_seconds", stage="load", table=model.__tablename__), \
+            backend_cwd(), Session(engine) as session:
+        count_query = select(func.count()).select_from(model)
+        rows_query = select(model.id, model.face_mesh_norm if normalized else model.face_mesh)
+        for condition in filters:
+            count_query = count_query.where(condition)
+            rows_query = rows_query.where(condition)
+
+        n = session.exec(count_query).one()
+        ids = np.empty(n, dtype=object)
+        features = np.empty((n, FACE_MESH_DIM), dtype=np.float32)
+
+        i = 0
+        missing = []
+        rows = session.exec(rows_query.execution_options(yield_per=batch_size))
+        for case_id, blob in rows:
+            if i == len(ids):
+                grow = max(batch_size, len(ids) // 2)
+                ids = np.concatenate([ids, np.empty(grow, dtype=object)])
+                features = np.concatenate(
+                    [features, np.empty((grow, FACE_MESH_DIM), dtype=np.float32)]
+                )
+            ids[i] = case_id
+            if blob is None:
+                missing.append(i)
+            else:
+                features[i] = unpack_face_mesh(blob)
+            i += 1
+
+        for start in range(0, len(missing), batch_size):
+            positions = missing[start:start + batch_size]
+            raw = dict(session.exec(
+                select(model.id, model.face_mesh).where(model.id.in_(list(ids[positions])))
+            ).all())
+            features[positions] = normalize_face_meshes(
+                np.stack([unpack_face_mesh(raw[case_id]) for case_id in ids[positions]])
+            )
+
+    metrics.inc("traceai_rows_scanned_total", i, table=model.__tablename__)
+    if i != len(ids):
+        ids, features = ids[:i], np.ascontiguousarray(features[:i])
+    return ids, features
+
+
+def _journal_filters(model, kind: str, after=None, upto=None):
+    """
+    Filters on the IndexJournal "add" seq of each row: after < seq <= upto.
+
+    With only `upto`, rows are kept unless they were added after it, so
+    rows inserted without a journal entry (bulk import with journal=False)
+    count as already added.
+    """
+    from sqlmodel import select
+    from data_models import IndexJournal
+
+    added = (select(IndexJournal.record_id)
+             .where(IndexJournal.kind == kind)
+             .where(IndexJournal.op == "add"))
+    if after is not None:
+        added = added.where(IndexJournal.seq > after)
+        if upto is not None:
+            added = added.where(IndexJournal.seq <= upto)
+        return [model.id.in_(added)]
+    if upto is not None:
+        return [model.id.not_in(added.where(IndexJournal.seq > upto))]
+    return []
+
+
+def load_registered_vectors(submitted_by: str = None, status: str = "NF", ids=None,
+                            after=None, upto=None, normalized: bool = False):
+    """
+    Return (ids, features) for registered cases.
+
+    Parameters
+    ----------
+    submitted_by : str, optional
+        Restrict to one user's cases (None = every user).
+    status : str, optional
+        Case status to keep, e.g. 'NF' (None = every status).
+    ids : list of str, optional
+        Restrict to these case ids (keep the list to a few hundred entries).
+    after, upto : int, optional
+        Keep only rows whose IndexJournal "add" seq is above `after` and at
+        or below `upto` (see the matcher's MatchWatermark).
+    normalized : bool
+        Return the pose-normalized vectors (face_mesh_norm) instead of the
+        raw landmarks.
+    """
+    from data_models import RegisteredCases
+
+    filters = _journal_filters(RegisteredCases, "registered", after, upto)
+    if submitted_by is not None:
+        filters.append(RegisteredCases.submitted_by == submitted_by)
+    if status:
+        filters.append(RegisteredCases.status == status)
+    if ids is not None:
+        filters.append(RegisteredCases.id.in_(list(ids)))
+    return _load_vectors(RegisteredCases, filters, normalized=normalized)
+
+
+def load_public_vectors(status: str = "NF", ids=None, after=None, upto=None,
+                        normalized: bool = False):
+    """Return (ids, features) for public submissions, optionally by id or journal range."""
+    from data_models import PublicSubmissions
+
+    filters = _journal_filters(PublicSubmissions, "public", after, upto)
+    if status:
+        filters.append(PublicSubmissions.status == status)
+    if ids is not None:
+        filters.append(PublicSubmissions.id.in_(list(ids)))
+    return _load_vectors(PublicSubmissions, filters, normalized=normalized)
+
+
+def load_attributes(kind: str, ids, columns) -> dict:
+    """
+    Text columns of the given rows, aligned with `ids`.
+
+    Parameters
+    ----------
+    kind : str
+        'registered' or 'public'.
+    ids : array of str
+        Rows to fetch, e.g. the ids returned by a vector loader.
+    columns : list of str
+        Column names, e.g. ['last_seen', 'age'].
+
+    Returns
+    -------
+    dict {column: (n,) object array}; None for rows that no longer exist.
+    Short id lists are fetched by id; long ones stream the whole table
+    once instead of sending huge IN lists.
+    """
+    from sqlmodel import Session, select
+    from data_models import PublicSubmissions, RegisteredCases
+
+    model = RegisteredCases if kind == "registered" else PublicSubmissions
+    db_queries = import_db_queries()
+    position = {case_id: i for i, case_id in enumerate(ids)}
+    attributes = {column: np.full(len(position), None, dtype=object) for column in columns}
+    query = select(model.id, *(getattr(model, column) for column in columns))
+
+    if len(position) <= ATTRIBUTE_ID_LIMIT:
+        id_list = list(position)
+        queries = [query.where(model.id.in_(id_list[i:i + 500]))
+                   for i in range(0, len(id_list), 500)]
+    else:
+        queries = [query.execution_options(yield_per=STREAM_BATCH_SIZE)]
+
+    with backend_cwd(), Session(db_queries.engine) as session:
+        for q in queries:
+            for case_id, *values in session.exec(q):
+                i = position.get(case_id)
+                if i is not None:
+                    for column, value in zip(columns, values):
+                        attributes[column][i] = value
+    return attributes
+
+
+# Loader for each index kind recorded in the IndexJournal table
+LOADERS = {
+    "registered": load_registered_vectors,
+    "public": load_public_vectors,
+}
@@ -0,0 +1,121 @@
+"""
+=============================================================================
+  Week 2 — ML Engineer
+  File: knn_search.py
+  Purpose: Exact, batched nearest-neighbour search over face-mesh vectors.
+=============================================================================
+
+Replaces per-row `KNeighborsClassifier.kneighbors` calls with one BLAS
+matrix product per chunk of queries:
+
+    ||q - b||² = ||q||² + ||b||² - 2 q·b
+
+Candidates are ranked on the float32 product, then the k winners of every
+query are re-scored exactly in float64 so reported distances do not suffer
+from the cancellation error of the expanded form.
+
+Usage:
+    from knn_search import nearest_neighbors
+    distances, indices = nearest_neighbors(queries, base, k=5)
+=============================================================================
+"""
+
+import numpy as np
+
+
+# Upper bound on the (chunk × n_base) float32 distance block held at once
+CHUNK_BYTES = 256 * 1024 * 1024
+# Default number of query rows scored per BLAS call
+DEFAULT_CHUNK_SIZE = 1024
+
+
+def squared_norms(matrix: np.ndarray) -> np.ndarray:
+    """Row-wise squared L2 norms, accumulated in float64."""
+    return np.einsum("ij,ij->i", matrix, matrix, dtype=np.float64)
+
+
+def _chunk_rows(n_base: int, k: int, dim: int, chunk_size: int) -> int:
+    """
+    Shrink `chunk_size` so neither the float32 distance block nor the
+    float64 re-scoring block of one chunk exceeds CHUNK_BYTES.
+    """
+    by_block = CHUNK_BYTES // max(1, n_base * 4)
+    by_rescore = CHUNK_BYTES // max(1, k * dim * 8)
+    return max(1, min(chunk_size, by_block, by_rescore))
+
+
+def exact_distances(queries: np.ndarray, base: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """Float64 Euclidean distance from each query to base[indices[i, j]]."""
+    diff = base[indices].astype(np.float64) - queries[:, None, :].astype(np.float64)
+    return np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+
+
+def nearest_neighbors(
+    queries: np.ndarray,
+    base: np.ndarray,
+    k: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    base_sq_norms: np.ndarray = None,
+    exclude: np.ndarray = None,
+):
+    """
+    Exact k-nearest neighbours of every query row among the base rows.
+
+    Parameters
+    ----------
+    queries : np.ndarray
+        (m, d) query vectors.
+    base : np.ndarray
+        (n, d) indexed vectors (may be a read-only memmap).
+    k : int
+        Neighbours per query; clamped to n.
+    chunk_size : int
+        Query rows per BLAS call (further capped by CHUNK_BYTES).
+    base_sq_norms : np.ndarray, optional
+        Precomputed `squared_norms(base)`, reused across calls.
+    exclude : np.ndarray, optional
+        (n,) bool mask of base rows never to return (e.g. removed cases);
+        their distance-block columns are +inf and `k` is clamped to the rest.
+
+    Returns
+    -------
+    distances : np.ndarray — (m, k) float64, ascending per row
+    indices : np.ndarray   — (m, k) int64 row positions into `base`
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    m, n = len(queries), len(base)
+    k = min(k, n - (int(exclude.sum()) if exclude is not None else 0))
+    distances = np.empty((m, k), dtype=np.float64)
+    indices = np.empty((m, k), dtype=np.int64)
+    if m == 0 or k == 0:
+        return distances, indices
+
+    base32 = np.asarray(base, dtype=np.float32)
+    if base_sq_norms is None:
+        base_sq_norms = squared_norms(base32)
+    base_sq_norms = base_sq_norms.astype(np.float32)
+    if exclude is not None:
+        # +inf norms turn the excluded columns of every block into +inf
+        base_sq_norms = np.where(exclude, np.float32(np.inf), base_sq_norms)
+
+    step = _chunk_rows(n, k, base32.shape[1], chunk_size)
+    for start in range(0, m, step):
+        chunk = queries[start:start + step]
+        # ||q||² is constant per row, so it does not affect the ranking
+        block = chunk @ base32.T
+        block *= -2.0
+        block += base_sq_norms
+
+        if k == 1:
+            top = block.argmin(axis=1)[:, None]
+        elif k < n:
+            top = np.argpartition(block, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n), (len(chunk), n)).copy()
+
+        exact = exact_distances(chunk, base32, top)
+        order = np.argsort(exact, axis=1, kind="stable")
+        distances[start:start + step] = np.take_along_axis(exact, order, axis=1)
+        indices[start:start + step] = np.take_along_axis(top, order, axis=1)
+
+    return distances, indices
@@ -0,0 +1,371 @@
+"""
+=============================================================================
+  Week 3 — ML Engineer
+  File: match_worker.py
+  Purpose: Background worker that matches queued public submissions as
+           they arrive.
+=============================================================================
+
+Sightings used to be matched only when an officer ran `baseline_match`, so
+a burst of uploads after a news broadcast either waited for the next run or
+made the upload page do the matching itself. Now the page saves the
+sighting with `db_queries.new_public_case(..., enqueue_match=True)`, which
+also writes a MatchJob row in the same transaction, and returns at once.
+This worker drains the queue:
+
+  1. claim   — lease up to WORKER_BATCH_SIZE jobs (one UPDATE … RETURNING,
+               so several workers never take the same job);
+  2. match   — load the sightings' vectors and search them in ONE batched
+               call against the live case set (below); a spike therefore
+               costs a few large BLAS calls, not one scan per sighting;
+  3. store   — replace the sightings' CandidateMatches (top-k) and delete
+               the jobs.
+
+Delivery is at-least-once: a job is deleted only after its candidates are
+committed; a worker that dies loses its lease (MATCH_JOB_LEASE_S) and the
+job is claimed again. Re-scoring replaces the stored candidates, so running
+a job twice is harmless. A failing batch goes back to the queue with an
+exponential delay and is parked as 'failed' after MATCH_JOB_MAX_ATTEMPTS
+(`--requeue-failed` retries those).
+
+The live case set holds the NF registered vectors in memory and replays
+the IndexJournal before every batch: new cases are appended to a small
+delta segment, found cases are masked out, and both are folded into the
+main matrix once they exceed COMPACT_ROWS. `--ivf` / `--quantized CODEC`
+search the persisted indexes instead (they replay the journal themselves).
+Sightings stay above the MatchWatermark, so the next `baseline_match` run
+still scores them against every NF case; the duplicate pairs it writes are
+pruned by `save_match_results`. The worker refuses to start if the stored
+candidates were scored in another distance space (scoring_space).
+
+Usage:
+    python match_worker.py                     # run until Ctrl-C
+    python match_worker.py --once              # drain the queue and exit
+    python match_worker.py --quantized int8 --batch-size 512
+    python match_worker.py --stats
+    python match_worker.py --requeue-failed
+=============================================================================
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import traceback
+
+import numpy as np
+
+from ann_index import JOURNAL_BATCH_SIZE, SYNC_LOAD_BATCH_SIZE, get_index
+from baseline_match import (
+    DEFAULT_TOP_K,
+    MATCH_NORMALIZED,
+    MODEL_VERSION_IVF,
+    _candidate_rows,
+    _exact_version,
+    _scoring_error,
+    scoring_space,
+)
+from feature_loader import (
+    backend_cwd,
+    import_db_queries,
+    load_public_vectors,
+    load_registered_vectors,
+    metrics,
+)
+from knn_search import nearest_neighbors, squared_norms
+from parallel_search import merge_top_k
+from quantization import get_quantized_index
+
+
+# Jobs claimed, and searched in one call, per round (≤ 500 ids per IN clause)
+WORKER_BATCH_SIZE = 256
+# Sleep between polls of an empty queue
+POLL_INTERVAL_S = 1.0
+# Delta rows + removed rows at which the live case set is rebuilt in one copy
+COMPACT_ROWS = 5_000
+
+
+# ---------------------------------------------------------------------------
+# Live case set
+# ---------------------------------------------------------------------------
+class LiveCaseSet:
+    """NF registered vectors in memory, kept current from the IndexJournal."""
+
+    def __init__(self, normalized: bool = False):
+        self.normalized = normalized
+        db_queries = import_db_queries()
+        # Read the journal head first: anything newer is replayed on top later
+        with backend_cwd():
+            self.journal_seq = db_queries.get_index_journal_head()
+        self._reset(*load_registered_vectors(status="NF", normalized=normalized))
+
+    def _reset(self, ids, features):
+        self.ids = np.asarray(ids, dtype=object)
+        self.features = np.ascontiguousarray(features, dtype=np.float32)
+        self.sq_norms = squared_norms(self.features)
+        self.dead = np.zeros(len(self.ids), dtype=bool)
+        self.delta_ids = np.empty(0, dtype=object)
+        self.delta_features = np.empty((0, self.features.shape[1]), dtype=np.float32)
+        self.delta_sq_norms = np.empty(0, dtype=np.float32)
+        self._positions = None
+
+    def __len__(self) -> int:
+        return int(len(self.ids) - self.dead.sum() + len(self.delta_ids))
+
+    def _position_map(self) -> dict:
+        """id → row of the main matrix (built on the first update)."""
+        if self._positions is None:
+            self._positions = {record_id: i for i, record_id in enumerate(self.ids)
+                               if not self.dead[i]}
+        return self._positions
+
+    def remove(self, ids):
+        positions = self._position_map()
+        rows = [positions.pop(record_id) for record_id in ids if record_id in positions]
+        self.dead[rows] = True
+        keep = ~np.isin(self.delta_ids, list(ids))
+        self.delta_ids = self.delta_ids[keep]
+        self.delta_features = self.delta_features[keep]
+        self.delta_sq_norms = self.delta_sq_norms[keep]
+
+    def add(self, ids, features):
+        positions, in_delta = self._position_map(), set(self.delta_ids)
+        keep = [i for i, record_id in enumerate(ids)
+                if record_id not in positions and record_id not in in_delta]
+        if keep:
+            features = np.asarray(features, dtype=np.float32)[keep]
+            self.delta_ids = np.concatenate([self.delta_ids, np.asarray(ids, dtype=object)[keep]])
+            self.delta_features = np.concatenate([self.delta_features, features])
+            self.delta_sq_norms = np.concatenate([self.delta_sq_norms, squared_norms(features)])
+
+    def compact(self):
+        """Fold the delta into the main matrix and drop removed rows."""
+        live = ~self.dead
+        self._reset(np.concatenate([self.ids[live], self.delta_ids]),
+                    np.concatenate([self.features[live], self.delta_features]))
+
+    def sync(self) -> int:
+        """Replay journal rows newer than the last sync; returns rows applied."""
+        db_queries = import_db_queries()
+        applied = 0
+        while True:
+            with backend_cwd():
+                rows = db_queries.fetch_index_journal(
+                    "registered", after_seq=self.journal_seq, limit=JOURNAL_BATCH_SIZE
+                )
+            if not rows:
+                break
+            pending, removed = {}, []
+            for _, op, record_id in rows:
+                if op == "add":
+                    pending[record_id] = True
+                else:
+                    pending.pop(record_id, None)
+                    removed.append(record_id)
+            self.remove(removed)
+            add_ids = list(pending)
+            for start in range(0, len(add_ids), SYNC_LOAD_BATCH_SIZE):
+                self.add(*load_registered_vectors(
+                    status=None, ids=add_ids[start:start + SYNC_LOAD_BATCH_SIZE],
+                    normalized=self.normalized,
+                ))
+            self.journal_seq = rows[-1][0]
+            applied += len(rows)
+        if len(self.delta_ids) + self.dead.sum() > COMPACT_ROWS:
+            self.compact()
+        return applied
+
+    def query(self, vectors, k: int = 1):
+        """
+        k nearest live cases per query (exact).
+
+        Returns
+        -------
+        ids : np.ndarray       — (m, min(k, live cases)) record ids, nearest first
+        distances : np.ndarray — matching float64 Euclidean distances
+        """
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        parts_d, parts_i = [], []
+        n_dead = int(self.dead.sum())
+        if len(self.ids) > n_dead:
+            # Removed rows are +inf inside the distance block, so k stays fixed
+            d, i = nearest_neighbors(queries, self.features, k=k, base_sq_norms=self.sq_norms,
+                                     exclude=self.dead if n_dead else None)
+            parts_d.append(d)
+            parts_i.append(i)
+        if len(self.delta_ids):
+            d, i = nearest_neighbors(queries, self.delta_features,
+                                     k=min(len(self.delta_ids), k),
+                                     base_sq_norms=self.delta_sq_norms)
+            parts_d.append(d)
+            parts_i.append(i + len(self.ids))
+        if not parts_d:
+            return (np.empty((len(queries), 0), dtype=object),
+                    np.empty((len(queries), 0)))
+
+        distances, positions = merge_top_k(np.concatenate(parts_d, axis=1),
+                                           np.concatenate(parts_i, axis=1), k)
+        return np.concatenate([self.ids, self.delta_ids])[positions], distances
+
+
+def make_searcher(normalized: bool = MATCH_NORMALIZED, use_index: bool = False,
+                  quantization: str = None):
+    """
+    search(features, k) → (ids, distances, model_version), synced per call.
+
+    The index (or the live case set) is loaded and synced here, so a missing
+    or unreadable index raises OSError / ValueError before any job is
+    claimed.
+    """
+    if use_index:
+        get_index()
+
+        def search(features, k):
+            return (*get_index().query(features, k=k), MODEL_VERSION_IVF)
+    elif quantization:
+        get_quantized_index(quantization)
+
+        def search(features, k):
+            return (*get_quantized_index(quantization).search(features, k=k),
+                    f"{quantization}-l2")
+    else:
+        cases = LiveCaseSet(normalized)
+        version = _exact_version(None, normalized)
+
+        def search(features, k):
+            cases.sync()
+            return (*cases.query(features, k=k), version)
+    return search
+
+
+# ---------------------------------------------------------------------------
+# Worker loop
+# ---------------------------------------------------------------------------
+def process_jobs(jobs, search, k: int = DEFAULT_TOP_K,
+                 normalized: bool = MATCH_NORMALIZED) -> int:
+    """Match one claimed batch, store its candidates, delete its jobs."""
+    db_queries = import_db_queries()
+    public_ids = list(dict.fromkeys(public_id for _, public_id, _ in jobs))
+    # NF only: a sighting matched in the meantime needs no candidates
+    ids, features = load_public_vectors(ids=public_ids, normalized=normalized)
+    rows = []
+    if len(ids):
+        with metrics.span("traceai_stage_seconds", stage="search", method="worker"):
+            nearest_ids, distances, version = search(features, k)
+        rows = _candidate_rows(ids, nearest_ids, distances, version)
+    with backend_cwd():
+        db_queries.save_match_results(rows, {}, replace_public_ids=list(ids), top_k=k)
+        db_queries.complete_match_jobs([job_id for job_id, _, _ in jobs])
+    return len(rows)
+
+
+def run_worker(once: bool = False, batch_size: int = WORKER_BATCH_SIZE,
+               k: int = DEFAULT_TOP_K, normalized: bool = MATCH_NORMALIZED,
+               use_index: bool = False, quantization: str = None,
+               poll_interval: float = POLL_INTERVAL_S, name: str = None) -> dict:
+    """
+    Claim and match jobs until interrupted (or, with `once`, until the
+    queue is empty). Returns counts of done, retried and parked jobs.
+    """
+    if (use_index or quantization) and normalized:
+        return {"status": False,
+                "message": "Normalized scoring is only supported by the exact case set."}
+    db_queries = import_db_queries()
+    with backend_cwd():
+        stored = db_queries.get_match_scoring()
+    scoring = scoring_space(None, normalized)
+    if stored and stored != {scoring}:
+        # Distances from another space would be mixed into the same top-k
+        spaces = ", ".join(sorted(space or "unknown" for space in stored))
+        return {"status": False,
+                "message": f"Stored candidates were scored in {spaces}, this worker scores "
+                           f"in {scoring}; match with the same --normalized setting as "
+                           f"baseline_match.py (PCA scoring has no worker)."}
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    counts = {"done": 0, "retried": 0, "parked": 0}
+    try:
+        search = make_searcher(normalized, use_index, quantization)
+    except (OSError, ValueError) as e:
+        traceback.print_exc()
+        return {"status": False, "message": _scoring_error(e, use_index, quantization)}
+    print(f"🔄 Match worker {name} started.")
+
+    try:
+        while True:
+            with backend_cwd():
+                jobs = db_queries.claim_match_jobs(name, batch_size)
+            if not jobs:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            start = time.perf_counter()
+            try:
+                with metrics.span("traceai_stage_seconds", stage="match_jobs"):
+                    stored = process_jobs(jobs, search, k, normalized)
+            except Exception as e:
+                traceback.print_exc()
+                with backend_cwd():
+                    parked = db_queries.retry_match_jobs(
+                        [(job_id, attempts) for job_id, _, attempts in jobs],
+                        f"{type(e).__name__}: {e}", name,
+                    )
+                counts["retried"] += len(jobs) - parked
+                counts["parked"] += parked
+                metrics.inc("traceai_match_jobs_total", len(jobs) - parked, result="retried")
+                metrics.inc("traceai_match_jobs_total", parked, result="failed")
+                print(f"   ⚠️  {len(jobs)} jobs failed ({parked} parked): {e}")
+                continue
+
+            counts["done"] += len(jobs)
+            metrics.inc("traceai_match_jobs_total", len(jobs), result="done")
+            print(f"   ✅ {len(jobs)} jobs → {stored} candidates "
+                  f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+    except KeyboardInterrupt:
+        # Jobs claimed by the interrupted batch are picked up when their lease expires
+        print("\n⏹️  Stopped.")
+    return {"status": True, **counts}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Match queued public submissions.")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty.")
+    parser.add_argument("--batch-size", type=int, default=WORKER_BATCH_SIZE)
+    parser.add_argument("--k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--normalized", action="store_true", default=MATCH_NORMALIZED)
+    parser.add_argument("--ivf", action="store_true", help="Search the IVF index.")
+    parser.add_argument("--quantized", default=None, metavar="CODEC",
+                        help="Search the float16 / int8 / pq index.")
+    parser.add_argument("--stats", action="store_true", help="Print queue counts and exit.")
+    parser.add_argument("--requeue-failed", action="store_true",
+                        help="Queue every failed job again and exit.")
+    parser.add_argument("--metrics", default=None, help="Write Prometheus metrics here on exit.")
+    args = parser.parse_args()
+
+    db_queries = import_db_queries()
+    if args.stats:
+        with backend_cwd():
+            stats = db_queries.get_match_queue_stats()
+        print(f"   Queued  : {stats['queued']:,}")
+        print(f"   Running : {stats['running']:,}")
+        print(f"   Failed  : {stats['failed']:,}")
+        print(f"   Oldest  : {stats['oldest'] or '—'}")
+        sys.exit(0)
+    if args.requeue_failed:
+        with backend_cwd():
+            print(f"✅ {db_queries.requeue_failed_match_jobs():,} failed jobs queued again.")
+        sys.exit(0)
+
+    if args.metrics:
+        metrics.enable()
+    result = run_worker(once=args.once, batch_size=args.batch_size, k=args.k,
+                        normalized=args.normalized, use_index=args.ivf,
+                        quantization=args.quantized)
+    print(f"\n📋 Worker result: {result}")
+    if args.metrics:
+        metrics.write_prometheus(args.metrics)
+        print(f"📈 Metrics written to {args.metrics}")
+    if not result["status"]:
+        sys.exit(1)
@@ -0,0 +1,223 @@
+"""
+=============================================================================
+  Week 2 — ML Engineer
+  File: model_registry.py
+  Purpose: Per-user model registry with a memory-bounded LRU cache.
+=============================================================================
+
+`train(submitted_by)` used to write one global artifact, so two officers
+training at the same time overwrote each other's model and every request
+reloaded it from disk. The registry keys models by
+
+    (submitted_by, case-set version)
+
+where the version is the user's CaseSetVersion row, bumped in the same
+transaction as any change to their NF case set (new case, case found).
+
+`get(submitted_by)`:
+  1. reads the user's current version (one primary-key lookup),
+  2. returns the cached model if that (user, version) is loaded,
+  3. otherwise loads models/<user>/v<version>/ — training it first if the
+     artifact does not exist yet — and evicts that user's older versions.
+
+A user with no NF cases has no model; that outcome is remembered for the
+(user, version) too, so such users do not retrain on every request until
+their case set changes.
+
+Loaded models are kept in an LRU ordered by last use and bounded by the
+total size of their arrays (`max_bytes`), not by entry count, since one
+officer's case set can be orders of magnitude larger than another's.
+
+Thread safety: the cache itself is guarded by one short-held lock; loading
+or training a missing model holds a per-key lock only, so threads asking
+for the same stale model wait for one load, while other users are served
+from the cache concurrently. A key's lock is dropped once its outcome is
+cached, so the lock table only holds keys being loaded right now.
+
+Usage:
+    from model_registry import get_model
+    model = get_model("Gagandeep Singh")
+    nearest_ids = model.predict(vectors)
+=============================================================================
+"""
+
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from baseline_train import NO_CASES_MESSAGE, get_data_version, train
+from model_store import load_model, model_exists, user_model_dir
+
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB of model arrays
+
+# Versions kept on disk per user (the newest, plus one for readers that
+# loaded it just before a bump)
+VERSIONS_KEPT = 2
+
+
+class ModelRegistry:
+    """LRU cache of per-user KNNModels, keyed by (submitted_by, version)."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._models = OrderedDict()   # (submitted_by, version) → KNNModel
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}           # (submitted_by, version) → Lock, while loading
+        self._missing = {}             # submitted_by → version that has no model
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def get(self, submitted_by: str):
+        """
+        Return the model for `submitted_by`'s current NF case set.
+
+        Returns None if the user has no NF cases to match against.
+        """
+        key = (submitted_by, get_data_version(submitted_by))
+
+        model = self._cached(key)
+        if model is not None or self._known_missing(key):
+            return model
+
+        lock = self._key_lock(key)
+        with lock:
+            try:
+                # Another thread may have loaded it while we waited
+                model = self._cached(key)
+                if model is not None or self._known_missing(key):
+                    return model
+
+                model, empty = self._load_or_train(*key)
+                if model is not None:
+                    self._insert(key, model)
+                elif empty:
+                    self._mark_missing(key)
+                return model
+            finally:
+                # The outcome is published (or failed): waiters re-check the cache
+                self._release_key_lock(key, lock)
+
+    def _cached(self, key):
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+            return model
+
+    def _known_missing(self, key) -> bool:
+        with self._lock:
+            return self._missing.get(key[0]) == key[1]
+
+    def _mark_missing(self, key):
+        with self._lock:
+            self._missing[key[0]] = key[1]
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _release_key_lock(self, key, lock):
+        with self._lock:
+            if self._key_locks.get(key) is lock:
+                del self._key_locks[key]
+
+    def _load_or_train(self, submitted_by: str, version: int):
+        """(model or None, whether None means the user has no NF cases)."""
+        path = user_model_dir(submitted_by, version)
+        if not model_exists(path):
+            result = train(submitted_by, model_dir=path)
+            if not result["status"]:
+                print(f"⚠️  No model for '{submitted_by}': {result['message']}")
+                return None, result["message"] == NO_CASES_MESSAGE
+            _prune_versions(submitted_by, version)
+        return load_model(path), False
+
+    # ------------------------------------------------------------------
+    # Cache maintenance
+    # ------------------------------------------------------------------
+    def _insert(self, key, model):
+        submitted_by, version = key
+        with self._lock:
+            # A newer version makes every older one of the same user dead
+            for old in [k for k in self._models if k[0] == submitted_by and k[1] < version]:
+                self._drop(old)
+            self._missing.pop(submitted_by, None)
+            self._models[key] = model
+            self._bytes += model.nbytes
+            # Evict least recently used, but never the model just loaded
+            while self._bytes > self.max_bytes and len(self._models) > 1:
+                self._drop(next(iter(self._models)))
+
+    def _drop(self, key):
+        model = self._models.pop(key)
+        self._bytes -= model.nbytes
+        self._key_locks.pop(key, None)
+
+    def invalidate(self, submitted_by: str = None):
+        """Forget `submitted_by`'s cached models (all users if None)."""
+        with self._lock:
+            for key in [k for k in self._models if submitted_by in (None, k[0])]:
+                self._drop(key)
+            for user in [u for u in self._missing if submitted_by in (None, u)]:
+                del self._missing[user]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "keys": list(self._models),
+                "without_model": len(self._missing),
+                "loading": len(self._key_locks),
+            }
+
+
+def _prune_versions(submitted_by: str, version: int, keep: int = VERSIONS_KEPT):
+    """Delete `submitted_by`'s artifacts older than the newest `keep` versions."""
+    user_dir = os.path.dirname(user_model_dir(submitted_by, version))
+    versions = sorted(
+        int(name[1:]) for name in os.listdir(user_dir)
+        if name.startswith("v") and name[1:].isdigit()
+    )
+    for old in versions[:-keep]:
+        # Open memory maps stay valid after the files are unlinked
+        shutil.rmtree(os.path.join(user_dir, f"v{old}"), ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------------------
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def get_model(submitted_by: str):
+    """Model for `submitted_by`'s current NF cases, from the shared registry."""
+    return get_registry().get(submitted_by)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    user = sys.argv[1] if len(sys.argv) > 1 else "Gagandeep Singh"
+    for attempt in ("cold", "warm"):
+        start = time.perf_counter()
+        model = get_model(user)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"   {attempt:<5}: {elapsed:8.2f} ms → "
+              f"{len(model) if model is not None else 0} cases")
+    print(f"\n📋 Registry: {get_registry().stats()}")
@@ -0,0 +1,202 @@
+"""
+=============================================================================
+  Week 2 — ML Engineer
+  File: model_store.py
+  Purpose: Versioned, memory-mappable on-disk model artifact.
+=============================================================================
+
+Replaces the pickled `(LabelEncoder, KNeighborsClassifier)` tuple. A model
+is a directory:
+
+    manifest.json  — format version, count, dim, dtype, training metadata
+    features.npy   — (n, 1404) float32 training vectors
+    sq_norms.npy   — (n,) float64 squared norms of `features`
+    ids.npy        — (n,) case ids, row-aligned with `features`
+    pca_*.npy, pca.json — optional projection (projection.py); `features`
+                     then holds projected vectors and queries are projected
+                     the same way before searching
+
+A manifest with "normalized": true was trained on pose-normalized vectors
+(backend face_normalization.py); `kneighbors` then normalizes raw queries
+before projecting and searching them.
+
+`load_model` opens the arrays with mmap_mode='r', so a cold start only
+parses the manifest; pages are read on first use and shared between worker
+processes through the OS page cache.
+
+The old classifier used `n_neighbors=len(labels)` with distance weighting
+and one sample per class, so its prediction was always the nearest case.
+`KNNModel.predict` returns exactly that, via an exact BLAS search.
+
+Artifacts live in models/<user>/v<case-set version>/ (see model_registry.py
+for the in-process cache on top of them).
+
+Usage:
+    from model_store import load_model, user_model_dir
+    model = load_model(user_model_dir("Gagandeep Singh", 3))
+    distances, indices = model.kneighbors(vectors, k=5)
+=============================================================================
+"""
+
+import os
+import re
+import json
+import hashlib
+from datetime import datetime
+
+import numpy as np
+
+from feature_loader import metrics
+from face_normalization import normalize_face_meshes
+from knn_search import nearest_neighbors, squared_norms
+from projection import load_projection, save_projection
+
+
+MODEL_FORMAT_VERSION = 1
+MODELS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+MANIFEST_FILE = "manifest.json"
+
+
+def user_model_dir(submitted_by: str, version: int) -> str:
+    """
+    Artifact directory for one user's model at one case-set version:
+    models/<slug>/v<version>/. The slug keeps the name readable but adds
+    a short hash so distinct usernames never collide on disk.
+    """
+    readable = re.sub(r"[^A-Za-z0-9_-]+", "_", submitted_by)[:40]
+    digest = hashlib.sha1(submitted_by.encode()).hexdigest()[:8]
+    return os.path.join(MODELS_ROOT, f"{readable}-{digest}", f"v{version}")
+
+
+def latest_model_dir(submitted_by: str):
+    """Newest existing artifact directory for `submitted_by`, or None."""
+    user_dir = os.path.dirname(user_model_dir(submitted_by, 0))
+    if not os.path.isdir(user_dir):
+        return None
+    versions = [
+        int(name[1:]) for name in os.listdir(user_dir)
+        if name.startswith("v") and name[1:].isdigit()
+        and model_exists(os.path.join(user_dir, name))
+    ]
+    return user_model_dir(submitted_by, max(versions)) if versions else None
+
+
+class KNNModel:
+    """Exact nearest-neighbour model over memory-mapped training vectors."""
+
+    def __init__(self, ids, features, sq_norms, manifest: dict, path: str = None,
+                 projection=None):
+        self.ids = ids
+        self.features = features
+        self.sq_norms = sq_norms
+        self.manifest = manifest
+        self.path = path
+        self.projection = projection
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def n_features(self) -> int:
+        return self.features.shape[1]
+
+    @property
+    def input_dim(self) -> int:
+        """Length of the vectors `kneighbors` accepts (before projection)."""
+        return self.projection.mean.shape[0] if self.projection else self.n_features
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the arrays (resident once every page has been touched)."""
+        return int(self.features.nbytes + self.sq_norms.nbytes + self.ids.nbytes)
+
+    def kneighbors(self, vectors, k: int = 1):
+        """Return (distances, indices) of the k nearest training rows."""
+        if self.manifest.get("normalized"):
+            vectors = normalize_face_meshes(vectors)
+        if self.projection is not None:
+            vectors = self.projection.transform(vectors)
+        with metrics.span("traceai_stage_seconds", stage="query", method="exact"):
+            return nearest_neighbors(
+                np.atleast_2d(vectors), self.features, k=k, base_sq_norms=self.sq_norms
+            )
+
+    def predict(self, vectors) -> np.ndarray:
+        """Return the id of the nearest training case for each vector."""
+        return self.ids[self.kneighbors(vectors, k=1)[1][:, 0]]
+
+
+def save_model(path: str, ids, features, projection=None, **metadata) -> KNNModel:
+    """
+    Write a model artifact to `path`.
+
+    With a `projection` (projection.Projection) the features are stored
+    projected and the projection is saved alongside them.
+
+    Each array is written to a temporary file and renamed into place, and
+    the manifest goes last, so a process that already has the previous
+    arrays mapped keeps reading consistent (old) data.
+    """
+    if projection is not None:
+        features = projection.transform(features)
+        metadata["projection"] = projection.info
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    ids = np.asarray(ids, dtype=str)
+    sq_norms = squared_norms(features)
+    os.makedirs(path, exist_ok=True)
+    if projection is not None:
+        save_projection(path, projection)
+
+    for name, array in (("features", features), ("sq_norms", sq_norms), ("ids", ids)):
+        tmp_path = os.path.join(path, f"{name}.tmp.npy")
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+
+    manifest = {
+        "format_version": MODEL_FORMAT_VERSION,
+        "algorithm": "exact-l2-nearest",
+        "count": int(len(ids)),
+        "dim": int(features.shape[1]),
+        "dtype": str(features.dtype),
+        "created_at": datetime.utcnow().isoformat(),
+        **metadata,
+    }
+    tmp_path = os.path.join(path, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+    return KNNModel(ids.astype(object), features, sq_norms, manifest, path, projection)
+
+
+def load_model(path: str, mmap: bool = True) -> KNNModel:
+    """
+    Open a model artifact written by `save_model`.
+
+    Raises FileNotFoundError if there is no artifact at `path`, and
+    ValueError if it has an unknown format or its arrays disagree with
+    the manifest (e.g. caught mid-rewrite).
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != MODEL_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format {manifest.get('format_version')} in {path}.")
+
+    mode = "r" if mmap else None
+    features = np.load(os.path.join(path, "features.npy"), mmap_mode=mode)
+    sq_norms = np.load(os.path.join(path, "sq_norms.npy"), mmap_mode=mode)
+    ids = np.load(os.path.join(path, "ids.npy")).astype(object)
+
+    expected = (manifest["count"], manifest["dim"])
+    if features.shape != expected or len(ids) != expected[0] or len(sq_norms) != expected[0]:
+        raise ValueError(f"Model at {path} does not match its manifest {expected}.")
+
+    projection = load_projection(path) if "projection" in manifest else None
+    if projection is not None and projection.n_components != expected[1]:
+        raise ValueError(f"Model at {path} does not match its projection.")
+
+    return KNNModel(ids, features, sq_norms, manifest, path, projection)
+
+
+def model_exists(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
@@ -0,0 +1,206 @@
+"""
+=============================================================================
+  Week 2 — ML Engineer
+  File: parallel_search.py
+  Purpose: Exact k-NN search spread over a pool of worker processes.
+=============================================================================
+
+`knn_search.nearest_neighbors` runs on one core (with single-threaded BLAS,
+or with BLAS threads that contend with everything else in the process).
+`ParallelSearcher` keeps a pool of worker processes that all see the same
+registered-case matrix without copying it:
+
+  - a model artifact / index memmap is re-opened by path in each worker
+    (the OS page cache shares the pages), and
+  - an in-memory matrix is copied once into `multiprocessing.shared_memory`
+    and attached by name.
+
+Work is split two ways:
+  - many queries (a match run): the query matrix is cut into fixed chunks
+    and each chunk is searched against the full base;
+  - few queries (one submission, huge corpus): the base is cut into one
+    shard per worker, every shard returns its own top-k, and the shards
+    are merged by (distance, row) so ties resolve the same way every time.
+
+Chunk boundaries depend only on the input sizes and the worker count, never
+on which worker finishes first, so results are reproducible run to run.
+Each worker pins its BLAS to `threads_per_worker` threads (default 1) to
+avoid oversubscribing the cores.
+
+Usage:
+    from parallel_search import ParallelSearcher
+    with ParallelSearcher(base, workers=16) as searcher:
+        distances, indices = searcher.search(queries, k=5)
+=============================================================================
+"""
+
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from knn_search import DEFAULT_CHUNK_SIZE, nearest_neighbors, squared_norms
+
+
+# Query chunks handed out per worker (more than one evens out stragglers)
+CHUNKS_PER_WORKER = 4
+
+# Below this many queries per worker, split the base instead of the queries
+MIN_QUERIES_PER_WORKER = 64
+
+BLAS_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                    "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+_base = None
+_sq_norms = None
+_shm = []
+
+
+def _attach(spec):
+    """Open an array described by `spec` without copying it."""
+    if spec[0] == "mmap":
+        return np.load(spec[1], mmap_mode="r")
+    _, name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    _shm.append(block)  # keep the mapping alive for the worker's lifetime
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _init_worker(base_spec, sq_spec):
+    global _base, _sq_norms
+    _base = _attach(base_spec)
+    _sq_norms = _attach(sq_spec)
+
+
+def _search_task(queries, k: int, lo: int, hi: int, chunk_size: int):
+    """Top-k of `queries` among base rows [lo, hi); indices are global."""
+    distances, indices = nearest_neighbors(
+        queries, _base[lo:hi], k=k, chunk_size=chunk_size,
+        base_sq_norms=_sq_norms[lo:hi],
+    )
+    return distances, indices + lo
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+def merge_top_k(distances, indices, k: int):
+    """
+    Merge per-shard candidates (m, s·k) into the overall top-k.
+
+    Rows are ordered by distance, then by base row, so equal distances
+    always resolve to the same rows.
+    """
+    order = np.lexsort((indices, distances), axis=-1)[:, :k]
+    return np.take_along_axis(distances, order, 1), np.take_along_axis(indices, order, 1)
+
+
+class ParallelSearcher:
+    """Pool of worker processes searching one shared base matrix."""
+
+    def __init__(self, base, workers: int = None, base_sq_norms=None,
+                 threads_per_worker: int = 1):
+        self.workers = max(1, workers or default_workers())
+        self.n, self.dim = base.shape
+        self._owned = []
+
+        base_spec = self._share(base)
+        if base_sq_norms is None:
+            base_sq_norms = squared_norms(np.asarray(base, dtype=np.float32))
+        sq_spec = self._share(base_sq_norms)
+
+        # BLAS reads its thread count from the environment at import time,
+        # so set it only while the workers are spawned
+        saved = {var: os.environ.get(var) for var in BLAS_THREAD_VARS}
+        os.environ.update({var: str(threads_per_worker) for var in BLAS_THREAD_VARS})
+        try:
+            context = multiprocessing.get_context("spawn")
+            self._pool = context.Pool(
+                self.workers, initializer=_init_worker, initargs=(base_spec, sq_spec)
+            )
+        finally:
+            for var, value in saved.items():
+                if value is None:
+                    os.environ.pop(var, None)
+                else:
+                    os.environ[var] = value
+
+    def _share(self, array):
+        """Spec under which workers can open `array` without a copy."""
+        if isinstance(array, np.memmap) and str(array.filename or "").endswith(".npy"):
+            # A whole .npy memmap (model artifact / index): workers re-open it
+            whole = np.load(array.filename, mmap_mode="r")
+            if whole.shape == array.shape and whole.dtype == array.dtype:
+                return ("mmap", str(array.filename))
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        self._owned.append(block)
+        return ("shm", block.name, array.shape, array.dtype.str)
+
+    def search(self, queries, k: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Exact k-nearest neighbours of every query row; same contract as
+        knn_search.nearest_neighbors.
+        """
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        m = len(queries)
+        k = min(k, self.n)
+        if m == 0 or k == 0:
+            return (np.empty((m, k), dtype=np.float64), np.empty((m, k), dtype=np.int64))
+
+        if m >= self.workers * MIN_QUERIES_PER_WORKER:
+            # Split the queries; every chunk sees the whole base
+            bounds = np.linspace(0, m, self.workers * CHUNKS_PER_WORKER + 1).astype(int)
+            tasks = [
+                (queries[a:b], k, 0, self.n, chunk_size)
+                for a, b in zip(bounds[:-1], bounds[1:]) if b > a
+            ]
+            parts = self._pool.starmap(_search_task, tasks)
+            return (np.concatenate([p[0] for p in parts]),
+                    np.concatenate([p[1] for p in parts]))
+
+        # Split the base; every shard sees all queries, then merge
+        bounds = np.linspace(0, self.n, min(self.workers, self.n) + 1).astype(int)
+        tasks = [
+            (queries, min(k, b - a), a, b, chunk_size)
+            for a, b in zip(bounds[:-1], bounds[1:]) if b > a
+        ]
+        parts = self._pool.starmap(_search_task, tasks)
+        return merge_top_k(
+            np.concatenate([p[0] for p in parts], axis=1),
+            np.concatenate([p[1] for p in parts], axis=1),
+            k,
+        )
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+        for block in self._owned:
+            block.close()
+            block.unlink()
+        self._owned = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def parallel_nearest_neighbors(queries, base, k: int = 1, workers: int = None,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE, base_sq_norms=None):
+    """One-shot parallel search (starts and stops a pool; reuse a
+    ParallelSearcher when searching the same base repeatedly)."""
+    with ParallelSearcher(base, workers, base_sq_norms) as searcher:
+        return searcher.search(queries, k=k, chunk_size=chunk_size)
@@ -0,0 +1,178 @@
+"""
+=============================================================================
+  Week 3 — ML Engineer
+  File: pca_report.py
+  Purpose: Match accuracy vs. PCA dimension count.
+=============================================================================
+
+Fits the PCA projection (projection.py) on the corpus for a range of
+`n_components` and reports, for each:
+  - explained variance of the retained components,
+  - recall@1 / recall@k against the exact full-dimension search,
+  - accuracy@1 against the known correct case (when ground truth exists),
+  - batched search time (ms per query) and the speed-up over 1404 dims,
+  - size of the projected feature matrix.
+
+The default corpus is synthetic: faces vary along a few dozen latent
+directions (as real landmark meshes do) plus small independent jitter, and
+queries are noisy re-sightings of known cases. `--source db` uses the NF
+registered cases and public submissions instead; pass the `--truth` file
+written by backend/synthetic_data.py to also score accuracy there.
+
+Usage:
+    python pca_report.py --n 50000 --queries 1000
+    python pca_report.py --source db --truth ../backend/truth.json --json pca.json
+=============================================================================
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+
+from knn_search import nearest_neighbors, squared_norms
+from projection import principal_axes, projection_from_axes
+
+DIM = 1404
+DEFAULT_COMPONENTS = (16, 32, 64, 128, 256, 512)
+
+
+def synthetic_corpus(n: int, n_queries: int, latent_dim: int = 60,
+                     noise: float = 0.01, seed: int = 0):
+    """Low-rank faces plus jitter; queries are noisy copies of base rows."""
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(0, 1 / np.sqrt(latent_dim), (latent_dim, DIM)).astype(np.float32)
+    scales = np.linspace(1.0, 0.1, latent_dim, dtype=np.float32)
+    mean_face = rng.random(DIM, dtype=np.float32)
+
+    latent = rng.normal(0, 1, (n, latent_dim)).astype(np.float32) * scales
+    base = mean_face + 0.05 * (latent @ basis)
+    base += rng.normal(0, 0.002, base.shape).astype(np.float32)
+
+    truth = rng.integers(0, n, n_queries)
+    queries = base[truth] + rng.normal(0, noise / np.sqrt(DIM), (n_queries, DIM)).astype(np.float32)
+    return base, queries, truth
+
+
+def db_corpus(truth_path: str = None):
+    """NF registered cases and public submissions; truth positions if known."""
+    from feature_loader import load_public_vectors, load_registered_vectors
+
+    ids, base = load_registered_vectors(status="NF")
+    public_ids, queries = load_public_vectors(status="NF")
+    truth = None
+    if truth_path:
+        with open(truth_path) as f:
+            mapping = json.load(f)
+        position = {case_id: i for i, case_id in enumerate(ids)}
+        truth = np.array([position.get(mapping.get(p), -1) for p in public_ids])
+    return base, queries, truth
+
+
+def _recall(approx, exact, k: int) -> float:
+    hits = sum(len(set(a[:k]) & set(e[:k])) for a, e in zip(approx, exact))
+    return hits / max(1, exact[:, :k].size)
+
+
+def _accuracy(indices, truth) -> float:
+    """Top-1 accuracy over the queries that have a correct case."""
+    if truth is None:
+        return None
+    known = truth >= 0
+    return float((indices[known, 0] == truth[known]).mean()) if known.any() else None
+
+
+def _search(queries, base, k: int):
+    sq_norms = squared_norms(base)
+    start = time.perf_counter()
+    _, indices = nearest_neighbors(queries, base, k=k, base_sq_norms=sq_norms)
+    return indices, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def run_report(base, queries, truth=None, k: int = 10,
+               components=DEFAULT_COMPONENTS, whiten: bool = False) -> dict:
+    """Sweep n_components and return the report as a dict."""
+    exact, exact_ms = _search(queries, base, k)
+    axes = principal_axes(base)
+    rows = []
+    for n_components in components:
+        if n_components >= base.shape[1]:
+            break
+        projection = projection_from_axes(axes, n_components, whiten)
+        reduced_base = projection.transform(base)
+        reduced_queries = projection.transform(queries)
+        indices, ms = _search(reduced_queries, reduced_base, k)
+        rows.append({
+            "n_components": n_components,
+            "explained_variance": projection.info["explained_variance_ratio"],
+            "recall@1": _recall(indices, exact, 1),
+            f"recall@{k}": _recall(indices, exact, k),
+            "accuracy@1": _accuracy(indices, truth),
+            "batch_ms_per_query": ms,
+            "speedup": exact_ms / ms,
+            "features_mb": reduced_base.nbytes / 1024 / 1024,
+        })
+
+    return {
+        "corpus_size": len(base),
+        "queries": len(queries),
+        "k": k,
+        "whiten": whiten,
+        "full": {
+            "n_components": base.shape[1],
+            "accuracy@1": _accuracy(exact, truth),
+            "batch_ms_per_query": exact_ms,
+            "features_mb": np.asarray(base).nbytes / 1024 / 1024,
+        },
+        "sweep": rows,
+    }
+
+
+def print_report(report: dict):
+    k, full = report["k"], report["full"]
+    fmt_acc = lambda value: f"{value:>7.3f}" if value is not None else f"{'—':>7}"  # noqa: E731
+    print("=" * 78)
+    print("  PCA Dimension vs Accuracy Report")
+    print("=" * 78)
+    print(f"   Corpus size        : {report['corpus_size']:,}")
+    print(f"   Queries            : {report['queries']:,}")
+    print(f"   Whitened           : {report['whiten']}")
+    print()
+    print(f"   {'dims':>5} {'var':>6} {'R@1':>7} {f'R@{k}':>7} {'Acc@1':>7} "
+          f"{'ms/q':>8} {'speedup':>8} {'MB':>8}")
+    print(f"   {full['n_components']:>5} {1:>6.1%} {1:>7.3f} {1:>7.3f} "
+          f"{fmt_acc(full['accuracy@1'])} {full['batch_ms_per_query']:>8.3f} "
+          f"{1:>7.1f}x {full['features_mb']:>8.1f}")
+    for row in report["sweep"]:
+        print(
+            f"   {row['n_components']:>5} {row['explained_variance']:>6.1%} "
+            f"{row['recall@1']:>7.3f} {row[f'recall@{k}']:>7.3f} {fmt_acc(row['accuracy@1'])} "
+            f"{row['batch_ms_per_query']:>8.3f} {row['speedup']:>7.1f}x {row['features_mb']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PCA dimension vs. match accuracy report.")
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--n", type=int, default=50_000, help="Synthetic corpus size.")
+    parser.add_argument("--queries", type=int, default=1_000, help="Synthetic query count.")
+    parser.add_argument("--truth", default=None, help="Ground truth JSON (--source db).")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--components", type=int, nargs="+", default=list(DEFAULT_COMPONENTS))
+    parser.add_argument("--whiten", action="store_true")
+    parser.add_argument("--json", default=None, help="Also write the report here.")
+    args = parser.parse_args()
+
+    if args.source == "db":
+        base, queries, truth = db_corpus(args.truth)
+    else:
+        base, queries, truth = synthetic_corpus(args.n, args.queries)
+
+    report = run_report(base, queries, truth, k=args.k, components=args.components,
+                        whiten=args.whiten)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
@@ -0,0 +1,224 @@
+"""
+=============================================================================
+  Week 3 — ML Engineer
+  File: projection.py
+  Purpose: Optional PCA / whitening projection of face-mesh vectors.
+=============================================================================
+
+The 1404 landmark coordinates are strongly correlated (neighbouring
+landmarks move together), so most of the variance between faces lives in a
+few hundred directions. A PCA projection fitted with NumPy SVD on the
+registered cases maps every vector to `n_components` dimensions before it
+is indexed or searched; distance computation and artifact size shrink in
+proportion (1404 → 128 is ~11×).
+
+A projection is stored as three files next to a model artifact:
+
+    pca_mean.npy        — (1404,) float32 mean of the fitted vectors
+    pca_components.npy  — (1404, c) float32 projection matrix (columns are
+                          principal axes, divided by their singular value
+                          when whitened)
+    pca.json            — n_components, whiten, explained variance, fit size
+
+One shared projection (models/_projection/) is fitted once from the NF
+registered cases and copied into every per-user artifact, so training and
+matching always use the same space. Refit it explicitly (`--fit`); the
+matcher never fits it. Stored candidate distances from the old projection
+are not comparable with the new one, so the next `baseline_match.py` run
+sees the new fit time and re-scores everything.
+
+Usage:
+    python projection.py --fit 128          # fit the shared projection
+    python projection.py --fit 128 --whiten
+    from projection import get_projection
+    projection = get_projection(128)
+    reduced = projection.transform(vectors)
+=============================================================================
+"""
+
+import os
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from feature_loader import load_registered_vectors, metrics
+
+
+PROJECTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "models", "_projection")
+PROJECTION_FILE = "pca.json"
+
+# Rows sampled for the SVD; more adds little once the covariance is stable
+MAX_FIT_ROWS = 20_000
+
+
+class Projection:
+    """Fitted linear map x → (x - mean) @ components."""
+
+    def __init__(self, mean, components, info: dict):
+        self.mean = mean
+        self.components = components
+        self.info = info
+
+    @property
+    def n_components(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def whiten(self) -> bool:
+        return bool(self.info.get("whiten", False))
+
+    @property
+    def normalized(self) -> bool:
+        """Fitted on pose-normalized vectors (face_mesh_norm)."""
+        return bool(self.info.get("normalized", False))
+
+    def matches(self, n_components: int, whiten: bool = False,
+                normalized: bool = False) -> bool:
+        """Whether this was fitted for `n_components` (clamped to the data rank)."""
+        requested = self.info.get("requested_components", self.n_components)
+        return (requested == n_components and self.whiten == whiten
+                and self.normalized == normalized)
+
+    def transform(self, vectors) -> np.ndarray:
+        """Project (m, 1404) vectors to (m, n_components) float32."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        with metrics.span("traceai_stage_seconds", stage="project"):
+            return np.ascontiguousarray((vectors - self.mean) @ self.components)
+
+
+def principal_axes(features, max_rows: int = MAX_FIT_ROWS, seed: int = 0) -> dict:
+    """
+    Mean, per-component variance and principal axes of (n, d) `features`
+    from one thin SVD of at most `max_rows` rows (a fixed random sample).
+    """
+    features = np.asarray(features, dtype=np.float32)
+    if len(features) < 2:
+        raise ValueError("Need at least two vectors to fit a projection.")
+    if len(features) > max_rows:
+        rows = np.random.default_rng(seed).choice(len(features), max_rows, replace=False)
+        features = features[np.sort(rows)]
+
+    mean = features.mean(axis=0, dtype=np.float64)
+    _, singular, vt = np.linalg.svd(features.astype(np.float64) - mean, full_matrices=False)
+    return {
+        "mean": mean,
+        "variance": singular ** 2 / (len(features) - 1),
+        "axes": vt,
+        "fit_rows": len(features),
+    }
+
+
+def projection_from_axes(axes: dict, n_components: int, whiten: bool = False) -> Projection:
+    """Keep the first `n_components` axes of a `principal_axes` result."""
+    requested, n_components = n_components, min(n_components, len(axes["axes"]))
+    variance = axes["variance"]
+    components = axes["axes"][:n_components].T
+    if whiten:
+        components = components / np.sqrt(np.maximum(variance[:n_components], 1e-12))
+
+    info = {
+        "n_components": int(n_components),
+        "requested_components": int(requested),
+        "whiten": bool(whiten),
+        "explained_variance_ratio": float(variance[:n_components].sum() / variance.sum()),
+        "fit_rows": int(axes["fit_rows"]),
+        "input_dim": int(components.shape[0]),
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    return Projection(axes["mean"].astype(np.float32), components.astype(np.float32), info)
+
+
+def fit_pca(features, n_components: int, whiten: bool = False,
+            max_rows: int = MAX_FIT_ROWS, seed: int = 0) -> Projection:
+    """
+    Fit a PCA projection on (n, d) `features` with a thin SVD.
+
+    With `whiten` every component is scaled to unit variance, which weighs
+    all retained directions equally instead of by their spread.
+    """
+    return projection_from_axes(principal_axes(features, max_rows, seed), n_components, whiten)
+
+
+def save_projection(path: str, projection: Projection):
+    """Write the projection files into `path` (manifest last, atomically)."""
+    os.makedirs(path, exist_ok=True)
+    for name, array in (("pca_mean", projection.mean),
+                        ("pca_components", projection.components)):
+        tmp_path = os.path.join(path, f"{name}.tmp.npy")
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+
+    tmp_path = os.path.join(path, PROJECTION_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(projection.info, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, PROJECTION_FILE))
+
+
+def load_projection(path: str):
+    """Projection stored in `path`, or None if there is none."""
+    if not os.path.isfile(os.path.join(path, PROJECTION_FILE)):
+        return None
+    with open(os.path.join(path, PROJECTION_FILE)) as f:
+        info = json.load(f)
+    mean = np.load(os.path.join(path, "pca_mean.npy"))
+    components = np.load(os.path.join(path, "pca_components.npy"))
+    if components.shape != (info["input_dim"], info["n_components"]):
+        raise ValueError(f"Projection at {path} does not match its manifest.")
+    return Projection(mean, components, info)
+
+
+def fit_shared_projection(n_components: int, whiten: bool = False,
+                          normalized: bool = False) -> Projection:
+    """Fit the shared projection on the NF registered cases and save it."""
+    _, features = load_registered_vectors(status="NF", normalized=normalized)
+    projection = fit_pca(features, n_components, whiten)
+    projection.info["normalized"] = bool(normalized)
+    save_projection(PROJECTION_DIR, projection)
+    return projection
+
+
+def get_projection(n_components: int, whiten: bool = False,
+                   normalized: bool = False, fit: bool = True) -> Projection:
+    """
+    The shared projection with this configuration, fitting it on first use.
+
+    A stored projection with a different configuration (dimensions,
+    whitening, or raw vs. normalized input) is replaced. With `fit=False`
+    a missing or different projection raises ValueError instead.
+    """
+    projection = load_projection(PROJECTION_DIR)
+    if projection is None or not projection.matches(n_components, whiten, normalized):
+        if not fit:
+            raise ValueError(
+                f"No shared {n_components}-component projection "
+                f"(whiten={whiten}, normalized={normalized}); fit it with "
+                f"projection.py --fit {n_components}"
+                f"{' --whiten' if whiten else ''}{' --normalized' if normalized else ''}."
+            )
+        projection = fit_shared_projection(n_components, whiten, normalized)
+    return projection
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit / inspect the shared PCA projection.")
+    parser.add_argument("--fit", type=int, metavar="N_COMPONENTS", default=None)
+    parser.add_argument("--whiten", action="store_true")
+    parser.add_argument("--normalized", action="store_true",
+                        help="Fit on pose-normalized vectors (face_mesh_norm).")
+    args = parser.parse_args()
+
+    if args.fit:
+        print(f"🔄 Fitting {args.fit}-component projection on NF registered cases…")
+        fit_shared_projection(args.fit, args.whiten, args.normalized)
+
+    projection = load_projection(PROJECTION_DIR)
+    if projection is None:
+        print("❌ No shared projection yet — run with --fit N_COMPONENTS.")
+    else:
+        info = projection.info
+        print(f"✅ Projection {info['input_dim']} → {info['n_components']} dims "
+              f"(whiten={info['whiten']}), explained variance "
+              f"{info['explained_variance_ratio']:.1%} from {info['fit_rows']:,} rows.")
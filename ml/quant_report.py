@@ -0,0 +1,140 @@
+"""
+=============================================================================
+  Week 3 — ML Engineer
+  File: quant_report.py
+  Purpose: Memory vs. recall report for the quantized case index.
+=============================================================================
+
+Builds a QuantizedIndex (quantization.py) per codec over the same corpus
+and reports, side by side with the uncompressed float32 matrix:
+  - bytes per vector and resident size (codes + codec parameters),
+  - memory saved against float32 and against the float64 matrix the
+    original matcher held,
+  - recall@1 / recall@k against exact search, on the codes alone
+    (rerank=0) and after exact re-ranking of the top `--rerank`,
+  - batched search time (ms per query) and build time.
+
+The corpus is the clustered synthetic one from ann_report.py (or the NF
+registered cases / public submissions with `--source db`).
+
+Usage:
+    python quant_report.py --n 100000 --queries 1000
+    python quant_report.py --source db --rerank 100 --json quant.json
+=============================================================================
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+
+from ann_report import _recall, db_corpus, synthetic_corpus
+from knn_search import nearest_neighbors, squared_norms
+from quantization import CODECS, DEFAULT_PQ_SUBVECTORS, DEFAULT_RERANK, QuantizedIndex
+
+
+def _timed_search(index, queries, k: int, rerank: int):
+    start = time.perf_counter()
+    ids, _ = index.search(queries, k=k, rerank=rerank)
+    return ids, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def run_report(ids, base, queries, k: int = 10, rerank: int = DEFAULT_RERANK,
+               codecs=tuple(CODECS), n_subvectors: int = DEFAULT_PQ_SUBVECTORS) -> dict:
+    """Build one index per codec and return the report as a dict."""
+    ids = np.asarray(ids)
+    base = np.ascontiguousarray(base, dtype=np.float32)
+    float32_bytes = base.nbytes + squared_norms(base).nbytes
+
+    start = time.perf_counter()
+    exact_ids = ids[nearest_neighbors(queries, base, k=k)[1]]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    rows = []
+    for codec in codecs:
+        start = time.perf_counter()
+        index = QuantizedIndex.build(ids, base, codec, n_subvectors=n_subvectors)
+        build_seconds = time.perf_counter() - start
+
+        approx_ids, approx_ms = _timed_search(index, queries, k, rerank=0)
+        rerank_ids, rerank_ms = _timed_search(index, queries, k, rerank=rerank)
+        rows.append({
+            "codec": codec,
+            "bytes_per_vector": index.codec.code_size,
+            "resident_mb": index.memory_bytes / 1024 / 1024,
+            "saved_vs_float32": 1 - index.memory_bytes / float32_bytes,
+            "saved_vs_float64": 1 - index.memory_bytes / (2 * base.nbytes),
+            "recall@1": _recall(approx_ids, exact_ids, 1),
+            f"recall@{k}": _recall(approx_ids, exact_ids, k),
+            "reranked_recall@1": _recall(rerank_ids, exact_ids, 1),
+            f"reranked_recall@{k}": _recall(rerank_ids, exact_ids, k),
+            "batch_ms_per_query": approx_ms,
+            "reranked_ms_per_query": rerank_ms,
+            "build_seconds": build_seconds,
+        })
+
+    return {
+        "corpus_size": len(base),
+        "queries": len(queries),
+        "k": k,
+        "rerank": rerank,
+        "float32": {
+            "bytes_per_vector": base.shape[1] * 4,
+            "resident_mb": float32_bytes / 1024 / 1024,
+            "float64_mb": 2 * base.nbytes / 1024 / 1024,
+            "batch_ms_per_query": exact_ms,
+        },
+        "sweep": rows,
+    }
+
+
+def print_report(report: dict):
+    k, full = report["k"], report["float32"]
+    print("=" * 90)
+    print("  Quantized Index Memory vs Recall Report")
+    print("=" * 90)
+    print(f"   Corpus size        : {report['corpus_size']:,}")
+    print(f"   Queries            : {report['queries']:,}")
+    print(f"   Re-rank depth      : {report['rerank']}")
+    print(f"   float64 matrix     : {full['float64_mb']:.1f} MB")
+    print()
+    print(f"   {'codec':>8} {'B/vec':>6} {'MB':>8} {'saved':>6} {'R@1':>6} {f'R@{k}':>6} "
+          f"{'rr R@1':>7} {f'rr R@{k}':>7} {'ms/q':>7} {'rr ms/q':>8} {'build s':>8}")
+    print(f"   {'float32':>8} {full['bytes_per_vector']:>6} {full['resident_mb']:>8.1f} "
+          f"{0:>6.0%} {1:>6.3f} {1:>6.3f} {'—':>7} {'—':>7} "
+          f"{full['batch_ms_per_query']:>7.3f} {'—':>8} {'—':>8}")
+    for row in report["sweep"]:
+        print(
+            f"   {row['codec']:>8} {row['bytes_per_vector']:>6} {row['resident_mb']:>8.1f} "
+            f"{row['saved_vs_float32']:>6.0%} {row['recall@1']:>6.3f} "
+            f"{row[f'recall@{k}']:>6.3f} {row['reranked_recall@1']:>7.3f} "
+            f"{row[f'reranked_recall@{k}']:>7.3f} {row['batch_ms_per_query']:>7.3f} "
+            f"{row['reranked_ms_per_query']:>8.3f} {row['build_seconds']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantized index memory vs. recall report.")
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--n", type=int, default=100_000, help="Synthetic corpus size.")
+    parser.add_argument("--queries", type=int, default=1_000, help="Synthetic query count.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=DEFAULT_RERANK)
+    parser.add_argument("--codecs", nargs="+", choices=list(CODECS), default=list(CODECS))
+    parser.add_argument("--subvectors", type=int, default=DEFAULT_PQ_SUBVECTORS)
+    parser.add_argument("--json", default=None, help="Also write the report here.")
+    args = parser.parse_args()
+
+    if args.source == "db":
+        ids, base, queries = db_corpus()
+    else:
+        ids, base, queries = synthetic_corpus(args.n, args.queries)
+
+    report = run_report(ids, base, queries, k=args.k, rerank=args.rerank,
+                        codecs=args.codecs, n_subvectors=args.subvectors)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
@@ -0,0 +1,541 @@
+"""
+=============================================================================
+  Week 3 — ML Engineer
+  File: quantization.py
+  Purpose: Compressed storage of the registered-case vectors, with exact
+           re-ranking from full-precision vectors on disk.
+=============================================================================
+
+A float32 face mesh takes 5.6 KB (1404 × 4 bytes), so a national-scale
+corpus does not fit in a match node's memory. A `QuantizedIndex` keeps only
+compressed codes in memory and scans them; the full-precision vectors stay
+in a memory-mapped file and are read only for the few candidates that
+survive the scan:
+
+  codec     bytes / vector    distance on the codes
+  -------   --------------    --------------------------------------------
+  float16   2 · d  (2.8 KB)   BLAS on decoded float32 blocks
+  int8      d      (1.4 KB)   per-dimension min / step scalar quantization,
+                              BLAS on decoded blocks
+  pq        M      (~78 B)    product quantization: d split into M
+                              sub-vectors, each replaced by one of 256
+                              k-means centroids; asymmetric distance
+                              computation (ADC) sums per-query lookup
+                              tables instead of decoding
+
+`search(queries, k, rerank=R)` ranks all codes approximately, keeps the top
+R per query and re-scores them exactly against the full vectors, so the
+returned distances are true Euclidean distances (comparable with
+`baseline_match.match`). `quant_report.py` compares memory and recall.
+
+Like the IVF index, the quantized index replays IndexJournal rows before use:
+additions are encoded with the existing codec into a delta segment and
+removals become tombstones. Rebuild to retrain the codec.
+
+On-disk layout (index/quantized-<codec>/):
+    manifest.json   — codec, parameters, count, journal seq
+    codes.npy       — (n, code_size) codes
+    codec_*.npy     — codec parameters (scales, centroids, …)
+    vectors.npy     — (n, d) float32 full-precision vectors (memory-mapped)
+    ids.npy         — (n,) record ids
+
+Usage:
+    python quantization.py --codec pq          # build index/quantized-pq/
+    python quantization.py --codec int8
+    python quant_report.py --n 100000          # memory vs. recall
+=============================================================================
+"""
+
+import os
+import json
+import argparse
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from ann_index import INDEX_ROOT, JOURNAL_BATCH_SIZE, SYNC_LOAD_BATCH_SIZE, train_kmeans
+from feature_loader import metrics
+from knn_search import CHUNK_BYTES, nearest_neighbors, squared_norms
+
+
+QUANTIZED_FORMAT_VERSION = 1
+
+# Candidates per query re-scored against the full-precision vectors
+DEFAULT_RERANK = 50
+# Product quantization: sub-vectors per vector, centroids per sub-vector
+DEFAULT_PQ_SUBVECTORS = 78
+PQ_CENTROIDS = 256
+# Rows sampled to train the PQ codebooks
+PQ_TRAIN_ROWS = 50_000
+# Codes scored per block, and queries per block, while scanning
+BASE_BLOCK_ROWS = 65_536
+QUERY_BLOCK_ROWS = 256
+
+
+# ---------------------------------------------------------------------------
+# Codecs
+# ---------------------------------------------------------------------------
+class Float16Codec:
+    """Half-precision copy of every vector."""
+
+    name = "float16"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    @classmethod
+    def train(cls, vectors, **_):
+        return cls(vectors.shape[1])
+
+    @property
+    def code_size(self) -> int:
+        return 2 * self.dim
+
+    def encode(self, vectors) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float16)
+
+    def decode(self, codes) -> np.ndarray:
+        return np.asarray(codes, dtype=np.float32)
+
+    def prepare(self, codes):
+        """Per-block state shared by every query slice: decoded rows and their norms."""
+        base = self.decode(codes)
+        return base, squared_norms(base).astype(np.float32)
+
+    def scores(self, queries, prepared) -> np.ndarray:
+        """Ranking scores for (m, d) queries against a prepared block, lower = closer."""
+        base, base_sq_norms = prepared
+        block = queries @ base.T
+        block *= -2.0
+        block += base_sq_norms
+        return block
+
+    def arrays(self) -> dict:
+        return {}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, dim: int):
+        return cls(dim)
+
+
+class Int8Codec(Float16Codec):
+    """Per-dimension scalar quantization to 256 levels between min and max."""
+
+    name = "int8"
+
+    def __init__(self, low, step):
+        super().__init__(len(low))
+        self.low = np.asarray(low, dtype=np.float32)
+        self.step = np.asarray(step, dtype=np.float32)
+
+    @classmethod
+    def train(cls, vectors, **_):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        return cls(low, np.maximum(high - low, 1e-12) / 255)
+
+    @property
+    def code_size(self) -> int:
+        return self.dim
+
+    def encode(self, vectors) -> np.ndarray:
+        levels = np.rint((np.asarray(vectors, dtype=np.float32) - self.low) / self.step)
+        return np.clip(levels, 0, 255).astype(np.uint8)
+
+    def decode(self, codes) -> np.ndarray:
+        return self.low + np.asarray(codes, dtype=np.float32) * self.step
+
+    def arrays(self) -> dict:
+        return {"low": self.low, "step": self.step}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, dim: int):
+        return cls(arrays["low"], arrays["step"])
+
+
+class PQCodec:
+    """Product quantizer with asymmetric distance computation."""
+
+    name = "pq"
+
+    def __init__(self, centroids: list, bounds):
+        self.centroids = centroids  # M arrays of (256, sub_dim)
+        self.bounds = np.asarray(bounds, dtype=np.int64)  # M + 1 split points
+
+    @classmethod
+    def train(cls, vectors, n_subvectors: int = DEFAULT_PQ_SUBVECTORS,
+              max_rows: int = PQ_TRAIN_ROWS, seed: int = 0, **_):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n, dim = vectors.shape
+        n_subvectors = min(n_subvectors, dim)
+        if n > max_rows:
+            vectors = vectors[np.sort(np.random.default_rng(seed).choice(n, max_rows, replace=False))]
+        bounds = np.linspace(0, dim, n_subvectors + 1).astype(np.int64)
+        centroids = [
+            train_kmeans(np.ascontiguousarray(vectors[:, lo:hi]),
+                         min(PQ_CENTROIDS, len(vectors)), seed=seed + j)
+            for j, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]))
+        ]
+        return cls(centroids, bounds)
+
+    @property
+    def dim(self) -> int:
+        return int(self.bounds[-1])
+
+    @property
+    def code_size(self) -> int:
+        return len(self.centroids)
+
+    def _subspaces(self):
+        return zip(self.centroids, self.bounds[:-1], self.bounds[1:])
+
+    def encode(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.empty((len(vectors), self.code_size), dtype=np.uint8)
+        for j, (centroids, lo, hi) in enumerate(self._subspaces()):
+            codes[:, j] = nearest_neighbors(
+                np.ascontiguousarray(vectors[:, lo:hi]), centroids, k=1
+            )[1][:, 0]
+        return codes
+
+    def decode(self, codes) -> np.ndarray:
+        return np.concatenate(
+            [centroids[codes[:, j]] for j, (centroids, _, _) in enumerate(self._subspaces())],
+            axis=1,
+        )
+
+    def prepare(self, codes):
+        """ADC reads the codes directly; nothing to decode per block."""
+        return codes
+
+    def scores(self, queries, codes) -> np.ndarray:
+        """
+        ADC ranking scores: sum over sub-vectors of table[j, code_j], where
+        the (m, 256) table holds ||c||² - 2 q·c for each centroid (||q||² is
+        constant per query, as in the other codecs).
+        """
+        block = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for j, (centroids, lo, hi) in enumerate(self._subspaces()):
+            sub = queries[:, lo:hi]
+            table = (centroids ** 2).sum(axis=1)[None, :] - 2 * sub @ centroids.T
+            block += table[:, codes[:, j]]
+        return block
+
+    def arrays(self) -> dict:
+        padded = max(hi - lo for _, lo, hi in self._subspaces())
+        stacked = np.zeros((self.code_size, PQ_CENTROIDS, padded), dtype=np.float32)
+        for j, (centroids, lo, hi) in enumerate(self._subspaces()):
+            stacked[j, :len(centroids), :hi - lo] = centroids
+        sizes = np.array([len(c) for c in self.centroids], dtype=np.int64)
+        return {"centroids": stacked, "bounds": self.bounds, "sizes": sizes}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, dim: int):
+        bounds = arrays["bounds"]
+        centroids = [
+            np.ascontiguousarray(arrays["centroids"][j, :arrays["sizes"][j], :hi - lo])
+            for j, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]))
+        ]
+        return cls(centroids, bounds)
+
+
+CODECS = {codec.name: codec for codec in (Float16Codec, Int8Codec, PQCodec)}
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+class QuantizedIndex:
+    """Compressed codes in memory, full vectors on disk for re-ranking."""
+
+    def __init__(self, codec, codes, vectors, ids, path: str = None,
+                 kind: str = "registered", journal_seq: int = 0):
+        self.codec = codec
+        self.codes = codes
+        self.vectors = vectors
+        self.ids = np.asarray(ids, dtype=object)
+        self.path = path
+        self.kind = kind
+        self.journal_seq = journal_seq
+
+        self.delta_codes = np.empty((0,) + codes.shape[1:], dtype=codes.dtype)
+        self.delta_vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        self.delta_ids = np.empty(0, dtype=object)
+        self.deleted = np.zeros(len(ids), dtype=bool)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def build(cls, ids, vectors, codec: str = "pq", kind: str = "registered", **params):
+        """Train `codec` on `vectors` and encode them."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(vectors) == 0:
+            raise ValueError("Cannot build an index over zero vectors.")
+        trained = CODECS[codec].train(vectors, **params)
+        return cls(trained, trained.encode(vectors), vectors, ids, kind=kind)
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.delta_ids) - int(self.deleted.sum())
+
+    @property
+    def memory_bytes(self) -> int:
+        """Resident size: codes + codec parameters (full vectors stay on disk)."""
+        codec_bytes = sum(np.asarray(a).nbytes for a in self.codec.arrays().values())
+        return int(self.codes.nbytes + self.delta_codes.nbytes + codec_bytes)
+
+    # -- incremental updates ------------------------------------------------
+    def apply_journal(self, rows, loader) -> int:
+        """Apply (seq, op, record_id) journal rows: tombstone removals, encode additions."""
+        pending, removed = {}, set()
+        for _, op, record_id in rows:
+            if op == "add":
+                pending[record_id] = True
+            else:
+                pending.pop(record_id, None)
+                removed.add(record_id)
+
+        with self._lock:
+            all_ids = np.concatenate([self.ids, self.delta_ids])
+            live = set(all_ids[~self.deleted])
+            dead = np.isin(all_ids, list(removed)) & ~self.deleted
+            deleted = self.deleted | dead
+            changed = int(dead.sum())
+
+            add_ids = [record_id for record_id in pending if record_id not in live - removed]
+            for start in range(0, len(add_ids), SYNC_LOAD_BATCH_SIZE):
+                ids, vectors = loader(status=None, ids=add_ids[start:start + SYNC_LOAD_BATCH_SIZE])
+                if len(ids):
+                    self.delta_codes = np.concatenate([self.delta_codes, self.codec.encode(vectors)])
+                    self.delta_vectors = np.concatenate([self.delta_vectors, vectors])
+                    self.delta_ids = np.concatenate([self.delta_ids, ids])
+                    deleted = np.concatenate([deleted, np.zeros(len(ids), dtype=bool)])
+                    changed += len(ids)
+            self.deleted = deleted
+            self.journal_seq = rows[-1][0]
+        return changed
+
+    # -- search -------------------------------------------------------------
+    def search(self, vectors, k: int = 1, rerank: int = DEFAULT_RERANK):
+        """
+        k nearest records for each query vector.
+
+        Codes are scanned in blocks of BASE_BLOCK_ROWS (decoded codecs never
+        materialize the whole corpus in float32; each block is decoded once
+        for all query slices) and ranked approximately; the best
+        max(k, rerank) per query are re-scored exactly against the
+        full-precision vectors, one query slice at a time (rerank=0 returns
+        approximate distances).
+
+        Returns
+        -------
+        ids : np.ndarray       — (m, k) record ids, nearest first
+        distances : np.ndarray — (m, k) float64 Euclidean distances
+        """
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            # Main and delta segments are scanned in place (no merged copy)
+            segments = [(self.codes, 0), (self.delta_codes, len(self.ids))]
+            main_ids, delta_ids = self.ids, self.delta_ids
+            deleted = self.deleted
+            n_main = len(self.ids)
+            main_vectors, delta_vectors = self.vectors, self.delta_vectors
+
+        m, n = len(queries), len(deleted) - int(deleted.sum())
+        k = min(k, n)
+        if m == 0 or k == 0:
+            return np.empty((m, k), dtype=object), np.empty((m, k), dtype=np.float64)
+        keep = min(max(k, rerank), n)
+
+        best = np.full((m, keep), np.inf, dtype=np.float32)
+        positions = np.zeros((m, keep), dtype=np.int64)
+        step = max(1, min(QUERY_BLOCK_ROWS, CHUNK_BYTES // max(1, BASE_BLOCK_ROWS * 4)))
+        with metrics.span("traceai_stage_seconds", stage="search", method=self.codec.name):
+            for codes, offset in segments:
+                for lo in range(0, len(codes), BASE_BLOCK_ROWS):
+                    hi = min(lo + BASE_BLOCK_ROWS, len(codes))
+                    dead = deleted[offset + lo:offset + hi]
+                    # Decode (and take norms of) each block once, not once per query slice
+                    prepared = self.codec.prepare(codes[lo:hi])
+                    for start in range(0, m, step):
+                        rows = slice(start, start + step)
+                        block = self.codec.scores(queries[rows], prepared)
+                        block[:, dead] = np.inf
+                        scores = np.concatenate([best[rows], block], axis=1)
+                        candidates = np.concatenate(
+                            [positions[rows],
+                             np.broadcast_to(np.arange(offset + lo, offset + hi), block.shape)],
+                            axis=1,
+                        )
+                        top = np.argpartition(scores, keep - 1, axis=1)[:, :keep]
+                        best[rows] = np.take_along_axis(scores, top, axis=1)
+                        positions[rows] = np.take_along_axis(candidates, top, axis=1)
+                    del prepared
+
+        if rerank:
+            # Read only the candidate rows from the memory-mapped full vectors,
+            # a query slice at a time so the float64 block stays under CHUNK_BYTES
+            distances = np.empty((m, keep), dtype=np.float64)
+            step = max(1, min(step, CHUNK_BYTES // max(1, keep * queries.shape[1] * 8)))
+            for start in range(0, m, step):
+                block = positions[start:start + step]
+                rows = np.empty(block.shape + (queries.shape[1],), dtype=np.float32)
+                in_main = block < n_main
+                unique, inverse = np.unique(block[in_main], return_inverse=True)
+                rows[in_main] = np.asarray(main_vectors[unique])[inverse]
+                rows[~in_main] = delta_vectors[block[~in_main] - n_main]
+                diff = rows.astype(np.float64) - queries[start:start + step, None, :]
+                distances[start:start + step] = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        else:
+            distances = np.sqrt(np.maximum(
+                best.astype(np.float64) + squared_norms(queries)[:, None], 0
+            ))
+
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        nearest = np.take_along_axis(positions, order, axis=1)
+        ids = np.empty(nearest.shape, dtype=object)
+        in_main = nearest < n_main
+        ids[in_main] = main_ids[nearest[in_main]]
+        ids[~in_main] = delta_ids[nearest[~in_main] - n_main]
+        return ids, np.take_along_axis(distances, order, axis=1)
+
+    # -- persistence --------------------------------------------------------
+    def save(self, path: str):
+        """Write the index to `path` (manifest last, so readers never see a partial index)."""
+        with self._lock:
+            if len(self.delta_ids) or self.deleted.any():
+                live = ~self.deleted
+                self.codes = np.concatenate([self.codes, self.delta_codes])[live]
+                self.vectors = np.concatenate([np.asarray(self.vectors), self.delta_vectors])[live]
+                self.ids = np.concatenate([self.ids, self.delta_ids])[live]
+                self.__init__(self.codec, self.codes, self.vectors, self.ids,
+                              path, self.kind, self.journal_seq)
+
+            os.makedirs(path, exist_ok=True)
+            arrays = {"codes": self.codes, "vectors": np.asarray(self.vectors),
+                      "ids": np.asarray(self.ids, dtype=str)}
+            arrays.update({f"codec_{name}": a for name, a in self.codec.arrays().items()})
+            for name, array in arrays.items():
+                tmp_path = os.path.join(path, f"{name}.tmp.npy")
+                np.save(tmp_path, array)
+                os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+
+            manifest = {
+                "format_version": QUANTIZED_FORMAT_VERSION,
+                "codec": self.codec.name,
+                "codec_arrays": sorted(self.codec.arrays()),
+                "kind": self.kind,
+                "journal_seq": self.journal_seq,
+                "dim": int(self.vectors.shape[1]),
+                "count": int(len(self.ids)),
+                "code_size": int(self.codec.code_size),
+                "built_at": datetime.utcnow().isoformat(),
+            }
+            tmp_path = os.path.join(path, "manifest.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, os.path.join(path, "manifest.json"))
+            self.path = path
+
+    @classmethod
+    def load(cls, path: str) -> "QuantizedIndex":
+        """Open an index; codes are read into memory, full vectors memory-mapped."""
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != QUANTIZED_FORMAT_VERSION:
+            raise ValueError(f"Unsupported quantized index format in {path}; rebuild it.")
+
+        arrays = {name: np.load(os.path.join(path, f"codec_{name}.npy"))
+                  for name in manifest["codec_arrays"]}
+        codec = CODECS[manifest["codec"]].from_arrays(arrays, manifest["dim"])
+        return cls(
+            codec,
+            np.load(os.path.join(path, "codes.npy")),
+            np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "ids.npy")),
+            path=path,
+            kind=manifest["kind"],
+            journal_seq=manifest["journal_seq"],
+        )
+
+
+def quantized_dir(codec: str, kind: str = "registered") -> str:
+    return os.path.join(INDEX_ROOT, f"quantized-{codec}" if kind == "registered"
+                        else f"quantized-{codec}-{kind}")
+
+
+# ---------------------------------------------------------------------------
+# Journal replay & process-wide access
+# ---------------------------------------------------------------------------
+def sync_quantized_index(index: QuantizedIndex) -> int:
+    """Bring `index` up to date with the IndexJournal table (see ann_index.sync_index)."""
+    from feature_loader import LOADERS, backend_cwd, import_db_queries
+
+    db_queries = import_db_queries()
+    changed = 0
+    while True:
+        with backend_cwd():
+            rows = db_queries.fetch_index_journal(
+                index.kind, after_seq=index.journal_seq, limit=JOURNAL_BATCH_SIZE
+            )
+        if not rows:
+            return changed
+        changed += index.apply_journal(rows, LOADERS[index.kind])
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_quantized_index(codec: str = "pq", kind: str = "registered",
+                        sync: bool = True) -> QuantizedIndex:
+    """Cached index for `codec`, reloaded when its manifest changes; synced by default."""
+    path = quantized_dir(codec, kind)
+    mtime = os.path.getmtime(os.path.join(path, "manifest.json"))
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, QuantizedIndex.load(path))
+            _cache[path] = cached
+        index = cached[1]
+    if sync:
+        sync_quantized_index(index)
+    return index
+
+
+def build_quantized_index(codec: str = "pq", kind: str = "registered", **params) -> dict:
+    """Build a quantized index over the NF vectors of `kind` and persist it."""
+    from feature_loader import LOADERS, backend_cwd, import_db_queries
+
+    db_queries = import_db_queries()
+    with backend_cwd():
+        journal_seq = db_queries.get_index_journal_head()
+
+    ids, vectors = LOADERS[kind](status="NF")
+    if len(ids) == 0:
+        return {"status": False, "message": f"No {kind} vectors to index."}
+
+    index = QuantizedIndex.build(ids, vectors, codec=codec, kind=kind, **params)
+    index.journal_seq = journal_seq
+    index.save(quantized_dir(codec, kind))
+    full_bytes = vectors.nbytes
+    return {
+        "status": True,
+        "message": f"{codec} index built: {len(index):,} {kind} vectors, "
+                   f"{index.memory_bytes / 2**20:.1f} MB resident vs. "
+                   f"{full_bytes / 2**20:.1f} MB float32 → {quantized_dir(codec, kind)}",
+    }
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a quantized vector index.")
+    parser.add_argument("--codec", choices=list(CODECS), default="pq")
+    parser.add_argument("--kind", choices=["registered", "public"], default="registered")
+    parser.add_argument("--subvectors", type=int, default=DEFAULT_PQ_SUBVECTORS,
+                        help="PQ sub-vectors per vector (bytes per code).")
+    args = parser.parse_args()
+
+    print(f"🔄 Building {args.codec} index over {args.kind} vectors…\n")
+    print(f"📋 Result: {build_quantized_index(args.codec, args.kind, n_subvectors=args.subvectors)}")
@@ -0,0 +1,218 @@
+"""
+=============================================================================
+  Week 3 — ML Engineer
+  File: regions.py
+  Purpose: Map free-text locations, ages and officers to search shards.
+=============================================================================
+
+The sharded index (sharded_index.py) partitions registered cases by region
+and age band. Neither is a structured field: `RegisteredCases.last_seen` /
+`address` and `PublicSubmissions.location` are free text ("Railway Station,
+Delhi") and `age` is a short string. This module resolves them:
+
+  - region    — the state / UT of the last place name found in the text
+                (PLACES aliases, word-boundary match), else the officer's
+                jurisdiction (JURISDICTIONS), else UNKNOWN_REGION;
+  - age band  — one of AGE_BANDS, or UNKNOWN_BAND if the age does not parse;
+  - nearness  — other regions ordered by great-circle distance between
+                their centres, for nearest-region-first search.
+
+The built-in gazetteer covers the larger states and cities. Deployments can
+extend it, and map officer usernames to jurisdictions, with a `regions.json`
+next to this file:
+
+    {"regions": {"Ladakh": [34.15, 77.58]},
+     "places": {"leh": "Ladakh"},
+     "jurisdictions": {"officer_017": "Maharashtra"}}
+
+Usage:
+    from regions import case_region, resolve_region, age_band, regions_by_distance
+    resolve_region("Bus Stand, Gurugram")   # 'Haryana'
+=============================================================================
+"""
+
+import os
+import re
+import json
+import math
+
+
+REGIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regions.json")
+
+UNKNOWN_REGION = "unknown"
+UNKNOWN_BAND = "unknown"
+
+# (label, lowest age, highest age) — children, teenagers, adults, seniors
+AGE_BANDS = (
+    ("0-12", 0, 12),
+    ("13-17", 13, 17),
+    ("18-40", 18, 40),
+    ("41-60", 41, 60),
+    ("61+", 61, 200),
+)
+
+# Region → approximate centre (latitude, longitude)
+REGION_CENTERS = {
+    "Delhi": (28.61, 77.21),
+    "Uttar Pradesh": (26.85, 80.95),
+    "Haryana": (29.06, 76.09),
+    "Punjab": (31.15, 75.34),
+    "Chandigarh": (30.73, 76.78),
+    "Himachal Pradesh": (31.10, 77.17),
+    "Jammu and Kashmir": (33.78, 76.58),
+    "Uttarakhand": (30.07, 79.02),
+    "Rajasthan": (26.91, 75.79),
+    "Gujarat": (22.26, 71.19),
+    "Maharashtra": (19.75, 75.71),
+    "Goa": (15.30, 74.12),
+    "Karnataka": (15.32, 75.71),
+    "Kerala": (10.85, 76.27),
+    "Tamil Nadu": (11.13, 78.66),
+    "Andhra Pradesh": (15.91, 79.74),
+    "Telangana": (18.11, 79.02),
+    "Madhya Pradesh": (22.97, 78.66),
+    "Chhattisgarh": (21.28, 81.87),
+    "Odisha": (20.95, 85.10),
+    "Jharkhand": (23.61, 85.28),
+    "Bihar": (25.10, 85.31),
+    "West Bengal": (22.99, 87.85),
+    "Assam": (26.20, 92.94),
+}
+
+# Place name (lower case) → region; every region name also matches itself
+PLACES = {
+    "new delhi": "Delhi",
+    "lucknow": "Uttar Pradesh", "noida": "Uttar Pradesh", "ghaziabad": "Uttar Pradesh",
+    "kanpur": "Uttar Pradesh", "agra": "Uttar Pradesh", "varanasi": "Uttar Pradesh",
+    "prayagraj": "Uttar Pradesh", "allahabad": "Uttar Pradesh", "meerut": "Uttar Pradesh",
+    "gurugram": "Haryana", "gurgaon": "Haryana", "faridabad": "Haryana",
+    "panipat": "Haryana", "ambala": "Haryana", "rohtak": "Haryana",
+    "amritsar": "Punjab", "ludhiana": "Punjab", "jalandhar": "Punjab", "patiala": "Punjab",
+    "shimla": "Himachal Pradesh", "manali": "Himachal Pradesh",
+    "dharamshala": "Himachal Pradesh",
+    "srinagar": "Jammu and Kashmir", "jammu": "Jammu and Kashmir",
+    "dehradun": "Uttarakhand", "haridwar": "Uttarakhand", "rishikesh": "Uttarakhand",
+    "nainital": "Uttarakhand",
+    "jaipur": "Rajasthan", "jodhpur": "Rajasthan", "udaipur": "Rajasthan",
+    "kota": "Rajasthan", "ajmer": "Rajasthan", "bikaner": "Rajasthan",
+    "ahmedabad": "Gujarat", "surat": "Gujarat", "vadodara": "Gujarat",
+    "rajkot": "Gujarat", "gandhinagar": "Gujarat",
+    "mumbai": "Maharashtra", "bombay": "Maharashtra", "pune": "Maharashtra",
+    "nagpur": "Maharashtra", "nashik": "Maharashtra", "thane": "Maharashtra",
+    "aurangabad": "Maharashtra",
+    "panaji": "Goa", "margao": "Goa",
+    "bangalore": "Karnataka", "bengaluru": "Karnataka", "mysore": "Karnataka",
+    "mysuru": "Karnataka", "mangalore": "Karnataka", "hubli": "Karnataka",
+    "kochi": "Kerala", "cochin": "Kerala", "thiruvananthapuram": "Kerala",
+    "trivandrum": "Kerala", "kozhikode": "Kerala", "calicut": "Kerala",
+    "chennai": "Tamil Nadu", "madras": "Tamil Nadu", "coimbatore": "Tamil Nadu",
+    "madurai": "Tamil Nadu", "trichy": "Tamil Nadu", "salem": "Tamil Nadu",
+    "visakhapatnam": "Andhra Pradesh", "vizag": "Andhra Pradesh",
+    "vijayawada": "Andhra Pradesh", "guntur": "Andhra Pradesh", "tirupati": "Andhra Pradesh",
+    "hyderabad": "Telangana", "secunderabad": "Telangana", "warangal": "Telangana",
+    "bhopal": "Madhya Pradesh", "indore": "Madhya Pradesh", "gwalior": "Madhya Pradesh",
+    "jabalpur": "Madhya Pradesh",
+    "raipur": "Chhattisgarh", "bilaspur": "Chhattisgarh", "bhilai": "Chhattisgarh",
+    "bhubaneswar": "Odisha", "cuttack": "Odisha", "puri": "Odisha",
+    "ranchi": "Jharkhand", "jamshedpur": "Jharkhand", "dhanbad": "Jharkhand",
+    "patna": "Bihar", "gaya": "Bihar", "muzaffarpur": "Bihar", "bhagalpur": "Bihar",
+    "kolkata": "West Bengal", "calcutta": "West Bengal", "howrah": "West Bengal",
+    "siliguri": "West Bengal", "durgapur": "West Bengal",
+    "guwahati": "Assam", "dibrugarh": "Assam", "silchar": "Assam",
+}
+
+# Officer username → region, for cases whose location text does not resolve
+JURISDICTIONS = {}
+
+_pattern = None
+
+
+def load_overrides(path: str = REGIONS_PATH):
+    """Merge `regions.json` (if present) into the built-in tables."""
+    global _pattern
+    if not os.path.isfile(path):
+        return
+    with open(path) as f:
+        overrides = json.load(f)
+    REGION_CENTERS.update({name: tuple(center)
+                           for name, center in overrides.get("regions", {}).items()})
+    PLACES.update({place.lower(): region
+                   for place, region in overrides.get("places", {}).items()})
+    JURISDICTIONS.update(overrides.get("jurisdictions", {}))
+    _pattern = None
+
+
+def _place_pattern():
+    """One alternation over every place and region name, longest first."""
+    global _pattern
+    if _pattern is None:
+        names = set(PLACES) | {region.lower() for region in REGION_CENTERS}
+        alternation = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+        _pattern = re.compile(rf"\b(?:{alternation})\b")
+    return _pattern
+
+
+# ---------------------------------------------------------------------------
+# Resolution
+# ---------------------------------------------------------------------------
+def resolve_region(text) -> str:
+    """Region of the last known place named in `text`, or None."""
+    if not text:
+        return None
+    matches = _place_pattern().findall(str(text).lower())
+    if not matches:
+        return None
+    name = matches[-1]
+    return PLACES.get(name) or next(r for r in REGION_CENTERS if r.lower() == name)
+
+
+def case_region(last_seen=None, address=None, submitted_by=None) -> str:
+    """Region of a registered case: last seen place, else address, else jurisdiction."""
+    return (resolve_region(last_seen) or resolve_region(address)
+            or JURISDICTIONS.get(submitted_by) or UNKNOWN_REGION)
+
+
+def sighting_region(location=None) -> str:
+    """Region of a public submission's location text."""
+    return resolve_region(location) or UNKNOWN_REGION
+
+
+def age_band(age) -> str:
+    """AGE_BANDS label for an age such as '34' or '34 yrs', else UNKNOWN_BAND."""
+    match = re.search(r"\d+", str(age)) if age is not None else None
+    if match:
+        years = int(match.group())
+        for label, low, high in AGE_BANDS:
+            if low <= years <= high:
+                return label
+    return UNKNOWN_BAND
+
+
+# ---------------------------------------------------------------------------
+# Nearness
+# ---------------------------------------------------------------------------
+def _km(a, b) -> float:
+    """Great-circle distance between two (lat, lon) points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def regions_by_distance(region: str, candidates=None) -> list:
+    """
+    `candidates` (default: every known region) ordered nearest-first from
+    `region`, starting with `region` itself. Regions without a centre
+    (including UNKNOWN_REGION) keep their order at the end.
+    """
+    candidates = list(REGION_CENTERS if candidates is None else candidates)
+    center = REGION_CENTERS.get(region)
+    if center is None:
+        return sorted(candidates, key=lambda r: r != region)
+    return sorted(candidates, key=lambda r: (
+        r != region,
+        _km(center, REGION_CENTERS[r]) if r in REGION_CENTERS else math.inf,
+    ))
+
+
+load_overrides()
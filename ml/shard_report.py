@@ -0,0 +1,244 @@
+"""
+=============================================================================
+  Week 3 — ML Engineer
+  File: shard_report.py
+  Purpose: Recall / cost report for the region-sharded index.
+=============================================================================
+
+Builds a ShardedIndex (sharded_index.py) and sweeps the number of regions
+searched before the global fallback. For each setting it reports:
+  - recall@1 / recall@k against the exact global scan,
+  - accuracy@1 against the known correct case,
+  - fraction of submissions that fell back to the whole corpus,
+  - average fraction of the corpus scanned per submission,
+  - batched search time (ms per query) and speed-up over the global scan,
+  - single-submission latency p50 / p95 (ms), the incremental-run case.
+
+Batches of thousands of submissions gain little: one global BLAS pass reads
+the corpus once for the whole batch, while every region job reads its
+shards again for a few dozen queries. Single submissions scan only their
+shards, so their latency follows the shard size.
+
+The default corpus is synthetic: cases spread over the regions in
+regions.py (a few with no usable location), faces as in
+backend/synthetic_data.py, and sightings reported in the case's own region,
+a neighbouring one or anywhere, plus strangers (every stranger ends in the
+global fallback, which is the price of never missing a travelled case).
+`--source db` uses the NF registered cases and public submissions; pass
+the `--truth` file from backend/synthetic_data.py to also score accuracy.
+
+Usage:
+    python shard_report.py --n 100000 --queries 2000
+    python shard_report.py --strangers 0.5 --fallback-distance 1.5
+    python shard_report.py --source db --truth ../backend/truth.json --json shards.json
+=============================================================================
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+
+from knn_search import nearest_neighbors
+from regions import AGE_BANDS, REGION_CENTERS, UNKNOWN_REGION, regions_by_distance
+from sharded_index import FALLBACK_DISTANCE, SEARCH_REGIONS, ShardedIndex
+
+DIM = 1404
+DEFAULT_SEARCH_REGIONS = (1, 2, 3, 5, 8)
+# Same spreads as backend/synthetic_data.py (PERSON_SPREAD, DEFAULT_NOISE)
+PERSON_SPREAD = 0.05
+SIGHTING_NOISE = 0.01
+# Where sightings are reported: own region, one of the 3 nearest, anywhere, unknown
+SIGHTING_PLACES = {"own": 0.80, "near": 0.10, "anywhere": 0.05, "unknown": 0.05}
+
+
+def synthetic_corpus(n: int, n_queries: int, strangers: float = 0.2,
+                     unknown_cases: float = 0.02, seed: int = 0):
+    """Cases with regions / age bands; sightings (and strangers) with regions."""
+    rng = np.random.default_rng(seed)
+    names = list(REGION_CENTERS)
+    # Uneven region sizes, like real case loads
+    weights = rng.lognormal(0, 0.6, len(names))
+    regions = rng.choice(names, n, p=weights / weights.sum()).astype(object)
+    regions[rng.random(n) < unknown_cases] = UNKNOWN_REGION
+    bands = rng.choice([label for label, _, _ in AGE_BANDS], n).astype(object)
+
+    mean_face = rng.random(DIM, dtype=np.float32)
+    base = mean_face + rng.normal(0, PERSON_SPREAD, (n, DIM)).astype(np.float32)
+
+    n_strangers = int(round(strangers * n_queries))
+    truth = rng.choice(n, n_queries, replace=False)
+    queries = base[truth] + rng.normal(0, SIGHTING_NOISE, (n_queries, DIM)).astype(np.float32)
+    queries[:n_strangers] = mean_face + rng.normal(
+        0, PERSON_SPREAD, (n_strangers, DIM)).astype(np.float32)
+    truth[:n_strangers] = -1
+
+    places = rng.choice(list(SIGHTING_PLACES), n_queries, p=list(SIGHTING_PLACES.values()))
+    query_regions = []
+    for position, place in zip(truth, places):
+        home = regions[position] if position >= 0 else rng.choice(names)
+        if place == "unknown":
+            query_regions.append(UNKNOWN_REGION)
+        elif place == "anywhere" or home == UNKNOWN_REGION:
+            query_regions.append(rng.choice(names))
+        elif place == "near":
+            query_regions.append(rng.choice(regions_by_distance(home)[1:4]))
+        else:
+            query_regions.append(home)
+    return base, regions, bands, queries, query_regions, truth
+
+
+def db_corpus(truth_path: str = None):
+    """NF cases (sharded from the DB) and submissions with their regions."""
+    from feature_loader import load_public_vectors, load_registered_vectors
+    from sharded_index import shard_cases, submission_regions
+
+    ids, base = load_registered_vectors(status="NF")
+    public_ids, queries = load_public_vectors(status="NF")
+    index = shard_cases(ids, base)
+    truth = None
+    if truth_path:
+        with open(truth_path) as f:
+            mapping = json.load(f)
+        position = {case_id: i for i, case_id in enumerate(index.ids)}
+        truth = np.array([position.get(mapping.get(p), -1) for p in public_ids])
+    return index, queries, submission_regions(public_ids), truth
+
+
+def _recall(approx, exact, k: int) -> float:
+    hits = sum(len(set(a[:k]) & set(e[:k])) for a, e in zip(approx, exact))
+    return hits / max(1, exact[:, :k].size)
+
+
+def _accuracy(indices, truth):
+    """Top-1 accuracy over the queries that have a correct case."""
+    if truth is None:
+        return None
+    known = truth >= 0
+    return float((indices[known, 0] == truth[known]).mean()) if known.any() else None
+
+
+def _latencies(search, queries, regions, samples: int) -> list:
+    """Milliseconds per single-submission call, on an evenly spread sample."""
+    times = []
+    picked = np.linspace(0, len(queries) - 1, min(samples, len(queries))).astype(int)
+    for query, region in zip(queries[picked], [regions[i] for i in picked]):
+        start = time.perf_counter()
+        search(query[None], [region])
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def run_report(index: ShardedIndex, queries, query_regions, truth=None, k: int = 10,
+               search_regions=DEFAULT_SEARCH_REGIONS,
+               fallback_distance: float = FALLBACK_DISTANCE,
+               latency_samples: int = 200) -> dict:
+    """Sweep search_regions and return the report as a dict."""
+    start = time.perf_counter()
+    _, exact = nearest_neighbors(queries, index.features, k=k, base_sq_norms=index.sq_norms)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    exact_single = _latencies(
+        lambda q, _: nearest_neighbors(q, index.features, k=k, base_sq_norms=index.sq_norms),
+        queries, query_regions, latency_samples,
+    )
+
+    rows = []
+    for count in search_regions:
+        start = time.perf_counter()
+        result = index.search(queries, query_regions, k=k, search_regions=count,
+                              fallback_distance=fallback_distance)
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        single = _latencies(
+            lambda q, r: index.search(q, r, k=k, search_regions=count,
+                                      fallback_distance=fallback_distance),
+            queries, query_regions, latency_samples,
+        )
+        rows.append({
+            "search_regions": count,
+            "recall@1": _recall(result["indices"], exact, 1),
+            f"recall@{k}": _recall(result["indices"], exact, k),
+            "accuracy@1": _accuracy(result["indices"], truth),
+            "fallback_rate": float(result["fallback"].mean()),
+            "scanned_fraction": float(result["scanned"].mean() / len(index)),
+            "batch_ms_per_query": ms,
+            "speedup": exact_ms / ms,
+            "single_p50_ms": float(np.percentile(single, 50)),
+            "single_p95_ms": float(np.percentile(single, 95)),
+        })
+
+    sizes = sorted((hi - lo for lo, hi in index.shards.values()), reverse=True)
+    return {
+        "corpus_size": len(index),
+        "queries": len(queries),
+        "k": k,
+        "shards": len(index.shards),
+        "regions": len(index.region_slices),
+        "largest_shard": sizes[0],
+        "median_shard": sizes[len(sizes) // 2],
+        "fallback_distance": fallback_distance,
+        "exact": {"accuracy@1": _accuracy(exact, truth), "batch_ms_per_query": exact_ms,
+                  "single_p50_ms": float(np.percentile(exact_single, 50)),
+                  "single_p95_ms": float(np.percentile(exact_single, 95))},
+        "sweep": rows,
+    }
+
+
+def print_report(report: dict):
+    k, exact = report["k"], report["exact"]
+    fmt_acc = lambda value: f"{value:>7.3f}" if value is not None else f"{'—':>7}"  # noqa: E731
+    print("=" * 96)
+    print("  Region-Sharded Search Report")
+    print("=" * 96)
+    print(f"   Corpus size        : {report['corpus_size']:,}")
+    print(f"   Queries            : {report['queries']:,}")
+    print(f"   Shards / regions   : {report['shards']} / {report['regions']} "
+          f"(largest {report['largest_shard']:,}, median {report['median_shard']:,} cases)")
+    print(f"   Fallback distance  : {report['fallback_distance']}")
+    print()
+    print(f"   {'regions':>7} {'R@1':>7} {f'R@{k}':>7} {'Acc@1':>7} {'fallback':>9} "
+          f"{'scanned':>8} {'ms/q':>8} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"   {'all':>7} {1:>7.3f} {1:>7.3f} {fmt_acc(exact['accuracy@1'])} {'—':>9} "
+          f"{1:>8.1%} {exact['batch_ms_per_query']:>8.3f} {1:>7.1f}x "
+          f"{exact['single_p50_ms']:>8.3f} {exact['single_p95_ms']:>8.3f}")
+    for row in report["sweep"]:
+        print(
+            f"   {row['search_regions']:>7} {row['recall@1']:>7.3f} {row[f'recall@{k}']:>7.3f} "
+            f"{fmt_acc(row['accuracy@1'])} {row['fallback_rate']:>9.1%} "
+            f"{row['scanned_fraction']:>8.1%} {row['batch_ms_per_query']:>8.3f} "
+            f"{row['speedup']:>7.1f}x {row['single_p50_ms']:>8.3f} {row['single_p95_ms']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Region-sharded search report.")
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--n", type=int, default=100_000, help="Synthetic corpus size.")
+    parser.add_argument("--queries", type=int, default=2_000, help="Synthetic query count.")
+    parser.add_argument("--strangers", type=float, default=0.2,
+                        help="Synthetic fraction of submissions matching no case.")
+    parser.add_argument("--truth", default=None, help="Ground truth JSON (--source db).")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--search-regions", type=int, nargs="+",
+                        default=sorted(set(DEFAULT_SEARCH_REGIONS) | {SEARCH_REGIONS}))
+    parser.add_argument("--fallback-distance", type=float, default=FALLBACK_DISTANCE)
+    parser.add_argument("--json", default=None, help="Also write the report here.")
+    args = parser.parse_args()
+
+    if args.source == "db":
+        index, queries, query_regions, truth = db_corpus(args.truth)
+    else:
+        base, regions, bands, queries, query_regions, truth = synthetic_corpus(
+            args.n, args.queries, args.strangers)
+        index = ShardedIndex(np.arange(len(base)), base, regions, bands)
+        # Truth refers to corpus rows; the index stores them in shard order
+        truth = np.where(truth >= 0, np.argsort(index.ids)[np.maximum(truth, 0)], -1)
+
+    report = run_report(index, queries, query_regions, truth, k=args.k,
+                        search_regions=args.search_regions,
+                        fallback_distance=args.fallback_distance)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
@@ -0,0 +1,565 @@
+"""
+=============================================================================
+  Week 3 — ML Engineer
+  File: sharded_index.py
+  Purpose: Exact search partitioned by region and age band, scheduled per
+           shard, with a fallback to the whole corpus.
+=============================================================================
+
+A sighting in Pune is far more likely to be a case last seen in
+Maharashtra than one from Assam, yet the exact matcher scans the whole
+country for every submission. `ShardedIndex` sorts the registered cases
+into (region, age band) shards (regions.py resolves the free-text
+`last_seen` / `address`, the officer's jurisdiction and `age`) and
+searches each submission against:
+
+  1. every age band of its own region and of the next nearest regions
+     (SEARCH_REGIONS in total, by distance between region centres), plus
+     the cases whose region is unknown;
+  2. the whole corpus, when its region is unknown, when those shards hold
+     fewer than k cases, or when the best distance found is above
+     FALLBACK_DISTANCE (the person may have travelled). All such
+     submissions share one batched pass.
+
+Submissions carry no age, so every age band of a region is searched; the
+bands keep shards small enough to schedule and report on separately.
+
+`search()` (and `query()` on top of it) is the scheduler: submissions are
+grouped into one job per region, jobs are ordered by estimated cost
+(queries × rows scanned) and run independently, on `workers` threads
+(NumPy releases the GIL during BLAS). A job's cost grows with the size of
+its region's shards, not with the corpus. Distances are exact; a
+submission is only mis-ranked when its shards hold a case within
+FALLBACK_DISTANCE while its true nearest case sits in a region that was not
+searched (`shard_report.py` measures this). It is not a batch speed-up:
+about a third of a synthetic batch falls back to the whole corpus, and a
+batched run took 0.9-1.2x the exact scan's time; only single submissions
+got faster.
+
+Persistence and incremental updates
+-----------------------------------
+Sorting the cases into shards needs every case's text attributes, so the
+layout is built once (`python sharded_index.py`) and kept under
+index/sharded/ with the other index artifacts, then maintained from the
+IndexJournal like the IVF index (ann_index.py): `sync_sharded_index()`
+resolves the region of each newly registered case into a small delta
+segment that every job covering that region scans, and found cases become
+tombstones. `save()` folds both into a new layout (`--compact`).
+
+On-disk layout (index/sharded/):
+    manifest.json      — format version, journal seq, counts
+    ids.npy            — (n,) record ids, grouped by shard
+    features.npy       — (n, d) float32 raw vectors, same order
+    sq_norms.npy       — (n,) squared norms of `features`
+    shard_regions.npy  — (s,) region of each shard
+    shard_bands.npy    — (s,) age band of each shard
+    shard_offsets.npy  — (s + 1,) start of each shard in `features`
+
+Usage:
+    python sharded_index.py            # build index/sharded/
+    python sharded_index.py --compact  # fold journal updates into the layout
+
+    from sharded_index import get_sharded_index, submission_regions
+    index = get_sharded_index()
+    ids, distances = index.query(features, submission_regions(public_ids), k=5)
+=============================================================================
+"""
+
+import os
+import json
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+from ann_index import INDEX_ROOT, JOURNAL_BATCH_SIZE, SYNC_LOAD_BATCH_SIZE
+from feature_loader import load_attributes, metrics
+from knn_search import DEFAULT_CHUNK_SIZE, nearest_neighbors, squared_norms
+from parallel_search import merge_top_k
+from regions import UNKNOWN_REGION, age_band, case_region, regions_by_distance, sighting_region
+
+
+SHARDED_FORMAT_VERSION = 1
+SHARDED_DIR = os.path.join(INDEX_ROOT, "sharded")
+
+# Regions searched per submission before the global fallback (own + nearest)
+SEARCH_REGIONS = 3
+# Best distance (raw landmark units) above which the search falls back to the
+# whole corpus (baseline_match rejects normalized vectors for this reason);
+# None = only fall back for unknown regions / too few cases
+FALLBACK_DISTANCE = 1.0
+# Threads running shard jobs
+SHARD_WORKERS = 1
+
+
+class ShardedIndex:
+    """
+    Registered vectors sorted into contiguous (region, age band) shards,
+    plus a delta segment and tombstones replayed from the IndexJournal.
+
+    Row positions [0, n_main) address the shard-grouped arrays and
+    [n_main, n_main + n_delta) the delta segment; `deleted` covers both.
+    """
+
+    def __init__(self, ids, features, regions, bands, path: str = None,
+                 kind: str = "registered", journal_seq: int = 0):
+        keys = np.array([f"{region}|{band}" for region, band in zip(regions, bands)])
+        unique, inverse = np.unique(keys, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=len(unique)))])
+        features = np.ascontiguousarray(np.asarray(features, dtype=np.float32)[order])
+        shard_keys = [key.split("|", 1) for key in unique]
+
+        self._set_layout(np.asarray(ids, dtype=object)[order], features,
+                         squared_norms(features), shard_keys, offsets)
+        self.path = path
+        self.kind = kind
+        self.journal_seq = journal_seq
+        self._lock = threading.RLock()
+
+    def _set_layout(self, ids, features, sq_norms, shard_keys, offsets):
+        """Install shard-grouped arrays and clear the delta segment."""
+        self.ids = ids
+        self.features = features
+        self.sq_norms = sq_norms
+        self.shards = {}
+        self.region_slices = defaultdict(list)
+        for (region, band), lo, hi in zip(shard_keys, offsets[:-1], offsets[1:]):
+            self.shards[(region, band)] = (int(lo), int(hi))
+            self.region_slices[region].append((int(lo), int(hi)))
+
+        self.delta_ids = np.empty(0, dtype=object)
+        self.delta_features = np.empty((0, features.shape[1]), dtype=np.float32)
+        self.delta_sq_norms = np.empty(0, dtype=np.float32)
+        self.delta_regions = np.empty(0, dtype=object)
+        self.delta_bands = np.empty(0, dtype=object)
+        self.deleted = np.zeros(len(ids), dtype=bool)
+
+    @property
+    def n_main(self) -> int:
+        return len(self.ids)
+
+    def __len__(self) -> int:
+        """Number of live (non-tombstoned) cases."""
+        return self.n_main + len(self.delta_ids) - int(self.deleted.sum())
+
+    def region_size(self, region: str) -> int:
+        return sum(hi - lo for lo, hi in self.region_slices.get(region, ()))
+
+    # -- incremental updates ------------------------------------------------
+    def apply_journal(self, rows, loader, locate=None) -> int:
+        """
+        Apply (seq, op, record_id) journal rows: tombstone removals, shard
+        additions into the delta segment.
+
+        `loader(status=None, ids=…)` fetches the vectors to add and
+        `locate(ids)` their (regions, bands) (default: case_shards).
+        """
+        locate = locate or case_shards
+        pending, removed = {}, set()
+        for _, op, record_id in rows:
+            if op == "add":
+                pending[record_id] = True
+            else:
+                pending.pop(record_id, None)
+                removed.add(record_id)
+
+        with self._lock:
+            all_ids = np.concatenate([self.ids, self.delta_ids])
+            live = set(all_ids[~self.deleted])
+            dead = np.isin(all_ids, list(removed)) & ~self.deleted
+            deleted = self.deleted | dead
+            changed = int(dead.sum())
+
+            add_ids = [record_id for record_id in pending if record_id not in live - removed]
+            for start in range(0, len(add_ids), SYNC_LOAD_BATCH_SIZE):
+                ids, vectors = loader(status=None, ids=add_ids[start:start + SYNC_LOAD_BATCH_SIZE])
+                if len(ids):
+                    regions, bands = locate(ids)
+                    vectors = np.asarray(vectors, dtype=np.float32)
+                    self.delta_ids = np.concatenate([self.delta_ids, np.asarray(ids, dtype=object)])
+                    self.delta_features = np.concatenate([self.delta_features, vectors])
+                    self.delta_sq_norms = np.concatenate([self.delta_sq_norms,
+                                                          squared_norms(vectors)])
+                    self.delta_regions = np.concatenate([self.delta_regions,
+                                                         np.asarray(regions, dtype=object)])
+                    self.delta_bands = np.concatenate([self.delta_bands,
+                                                       np.asarray(bands, dtype=object)])
+                    deleted = np.concatenate([deleted, np.zeros(len(ids), dtype=bool)])
+                    changed += len(ids)
+            self.deleted = deleted
+            self.journal_seq = rows[-1][0]
+        return changed
+
+    # -- planning -----------------------------------------------------------
+    @staticmethod
+    def _coalesce(slices) -> list:
+        """Merge touching (lo, hi) slices, so a region's bands are one BLAS call."""
+        merged = []
+        for lo, hi in sorted(slices):
+            if merged and merged[-1][1] == lo:
+                merged[-1] = (merged[-1][0], hi)
+            else:
+                merged.append((lo, hi))
+        return merged
+
+    def plan_regions(self, region: str, search_regions: int = SEARCH_REGIONS) -> list:
+        """Regions searched for a submission from `region`; [] = global."""
+        known = set(self.region_slices) | set(self.delta_regions)
+        if region == UNKNOWN_REGION or region not in known:
+            return []
+        known.discard(UNKNOWN_REGION)
+        return regions_by_distance(region, sorted(known))[:search_regions] + [UNKNOWN_REGION]
+
+    def plan(self, region: str, search_regions: int = SEARCH_REGIONS) -> list:
+        """(lo, hi) slices of the main segment searched for `region`; [] = global."""
+        return self._coalesce(
+            s for r in self.plan_regions(region, search_regions)
+            for s in self.region_slices.get(r, ())
+        )
+
+    def plan_jobs(self, regions, search_regions: int = SEARCH_REGIONS) -> list:
+        """
+        One job per distinct submission region, most expensive first.
+
+        Returns
+        -------
+        list of dicts with 'region', 'rows' (query positions), 'regions'
+        (regions searched), 'slices', 'delta' (delta positions searched)
+        and 'cost' (queries × rows scanned).
+        """
+        rows_by_region = defaultdict(list)
+        for i, region in enumerate(regions):
+            rows_by_region[region].append(i)
+
+        live_delta = ~self.deleted[self.n_main:]
+        jobs = []
+        for region, rows in rows_by_region.items():
+            searched = self.plan_regions(region, search_regions)
+            slices = self._coalesce(s for r in searched for s in self.region_slices.get(r, ()))
+            delta = np.flatnonzero(np.isin(self.delta_regions, searched) & live_delta)
+            scanned = (sum(hi - lo for lo, hi in slices) + len(delta)) if searched else len(self)
+            jobs.append({"region": region, "rows": np.asarray(rows), "regions": searched,
+                         "slices": slices, "delta": delta, "cost": len(rows) * scanned})
+        return sorted(jobs, key=lambda job: job["cost"], reverse=True)
+
+    # -- search -------------------------------------------------------------
+    def _search_slices(self, queries, slices, delta, k: int, chunk_size: int):
+        """
+        Top-k over the given main slices and delta positions: one search per
+        slice (tombstones masked), one over the delta rows, then one merge.
+        """
+        parts_d, parts_i = [], []
+        for lo, hi in slices:
+            dead = self.deleted[lo:hi]
+            d, i = nearest_neighbors(queries, self.features[lo:hi], k=k, chunk_size=chunk_size,
+                                     base_sq_norms=self.sq_norms[lo:hi],
+                                     exclude=dead if dead.any() else None)
+            parts_d.append(d)
+            parts_i.append(i + lo)
+        if len(delta):
+            d, i = nearest_neighbors(queries, self.delta_features[delta], k=k,
+                                     chunk_size=chunk_size,
+                                     base_sq_norms=self.delta_sq_norms[delta])
+            parts_d.append(d)
+            parts_i.append(delta[i] + self.n_main)
+        return merge_top_k(np.concatenate(parts_d, axis=1), np.concatenate(parts_i, axis=1), k)
+
+    def _live_rows(self, slices, delta) -> int:
+        return sum(hi - lo - int(self.deleted[lo:hi].sum()) for lo, hi in slices) + len(delta)
+
+    def _run_job(self, queries, job: dict, k: int, fallback_distance: float,
+                 chunk_size: int) -> dict:
+        """Search one region's submissions in its shards; flag those needing the fallback."""
+        rows = job["rows"]
+        distances = np.empty((len(rows), k))
+        indices = np.empty((len(rows), k), dtype=np.int64)
+        fallback = np.ones(len(rows), dtype=bool)
+        shard_rows = sum(hi - lo for lo, hi in job["slices"]) + len(job["delta"])
+
+        # Shards holding fewer than k live cases cannot answer on their own
+        if job["regions"] and self._live_rows(job["slices"], job["delta"]) >= k:
+            with metrics.span("traceai_stage_seconds", stage="search", method="shard"):
+                distances, indices = self._search_slices(queries[rows], job["slices"],
+                                                         job["delta"], k, chunk_size)
+            fallback = (np.zeros(len(rows), dtype=bool) if fallback_distance is None
+                        else distances[:, 0] > fallback_distance)
+        else:
+            shard_rows = 0
+        return {"rows": rows, "distances": distances, "indices": indices,
+                "scanned": np.full(len(rows), shard_rows, dtype=np.int64),
+                "fallback": fallback}
+
+    def search(self, vectors, regions, k: int = 1, workers: int = SHARD_WORKERS,
+               search_regions: int = SEARCH_REGIONS,
+               fallback_distance: float = FALLBACK_DISTANCE,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+        """
+        Run one job per submission region (see plan_jobs), then one batched
+        pass over the whole corpus for every submission that needs the
+        fallback (a single large batch reads the corpus once, many small
+        per-region ones would each read it again).
+
+        Returns
+        -------
+        dict with 'distances' (m, k) float64, 'indices' (m, k) positions into
+        the main ids followed by the delta ids (see query), 'scanned' (m,)
+        rows scored per query and 'fallback' (m,) whether the query fell
+        back to the whole corpus.
+        """
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            m, k = len(queries), min(k, len(self))
+            result = {"distances": np.empty((m, k)),
+                      "indices": np.empty((m, k), dtype=np.int64),
+                      "scanned": np.zeros(m, dtype=np.int64),
+                      "fallback": np.zeros(m, dtype=bool)}
+            if m == 0 or k == 0:
+                return result
+
+            jobs = self.plan_jobs(regions, search_regions)
+            run = partial(self._run_job, queries, k=k, fallback_distance=fallback_distance,
+                          chunk_size=chunk_size)
+            if workers > 1 and len(jobs) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    done = list(pool.map(run, jobs))
+            else:
+                done = [run(job) for job in jobs]
+            for job in done:
+                for name in ("distances", "indices", "scanned", "fallback"):
+                    result[name][job["rows"]] = job[name]
+
+            fallback = result["fallback"]
+            if fallback.any():
+                with metrics.span("traceai_stage_seconds", stage="search",
+                                  method="shard_fallback"):
+                    slices = [(0, self.n_main)] if self.n_main else []
+                    delta = np.flatnonzero(~self.deleted[self.n_main:])
+                    result["distances"][fallback], result["indices"][fallback] = (
+                        self._search_slices(queries[fallback], slices, delta, k, chunk_size)
+                    )
+                result["scanned"][fallback] += self.n_main + len(delta)
+        metrics.inc("traceai_pairs_scored_total", int(result["scanned"].sum()), method="shard")
+        metrics.inc("traceai_shard_fallbacks_total", int(fallback.sum()))
+        return result
+
+    def query(self, vectors, regions, k: int = 1, workers: int = SHARD_WORKERS,
+              search_regions: int = SEARCH_REGIONS,
+              fallback_distance: float = FALLBACK_DISTANCE):
+        """
+        k nearest registered cases per submission, searched shard by shard.
+
+        Returns
+        -------
+        ids : np.ndarray       — (m, k) record ids, nearest first
+        distances : np.ndarray — (m, k) float64 Euclidean distances
+        """
+        with self._lock:
+            result = self.search(vectors, regions, k, workers, search_regions,
+                                 fallback_distance)
+            indices = result["indices"]
+            main = indices < self.n_main
+            ids = np.empty(indices.shape, dtype=object)
+            ids[main] = self.ids[indices[main]]
+            ids[~main] = self.delta_ids[indices[~main] - self.n_main]
+        return ids, result["distances"]
+
+    # -- persistence --------------------------------------------------------
+    def save(self, path: str = SHARDED_DIR):
+        """
+        Fold the delta segment into the shards, drop tombstoned rows and write
+        the layout to `path` (manifest last, so readers never see a partial
+        index).
+        """
+        with self._lock:
+            if len(self.delta_ids) or self.deleted.any():
+                live = ~self.deleted
+                spans = [(key, hi - lo) for key, (lo, hi) in self.shards.items()]
+                regions = np.repeat(np.array([key[0] for key, _ in spans], dtype=object),
+                                    [size for _, size in spans])
+                bands = np.repeat(np.array([key[1] for key, _ in spans], dtype=object),
+                                  [size for _, size in spans])
+                rebuilt = ShardedIndex(
+                    np.concatenate([self.ids, self.delta_ids])[live],
+                    np.concatenate([np.asarray(self.features), self.delta_features])[live],
+                    np.concatenate([regions, self.delta_regions])[live],
+                    np.concatenate([bands, self.delta_bands])[live],
+                )
+                shard_keys = list(rebuilt.shards)
+                offsets = [lo for lo, _ in rebuilt.shards.values()] + [len(rebuilt.ids)]
+                self._set_layout(rebuilt.ids, rebuilt.features, rebuilt.sq_norms,
+                                 shard_keys, offsets)
+
+            os.makedirs(path, exist_ok=True)
+            arrays = {
+                "ids": np.asarray(self.ids, dtype=str),
+                "features": np.asarray(self.features),
+                "sq_norms": np.asarray(self.sq_norms),
+                "shard_regions": np.array([region for region, _ in self.shards], dtype=str),
+                "shard_bands": np.array([band for _, band in self.shards], dtype=str),
+                "shard_offsets": np.array([lo for lo, _ in self.shards.values()]
+                                          + [self.n_main], dtype=np.int64),
+            }
+            for name, array in arrays.items():
+                tmp_path = os.path.join(path, f"{name}.tmp.npy")
+                np.save(tmp_path, array)
+                os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+
+            manifest = {
+                "format_version": SHARDED_FORMAT_VERSION,
+                "kind": self.kind,
+                "journal_seq": self.journal_seq,
+                "dim": int(self.features.shape[1]),
+                "count": self.n_main,
+                "shards": len(self.shards),
+                "built_at": datetime.utcnow().isoformat(),
+            }
+            tmp_path = os.path.join(path, "manifest.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, os.path.join(path, "manifest.json"))
+            self.path = path
+
+    @classmethod
+    def load(cls, path: str = SHARDED_DIR) -> "ShardedIndex":
+        """Open a saved layout; the vectors are memory-mapped."""
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != SHARDED_FORMAT_VERSION:
+            raise ValueError(f"Unsupported sharded index format in {path}; "
+                             f"rebuild it with `python sharded_index.py`.")
+
+        index = cls.__new__(cls)
+        index._set_layout(
+            np.load(os.path.join(path, "ids.npy")).astype(object),
+            np.load(os.path.join(path, "features.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "sq_norms.npy")),
+            list(zip(np.load(os.path.join(path, "shard_regions.npy")).tolist(),
+                     np.load(os.path.join(path, "shard_bands.npy")).tolist())),
+            np.load(os.path.join(path, "shard_offsets.npy")),
+        )
+        index.path = path
+        index.kind = manifest["kind"]
+        index.journal_seq = manifest["journal_seq"]
+        index._lock = threading.RLock()
+        return index
+
+
+# ---------------------------------------------------------------------------
+# Building from the database
+# ---------------------------------------------------------------------------
+def case_shards(ids):
+    """(regions, bands) of the given registered cases, aligned with `ids`."""
+    attributes = load_attributes("registered", ids,
+                                 ["last_seen", "address", "submitted_by", "age"])
+    regions = [case_region(last_seen, address, officer) for last_seen, address, officer
+               in zip(attributes["last_seen"], attributes["address"],
+                      attributes["submitted_by"])]
+    bands = [age_band(age) for age in attributes["age"]]
+    return regions, bands
+
+
+def shard_cases(ids, features) -> ShardedIndex:
+    """Shard loaded registered vectors by the region and age band of their cases."""
+    return ShardedIndex(ids, features, *case_shards(ids))
+
+
+def submission_regions(ids) -> list:
+    """Region of each public submission's location, aligned with `ids`."""
+    locations = load_attributes("public", ids, ["location"])["location"]
+    return [sighting_region(location) for location in locations]
+
+
+# ---------------------------------------------------------------------------
+# Journal replay & process-wide access
+# ---------------------------------------------------------------------------
+def sync_sharded_index(index: ShardedIndex) -> int:
+    """Bring `index` up to date with the IndexJournal table (see ann_index.sync_index)."""
+    from feature_loader import LOADERS, backend_cwd, import_db_queries
+
+    db_queries = import_db_queries()
+    changed = 0
+    while True:
+        with backend_cwd():
+            rows = db_queries.fetch_index_journal(
+                index.kind, after_seq=index.journal_seq, limit=JOURNAL_BATCH_SIZE
+            )
+        if not rows:
+            return changed
+        changed += index.apply_journal(rows, LOADERS[index.kind])
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_sharded_index(path: str = SHARDED_DIR, sync: bool = True) -> ShardedIndex:
+    """Cached layout, reloaded when its manifest changes; synced by default."""
+    mtime = os.path.getmtime(os.path.join(path, "manifest.json"))
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, ShardedIndex.load(path))
+            _cache[path] = cached
+        index = cached[1]
+    if sync:
+        sync_sharded_index(index)
+    return index
+
+
+def build_sharded_index(path: str = SHARDED_DIR) -> dict:
+    """Shard the NF registered cases and persist the layout."""
+    from feature_loader import backend_cwd, import_db_queries, load_registered_vectors
+
+    # Read the journal head first: anything newer is replayed on top later
+    db_queries = import_db_queries()
+    with backend_cwd():
+        journal_seq = db_queries.get_index_journal_head()
+
+    ids, features = load_registered_vectors(status="NF")
+    if len(ids) == 0:
+        return {"status": False, "message": "No registered vectors to shard."}
+
+    index = shard_cases(ids, features)
+    index.journal_seq = journal_seq
+    index.save(path)
+    return {"status": True,
+            "message": f"Sharded index built: {len(index):,} cases in {len(index.shards)} "
+                       f"shards over {len(index.region_slices)} regions → {path}"}
+
+
+def compact_sharded_index(path: str = SHARDED_DIR) -> dict:
+    """Sync the layout with the journal and fold the delta into the shards."""
+    index = get_sharded_index(path, sync=True)
+    before = len(index.delta_ids), int(index.deleted.sum())
+    index.save(path)
+    return {"status": True,
+            "message": f"Compacted sharded index: {before[0]:,} added, {before[1]:,} removed "
+                       f"→ {len(index):,} cases in {len(index.shards)} shards"}
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or compact the sharded index.")
+    parser.add_argument("--compact", action="store_true",
+                        help="Fold journal updates into the layout instead of rebuilding.")
+    args = parser.parse_args()
+
+    if args.compact:
+        print("🔄 Compacting sharded index…\n")
+        result = compact_sharded_index()
+    else:
+        print("🔄 Sharding NF registered cases…\n")
+        result = build_sharded_index()
+    print(f"📋 Result: {result}")
+    if result["status"]:
+        index = get_sharded_index(sync=False)
+        print(f"\n   {'region':<20} {'band':<8} {'cases':>8}")
+        for (region, band), (lo, hi) in index.shards.items():
+            print(f"   {region:<20} {band:<8} {hi - lo:>8,}")
@@ -2,88 +2,90 @@
 =============================================================================
   Week 1 — ML Engineer
   File: verify_model.py
-  Purpose: Load a saved classifier.pkl and run sanity checks.
+  Purpose: Load a saved model artifact and run sanity checks.
 =============================================================================
 
 Checks performed:
-  1. File exists and is loadable.
-  2. Contains (LabelEncoder, KNeighborsClassifier) tuple.
-  3. Prints summary stats (classes, features, algorithm).
+  1. Artifact exists and its manifest is readable.
+  2. Arrays memory-map cleanly and agree with the manifest.
+  3. Prints summary stats (cases, features, format, cold-start time).
   4. Runs a dummy prediction to confirm the pipeline works end-to-end.
 
 Usage:
-    python verify_model.py
+    python verify_model.py [username]     # checks that user's newest model
 =============================================================================
 """
 
 import os
-import pickle
+import sys
+import time
 import numpy as np
 
+from model_store import latest_model_dir, load_model, model_exists
 
-MODEL_FILE = "classifier.pkl"
 
+DEFAULT_USER = "Gagandeep Singh"  # default user from login_config.yml
 
-def verify():
+
+def verify(submitted_by: str = DEFAULT_USER, model_dir: str = None):
     print("=" * 60)
     print("  Model Verification Report")
     print("=" * 60)
 
     # ------------------------------------------------------------------
-    # 1. File existence
+    # 1. Artifact existence
     # ------------------------------------------------------------------
-    if not os.path.isfile(MODEL_FILE):
-        print(f"\n❌ FAIL — '{MODEL_FILE}' not found.")
+    model_dir = model_dir or latest_model_dir(submitted_by)
+    if not model_dir or not model_exists(model_dir):
+        print(f"\n❌ FAIL — no model artifact found for '{submitted_by}'.")
         print("   → Run baseline_train.py first to generate the model.")
         return False
 
-    file_size = os.path.getsize(MODEL_FILE)
-    print(f"\n✅ File found: {MODEL_FILE} ({file_size:,} bytes)")
+    artifact_size = sum(
+        os.path.getsize(os.path.join(model_dir, name)) for name in os.listdir(model_dir)
+    )
+    print(f"\n✅ Artifact found: {model_dir}/ ({artifact_size:,} bytes)")
 
     # ------------------------------------------------------------------
-    # 2. Load & type check
+    # 2. Load & consistency check
     # ------------------------------------------------------------------
-    with open(MODEL_FILE, "rb") as f:
-        obj = pickle.load(f)
-
-    if not isinstance(obj, tuple) or len(obj) != 2:
-        print(f"❌ FAIL — Expected (LabelEncoder, KNN) tuple, got {type(obj)}")
+    start = time.perf_counter()
+    try:
+        model = load_model(model_dir)
+    except ValueError as e:
+        print(f"❌ FAIL — {e}")
         return False
-
-    le, clf = obj
-    print(f"✅ Loaded tuple: (LabelEncoder, {type(clf).__name__})")
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"✅ Loaded {type(model).__name__} (memory-mapped) in {load_ms:.2f} ms")
 
     # ------------------------------------------------------------------
     # 3. Summary stats
     # ------------------------------------------------------------------
-    print(f"\n--- LabelEncoder ---")
-    print(f"   Classes       : {list(le.classes_)}")
-    print(f"   Num classes   : {len(le.classes_)}")
-
-    print(f"\n--- KNeighborsClassifier ---")
-    print(f"   n_neighbors   : {clf.n_neighbors}")
-    print(f"   algorithm     : {clf.algorithm}")
-    print(f"   weights       : {clf.weights}")
-    print(f"   metric        : {clf.metric}")
-    print(f"   n_samples_fit : {clf.n_samples_fit_}")
-    print(f"   n_features_in : {clf.n_features_in_}")
+    print("\n--- Manifest ---")
+    for key, value in model.manifest.items():
+        print(f"   {key:<15}: {value}")
+
+    print("\n--- Arrays ---")
+    print(f"   features      : {model.features.shape} {model.features.dtype}")
+    print(f"   ids           : {len(model.ids)}")
+    print(f"   n_samples_fit : {len(model)}")
+    print(f"   n_features_in : {model.n_features}")
 
     # ------------------------------------------------------------------
     # 4. Dummy prediction
     # ------------------------------------------------------------------
-    print(f"\n--- Dummy Prediction Test ---")
-    dummy_input = np.random.rand(1, clf.n_features_in_)
-    predicted_label_idx = clf.predict(dummy_input)[0]
-    predicted_label = le.inverse_transform([predicted_label_idx])[0]
-    distances, indices = clf.kneighbors(dummy_input)
+    print("\n--- Dummy Prediction Test ---")
+    dummy_input = np.random.rand(1, model.input_dim)
+    predicted_label = model.predict(dummy_input)[0]
+    distances, indices = model.kneighbors(dummy_input)
 
     print(f"   Random input shape : {dummy_input.shape}")
-    print(f"   Predicted class idx: {predicted_label_idx}")
+    print(f"   Predicted index    : {indices[0][0]}")
     print(f"   Predicted label    : {predicted_label[:16]}…")
     print(f"   Nearest distance   : {distances[0][0]:.6f}")
-    print(f"\n✅ All checks passed.")
+    print("\n✅ All checks passed.")
     return True
 
 
 if __name__ == "__main__":
-    verify()
+    verify(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_USER)
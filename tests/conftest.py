@@ -0,0 +1,60 @@
+"""
+=============================================================================
+  Week 3 — QA
+  File: tests/conftest.py
+  Purpose: pytest fixtures for the backend / ML unit tests.
+=============================================================================
+
+Every test gets its own small synthetic database (backend/synthetic_data.py)
+in a temporary SQLite file, active as `db_queries.engine` — and therefore
+for the ML loaders — while the test runs. The project database is never
+touched.
+
+Usage:
+    def test_something(db):
+        ids, features = load_registered_vectors(status="NF")
+        assert len(ids) == db["n_cases"]
+=============================================================================
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for folder in ("ml", "backend"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+from synthetic_data import generate, use_database  # noqa: E402
+
+
+# Registered cases / public submissions per test database
+TEST_CASES = 60
+TEST_SUBMISSIONS = 20
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh synthetic database; yields the `generate()` result plus 'url'."""
+    url = f"sqlite:///{tmp_path}/test.db"
+    with use_database(url):
+        dataset = generate(TEST_CASES, TEST_SUBMISSIONS, matched_fraction=0.2, n_users=3,
+                           verbose=False)
+        yield {**dataset, "url": url}
+
+
+@pytest.fixture
+def exact_best():
+    """Return `best()`: {public_id: nearest NF registered id} by brute force."""
+    from feature_loader import load_public_vectors, load_registered_vectors
+    from knn_search import nearest_neighbors
+
+    def best() -> dict:
+        public_ids, queries = load_public_vectors(status="NF")
+        reg_ids, base = load_registered_vectors(status="NF")
+        _, indices = nearest_neighbors(queries, base, k=1)
+        return dict(zip(public_ids, np.asarray(reg_ids)[indices[:, 0]]))
+
+    return best
@@ -0,0 +1,142 @@
+"""
+=============================================================================
+  Week 3 — QA
+  File: tests/test_db_queries.py
+  Purpose: Candidate pruning, the MatchJob queue and keyset pagination.
+=============================================================================
+"""
+
+import db_queries
+from feature_loader import load_public_vectors, load_registered_vectors
+
+
+# ---------------------------------------------------------------------------
+# save_match_results / _prune_candidates
+# ---------------------------------------------------------------------------
+def test_prune_keeps_the_top_k_nearest(db):
+    public_ids, _ = load_public_vectors(status="NF")
+    reg_ids, _ = load_registered_vectors(status="NF")
+    distances = [7.0, 2.0, 9.0, 1.0, 5.0, 3.0]
+    rows = [(public_ids[0], reg_id, distance, "exact-l2")
+            for reg_id, distance in zip(reg_ids, distances)]
+
+    db_queries.save_match_results(rows, {}, top_k=3)
+    stored = db_queries.fetch_candidates_for_public(public_ids[0])
+    assert [c.distance for c in stored] == [1.0, 2.0, 3.0]
+
+
+def test_prune_keeps_the_newest_copy_of_a_pair(db):
+    public_ids, _ = load_public_vectors(status="NF")
+    reg_ids, _ = load_registered_vectors(status="NF")
+    db_queries.save_match_results([(public_ids[0], reg_ids[0], 4.0, "worker")], {}, top_k=5)
+    db_queries.save_match_results([(public_ids[0], reg_ids[0], 6.0, "batch")], {}, top_k=5)
+
+    stored = db_queries.fetch_candidates_for_public(public_ids[0])
+    assert [(c.distance, c.model_version) for c in stored] == [(6.0, "batch")]
+
+
+def test_prune_only_touches_written_submissions(db):
+    public_ids, _ = load_public_vectors(status="NF")
+    reg_ids, _ = load_registered_vectors(status="NF")
+    db_queries.save_match_results(
+        [(public_ids[0], reg_id, float(i), "exact-l2") for i, reg_id in enumerate(reg_ids[:4])],
+        {},
+    )
+    db_queries.save_match_results([(public_ids[1], reg_ids[0], 1.0, "exact-l2")], {}, top_k=1)
+    assert len(db_queries.fetch_candidates_for_public(public_ids[0])) == 4
+
+
+# ---------------------------------------------------------------------------
+# MatchJob queue
+# ---------------------------------------------------------------------------
+def _queue(n: int) -> list:
+    public_ids, _ = load_public_vectors(status="NF")
+    db_queries.enqueue_match_jobs(list(public_ids[:n]))
+    return list(public_ids[:n])
+
+
+def test_claims_never_overlap(db):
+    _queue(5)
+    first = db_queries.claim_match_jobs("a", 3)
+    second = db_queries.claim_match_jobs("b", 3)
+    assert len(first) == 3 and len(second) == 2
+    assert not {job[0] for job in first} & {job[0] for job in second}
+    assert db_queries.claim_match_jobs("c", 3) == []
+
+
+def test_complete_deletes_jobs(db):
+    _queue(2)
+    jobs = db_queries.claim_match_jobs("a", 10)
+    db_queries.complete_match_jobs([job_id for job_id, _, _ in jobs])
+    stats = db_queries.get_match_queue_stats()
+    assert (stats["queued"], stats["running"], stats["failed"]) == (0, 0, 0)
+
+
+def test_expired_lease_is_claimed_again(db):
+    _queue(1)
+    (job_id, public_id, attempts), = db_queries.claim_match_jobs("a", 1, lease_s=0)
+    assert db_queries.claim_match_jobs("b", 1) == [(job_id, public_id, attempts + 1)]
+
+
+def test_retry_backs_off_then_parks(db):
+    _queue(1)
+    job = db_queries.claim_match_jobs("a", 1, max_attempts=2)[0]
+    assert db_queries.retry_match_jobs([(job[0], job[2])], "boom", "a",
+                                       max_attempts=2, retry_delay_s=0) == 0
+    assert db_queries.get_match_queue_stats()["queued"] == 1
+
+    job = db_queries.claim_match_jobs("a", 1, max_attempts=2)[0]
+    assert job[2] == 2
+    assert db_queries.retry_match_jobs([(job[0], job[2])], "boom", "a",
+                                       max_attempts=2, retry_delay_s=0) == 1
+    assert db_queries.get_match_queue_stats()["failed"] == 1
+    assert db_queries.claim_match_jobs("a", 1, max_attempts=2) == []
+
+
+def test_retry_delay_hides_the_job(db):
+    _queue(1)
+    job = db_queries.claim_match_jobs("a", 1)[0]
+    db_queries.retry_match_jobs([(job[0], job[2])], "boom", "a", retry_delay_s=3600)
+    assert db_queries.claim_match_jobs("a", 1) == []
+
+
+def test_stale_worker_cannot_release_a_reclaimed_job(db):
+    _queue(1)
+    stale = db_queries.claim_match_jobs("a", 1, lease_s=0)[0]
+    fresh = db_queries.claim_match_jobs("b", 1)[0]
+
+    db_queries.retry_match_jobs([(stale[0], stale[2])], "late", "a", max_attempts=1)
+    stats = db_queries.get_match_queue_stats()
+    assert (stats["running"], stats["failed"]) == (1, 0)
+
+    db_queries.retry_match_jobs([(fresh[0], fresh[2])], "boom", "b", retry_delay_s=0)
+    assert db_queries.get_match_queue_stats()["queued"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Keyset pagination
+# ---------------------------------------------------------------------------
+def _walk(newest_first: bool, limit: int = 7) -> list:
+    rows, cursor = db_queries.page_public_cases(limit=limit, newest_first=newest_first)
+    seen = list(rows)
+    while cursor is not None:
+        rows, cursor = db_queries.page_public_cases(after=cursor, limit=limit,
+                                                    newest_first=newest_first)
+        seen.extend(rows)
+    return [(row.submitted_on, row.id) for row in seen]
+
+
+def test_pages_cover_every_row_once_in_order(db):
+    keys = _walk(newest_first=False)
+    assert len(keys) == db["n_submissions"]
+    assert keys == sorted(set(keys))
+
+
+def test_newest_first_pages_are_reversed(db):
+    assert _walk(newest_first=True) == _walk(newest_first=False)[::-1]
+
+
+def test_exact_multiple_ends_with_an_empty_page(db):
+    rows, cursor = db_queries.page_public_cases(limit=db["n_submissions"])
+    assert len(rows) == db["n_submissions"]
+    assert db_queries.page_public_cases(after=cursor, limit=5) == ([], None)
@@ -0,0 +1,98 @@
+"""
+=============================================================================
+  Week 3 — QA
+  File: tests/test_incremental_match.py
+  Purpose: Journal-based incremental matching (baseline_match.match).
+=============================================================================
+"""
+
+from datetime import datetime
+
+import baseline_match
+import db_queries
+from data_models import PublicSubmissions, RegisteredCases
+from feature_loader import load_public_vectors
+
+
+def _best() -> dict:
+    return {public_id: reg_id for public_id, reg_id, _ in db_queries.fetch_best_matches()}
+
+
+def _pending_rows() -> list:
+    """Rows the next incremental run would score."""
+    return baseline_match.score_new_rows(db_queries.get_match_watermarks(),
+                                         db_queries.get_match_heads(),
+                                         db_queries.fetch_stale_match_ids())
+
+
+def test_first_run_matches_exact_scan(db, exact_best):
+    assert baseline_match.match(verbose=False)["status"]
+    assert _best() == exact_best()
+
+
+def test_unchanged_database_scores_nothing(db):
+    baseline_match.match(verbose=False)
+    assert db_queries.get_match_watermarks() == db_queries.get_match_heads()
+    assert _pending_rows() == []
+
+
+def test_new_case_is_scored_against_old_submissions(db, exact_best):
+    baseline_match.match(verbose=False)
+    public_ids, features = load_public_vectors(status="NF")
+    case = RegisteredCases(submitted_by="officer_000", name="new", status="NF",
+                           face_mesh=(features[0] + 1e-4).tolist())
+    case_id = case.id
+    db_queries.register_new_case(case)
+
+    rows = _pending_rows()
+    assert {row[1] for row in rows} == {case_id}
+    assert {row[0] for row in rows} == set(public_ids)
+
+    baseline_match.match(verbose=False)
+    assert _best()[public_ids[0]] == case_id
+    assert _best() == exact_best()
+
+
+def test_backdated_submission_is_scored(db, exact_best):
+    baseline_match.match(verbose=False)
+    _, features = load_public_vectors(status="NF")
+    sighting = PublicSubmissions(status="NF", location="Pune", submitted_by="public",
+                                 submitted_on=datetime(2000, 1, 1),
+                                 face_mesh=(features[0] + 1e-3).tolist())
+    sighting_id = sighting.id
+    db_queries.new_public_case(sighting)
+
+    baseline_match.match(verbose=False)
+    assert db_queries.fetch_candidates_for_public(sighting_id)
+    assert _best() == exact_best()
+
+
+def test_found_case_is_replaced(db, exact_best):
+    baseline_match.match(verbose=False)
+    public_id, reg_id = next(iter(_best().items()))
+    db_queries.update_found_status(reg_id, public_id)
+
+    assert baseline_match.match(verbose=False)["status"]
+    best = _best()
+    assert public_id not in best
+    assert reg_id not in best.values()
+    assert best == exact_best()
+
+
+def test_scoring_space_change_rescores_everything(db):
+    baseline_match.match(verbose=False)
+    assert db_queries.get_match_scoring() == {"raw"}
+
+    assert baseline_match.match(verbose=False, normalized=True)["status"]
+    assert db_queries.get_match_scoring() == {"norm"}
+    versions = {c.model_version for p in _best()
+                for c in db_queries.fetch_candidates_for_public(p)}
+    assert versions == {"norm-exact-l2"}
+
+
+def test_stored_candidates_are_top_k(db):
+    baseline_match.match(verbose=False, k=3)
+    for public_id in _best():
+        distances = [c.distance for c in db_queries.fetch_candidates_for_public(public_id)]
+        assert len(distances) == 3
+        assert distances == sorted(distances)
@@ -0,0 +1,58 @@
+"""
+=============================================================================
+  Week 3 — QA
+  File: tests/test_migrations.py
+  Purpose: face_mesh JSON → packed blob migration (migrations.py).
+=============================================================================
+"""
+
+import json
+
+import numpy as np
+from sqlalchemy import text
+
+import db_queries
+from data_models import FACE_MESH_DIM, FACE_MESH_VERSION
+from feature_loader import load_registered_vectors
+from migrations import migrate_face_mesh_to_binary
+
+
+def _legacy(conn, row_id: str, face_mesh: str):
+    conn.execute(
+        text("UPDATE registeredcases SET face_mesh = :mesh, face_mesh_version = 0 "
+             "WHERE id = :id"),
+        {"mesh": face_mesh, "id": row_id},
+    )
+
+
+def _versions(conn) -> dict:
+    return dict(conn.execute(text("SELECT id, face_mesh_version FROM registeredcases")).all())
+
+
+def test_json_rows_are_packed(db):
+    ids, before = load_registered_vectors(status="NF")
+    with db_queries.engine.begin() as conn:
+        for row_id, vector in zip(ids[:3], before[:3]):
+            _legacy(conn, row_id, json.dumps(vector.tolist()))
+
+    migrate_face_mesh_to_binary(db_queries.engine, batch_size=2)
+
+    with db_queries.engine.connect() as conn:
+        assert set(_versions(conn).values()) == {FACE_MESH_VERSION}
+        blob = conn.execute(text("SELECT face_mesh FROM registeredcases WHERE id = :id"),
+                            {"id": ids[0]}).scalar_one()
+    assert isinstance(blob, bytes) and len(blob) == FACE_MESH_DIM * 4
+    _, after = load_registered_vectors(status="NF")
+    np.testing.assert_array_equal(after, before)
+
+
+def test_undecodable_rows_are_left_for_a_rerun(db):
+    ids, _ = load_registered_vectors(status="NF")
+    with db_queries.engine.begin() as conn:
+        _legacy(conn, ids[0], "[1.0, 2.0]")
+
+    migrate_face_mesh_to_binary(db_queries.engine)
+    with db_queries.engine.connect() as conn:
+        versions = _versions(conn)
+    assert versions[ids[0]] == 0
+    assert sum(v == FACE_MESH_VERSION for v in versions.values()) == len(ids) - 1